@@ -0,0 +1,125 @@
+"""Бенчмарк ленты чата на очень длинной переписке.
+
+В окно без дисплея (QT_QPA_PLATFORM=offscreen) добавляется N сообщений;
+после каждого обрабатываются события Qt, как в живом GUI. Меряются
+задержка добавления (с раскладкой) по ходу роста переписки и RSS
+процесса. Для сравнения старая лента на QTextEdit гоняется на меньшем
+числе сообщений — дальше она становится неприемлемо медленной.
+
+Запуск:
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_chat_view.py [--messages 100000]
+"""
+import argparse
+import html
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication, QTextEdit  # noqa: E402
+
+from core.memory_manager import MemoryManager  # noqa: E402
+from gui.chat_view import ChatModel, ChatView  # noqa: E402
+
+SENDERS = [("USER", "#00d4ff"), ("AI", "#ff006e")]
+
+
+def rss_mb() -> float:
+    """Текущий RSS процесса, МБ"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def message(i: int) -> str:
+    return f"Сообщение {i}: " + "немного текста для переноса строк " * (1 + i % 5)
+
+
+def summarize(n: int, window) -> tuple:
+    lat = sorted(window)
+    p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))]
+    return n, statistics.median(lat), p99, lat[-1], rss_mb()
+
+
+def report(name: str, total: float, checkpoints):
+    print(f"--- {name} ---")
+    print(f"{'messages':>10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'RSS MB':>8}")
+    for n, p50, p99, worst, rss in checkpoints:
+        print(f"{n:>10} {p50:8.3f} {p99:8.3f} {worst:8.3f} {rss:8.1f}")
+    print(f"total: {total:.1f} s")
+
+
+def run(app, count: int, append, every: int):
+    """Задержки сворачиваются в сводку на каждой контрольной точке,
+    чтобы сам бенчмарк не раздувал RSS"""
+    total, window, checkpoints = 0.0, [], []
+    for i in range(count):
+        sender, color = SENDERS[i % 2]
+        start = time.perf_counter()
+        append(sender, message(i), color)
+        app.processEvents()
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        window.append(elapsed * 1000)
+        if (i + 1) % every == 0 or i + 1 == count:
+            checkpoints.append(summarize(i + 1, window))
+            window = []
+    return total, checkpoints
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--baseline", type=int, default=5_000,
+                        help="сообщений для старой ленты на QTextEdit (0 — пропустить)")
+    parser.add_argument("--max-rows", type=int, default=150)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    print(f"RSS at start: {rss_mb():.1f} MB")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = MemoryManager(storage_dir=tmp)
+        model = ChatModel(memory, conversation_id="bench", max_rows=args.max_rows)
+        view = ChatView(model)
+        view.resize(600, 700)
+        view.show()
+        total, checkpoints = run(app, args.messages, model.append, max(1, args.messages // 10))
+        report(f"ChatView ({args.messages} messages, window {args.max_rows} rows)",
+               total, checkpoints)
+
+        # Подгрузка истории прокруткой вверх
+        start = time.perf_counter()
+        pages = 0
+        while model.can_load_older and pages < 50:
+            view.verticalScrollBar().setValue(view.verticalScrollBar().minimum())
+            app.processEvents()
+            pages += 1
+        print(f"scroll-up: {pages} pages in {(time.perf_counter() - start) * 1000:.1f} ms, "
+              f"rows in memory {model.rowCount()}, RSS {rss_mb():.1f} MB")
+        view.close()
+        memory.close()
+
+    if args.baseline:
+        chat = QTextEdit()
+        chat.setReadOnly(True)
+        chat.resize(600, 700)
+        chat.show()
+
+        def append(sender, text, color):
+            chat.append(f'<div><span style="color:{color}">▸ {sender}</span><br>'
+                        f'{html.escape(text)}</div>')
+        total, checkpoints = run(app, args.baseline, append, max(1, args.baseline // 5))
+        report(f"QTextEdit baseline ({args.baseline} messages)", total, checkpoints)
+
+
+if __name__ == "__main__":
+    main()
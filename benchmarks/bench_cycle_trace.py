@@ -0,0 +1,69 @@
+"""Бенчмарк накладных расходов трассировки шагов цикла.
+
+Считается стоимость одного шага трассировки: TurnTrace.mark (отметка
+perf_counter_ns) плюс доля CycleTracer.record, раскладывающей ход по
+гистограммам. Ход моделируется теми же 14 отметками, что у CognitiveCycle.
+Отдельно — полный run_cycle без LLM (offline fallback) для масштаба:
+какую долю хода занимает трассировка.
+
+Запуск:
+    python benchmarks/bench_cycle_trace.py [--turns 100000]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.cognitive_cycle import CognitiveCycle  # noqa: E402
+from core.cycle_trace import CycleTracer, TurnTrace  # noqa: E402
+from core.episodic_memory import EpisodicMemory  # noqa: E402
+from core.episode_log import EpisodeLog  # noqa: E402
+
+STEPS = ["perceive", "working_memory", "attention", "retrieval", "emotion", "goals", "select",
+         "execute", "cache", "moderation", "generate", "cache_store", "learn", "cleanup"]
+
+
+def trace_cost(turns: int) -> float:
+    """Наносекунды трассировки на один шаг"""
+    tracer = CycleTracer()
+    start = time.perf_counter_ns()
+    for _ in range(turns):
+        trace = TurnTrace()
+        for step in STEPS:
+            trace.mark(step)
+        tracer.record(trace, "llm")
+    return (time.perf_counter_ns() - start) / (turns * len(STEPS))
+
+
+def cycle_cost(turns: int) -> float:
+    """Микросекунды на offline run_cycle"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = EpisodeLog(Path(tmp) / "episodes.jsonl")
+        cycle = CognitiveCycle(memory_store=EpisodicMemory(log=log), tracer=CycleTracer())
+        start = time.perf_counter()
+        for i in range(turns):
+            cycle.run_cycle(f"Привет! Как настроение сегодня? #{i}")
+        elapsed = time.perf_counter() - start
+        log.close()
+    return elapsed / turns * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=100000)
+    parser.add_argument("--cycles", type=int, default=2000)
+    args = parser.parse_args()
+
+    per_step = trace_cost(args.turns)
+    per_turn = cycle_cost(args.cycles)
+    print(f"trace: {per_step:6.0f} ns per step, {per_step * len(STEPS) / 1000:5.2f} µs per turn "
+          f"({len(STEPS)} steps)")
+    print(f"run_cycle offline: {per_turn:7.1f} µs per turn, tracing "
+          f"{per_step * len(STEPS) / 1000 / per_turn:5.1%} of it")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Бенчмарк журнала эпизодов: стоимость записи и время перезапуска.
+
+Год переписки ≈ 365 дней × ~300 ходов = ~110k эпизодов. Холодный старт
+считается до конца первого поиска: открытие журнала, загрузка снимка
+индекса (или полная индексация журнала без него) и сам запрос.
+
+Запуск:
+    python benchmarks/bench_episode_log.py [--episodes 110000]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.cognitive_cycle import CognitiveCycle  # noqa: E402
+from core.episode_log import EpisodeLog  # noqa: E402
+from core.episodic_memory import EpisodicMemory  # noqa: E402
+
+PHRASES = [
+    "привет, как дела?", "расскажи про погоду", "мне грустно сегодня",
+    "найди рецепт пасты", "что посмотреть вечером?", "спасибо, пока",
+]
+
+
+def cold_start(path: Path) -> tuple:
+    """Миллисекунды: открытие журнала и памяти, затем первый поиск"""
+    start = time.perf_counter()
+    log = EpisodeLog(path)
+    cycle = CognitiveCycle(memory_store=EpisodicMemory(log=log))
+    open_ms = (time.perf_counter() - start) * 1e3
+    cycle.memory.search("погода", k=5)
+    total_ms = (time.perf_counter() - start) * 1e3
+    log.close()
+    return open_ms, total_ms, len(cycle.memory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--episodes", type=int, default=110_000)
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "episodes.jsonl"
+        log = EpisodeLog(path)
+        memory = EpisodicMemory(log=log, state_every=0)
+
+        start = time.perf_counter()
+        for i in range(args.episodes):
+            memory.add({"input": f"{rng.choice(PHRASES)} #{i}", "output": rng.choice(PHRASES)})
+        write_us = (time.perf_counter() - start) / args.episodes * 1e6
+        start = time.perf_counter()
+        memory.save_state()
+        state_ms = (time.perf_counter() - start) * 1e3
+        log.close()
+        size_mb = path.stat().st_size / 1e6
+        state_mb = memory.state_path.stat().st_size / 1e6
+
+        open_ms, warm_ms, count = cold_start(path)
+        assert count == args.episodes
+
+        # Снимок индекса потерян: первый поиск индексирует весь журнал
+        memory.state_path.rename(memory.state_path.with_suffix(".bak"))
+        _, rebuild_ms, _ = cold_start(path)
+        memory.state_path.with_suffix(".bak").rename(memory.state_path)
+
+        # Перезапуск после сбоя: снапшот смещений потерян, журнал сканируется целиком
+        path.with_name(path.name + ".idx").unlink()
+        start = time.perf_counter()
+        EpisodeLog(path).close()
+        rescan_ms = (time.perf_counter() - start) * 1e3
+
+        # Память с ограничением: журнал уплотняется сам
+        capped = Path(tmp) / "capped.jsonl"
+        log = EpisodeLog(capped)
+        memory = EpisodicMemory(max_episodes=args.episodes // 10, log=log, state_every=0)
+        for i in range(args.episodes):
+            memory.add({"input": f"{rng.choice(PHRASES)} #{i}", "output": rng.choice(PHRASES)})
+        capped_records = len(log)
+        log.close()
+
+    print(f"episodes:                 {args.episodes}")
+    print(f"log size:                 {size_mb:.1f} MB, index state {state_mb:.1f} MB "
+          f"(written in {state_ms:.0f} ms)")
+    print(f"add (index + append):     {write_us:.1f} µs/episode")
+    print(f"open log + memory:        {open_ms:.1f} ms")
+    print(f"cold start to 1st search: {warm_ms:.1f} ms with index state, "
+          f"{rebuild_ms:.1f} ms without (full rebuild)")
+    print(f"offset rescan without .idx: {rescan_ms:.1f} ms")
+    print(f"max_episodes={args.episodes // 10}: log holds {capped_records} records "
+          f"after {args.episodes} adds")
+
+
+if __name__ == "__main__":
+    main()
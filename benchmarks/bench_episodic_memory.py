@@ -0,0 +1,86 @@
+"""Бенчмарк эпизодической памяти: латентность поиска от числа эпизодов.
+
+С --scan-budget поиск приближённый (лимит просмотра постингов); тогда
+дополнительно считается recall@5 относительно точного поиска.
+
+Запуск:
+    python benchmarks/bench_episodic_memory.py [--sizes 1000 10000 100000] [--vectors]
+        [--scan-budget 1024]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.episodic_memory import EpisodicMemory  # noqa: E402
+
+WORDS = (
+    "привет погода работа музыка фильм книга кофе чай кошка собака город "
+    "поездка отпуск море горы программа python код ошибка сервер база данные "
+    "друг семья мама папа брат сестра учеба экзамен проект дедлайн встреча "
+    "hello weather music movie book coffee travel code bug server friend "
+    "project deadline meeting holiday mountain sea cat dog city dinner"
+).split()
+
+
+# Длинный хвост редких слов, как в живой переписке
+VOCAB = WORDS + [f"{w}{i}" for i in range(400) for w in WORDS[:50]]
+
+
+def make_text(rng: random.Random, n_words: int) -> str:
+    # Зипфоподобное распределение: частые слова встречаются чаще
+    return " ".join(VOCAB[min(int(rng.paretovariate(0.8)) - 1, len(VOCAB) - 1)]
+                    for _ in range(n_words))
+
+
+def run(size: int, use_vectors: bool, scan_budget=None, queries: int = 500):
+    rng = random.Random(42)
+    memory = EpisodicMemory(use_vectors=use_vectors, scan_budget=scan_budget)
+    exact = EpisodicMemory(use_vectors=use_vectors) if scan_budget else None
+
+    start = time.perf_counter()
+    for _ in range(size):
+        episode = {"input": make_text(rng, 8), "output": make_text(rng, 12)}
+        memory.add(episode)
+        if exact is not None:
+            exact.add(dict(episode))
+    add_us = (time.perf_counter() - start) / size * 1e6
+
+    latencies = []
+    found = relevant = 0
+    for _ in range(queries):
+        query = make_text(rng, 4)
+        t0 = time.perf_counter()
+        hits = memory.search(query, k=5)
+        latencies.append((time.perf_counter() - t0) * 1e3)
+        if exact is not None:
+            truth = {ep["id"] for ep in exact.search(query, k=5)}
+            found += len(truth & {ep["id"] for ep in hits})
+            relevant += len(truth)
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    return add_us, p50, p99, found / relevant if relevant else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--vectors", action="store_true", help="включить векторный индекс")
+    parser.add_argument("--scan-budget", type=int, default=None,
+                        help="лимит просмотра постингов (приближённый поиск)")
+    args = parser.parse_args()
+
+    print(f"{'episodes':>10} {'add, µs':>10} {'search p50, ms':>15} {'search p99, ms':>15} "
+          f"{'recall@5':>9}")
+    for size in args.sizes:
+        add_us, p50, p99, recall = run(size, args.vectors, args.scan_budget)
+        print(f"{size:>10} {add_us:>10.1f} {p50:>15.3f} {p99:>15.3f} {recall:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Бенчмарк распознавания эмоций по лицу на записанном видео.
+
+Сравниваются:
+  * baseline — старое поведение: FER(mtcnn=True) на каждом полном кадре;
+  * pipeline — EmotionPipeline: Haar-каскад на уменьшенном кадре,
+    FER только при изменении лица, EMA-сглаживание.
+Кадры берутся с шагом detection_interval (как в живом цикле). Считаются
+CPU-время процесса на кадр и совпадение доминирующей эмоции с baseline.
+Нужны fer, opencv-python и tensorflow.
+
+Запуск:
+    python benchmarks/bench_face_emotion.py --video face.mp4 [--interval 0.5]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.face_emotion import EmotionPipeline, FaceEmotionConfig  # noqa: E402
+
+
+def read_frames(path: str, interval: float):
+    """Кадры видео с шагом interval секунд и их временем в видео"""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        sys.exit(f"Не удалось открыть {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    step = max(1, round(fps * interval))
+    frames = []
+    index = 0
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        if index % step == 0:
+            frames.append((index / fps, frame))
+        index += 1
+    cap.release()
+    return frames
+
+
+def run_baseline(frames):
+    from fer import FER
+    detector = FER(mtcnn=True)
+    labels = []
+    start = time.process_time()
+    for _, frame in frames:
+        faces = detector.detect_emotions(frame)
+        labels.append(max(faces[0]['emotions'], key=faces[0]['emotions'].get) if faces else None)
+    return labels, time.process_time() - start
+
+
+def run_pipeline(frames, config: FaceEmotionConfig):
+    from fer import FER
+    pipeline = EmotionPipeline(config, FER(mtcnn=False))
+    pipeline.initialize()
+    labels = []
+    start = time.process_time()
+    for t, frame in frames:
+        result = pipeline.process(frame, now=t)
+        labels.append(result.emotion.value if result else None)
+    return labels, time.process_time() - start, pipeline.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--interval", type=float, default=0.5, help="шаг анализа, c")
+    parser.add_argument("--smoothing", type=float, default=FaceEmotionConfig.smoothing)
+    parser.add_argument("--threshold", type=float, default=FaceEmotionConfig.change_threshold)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.interval)
+    config = FaceEmotionConfig(video_path=args.video, detection_interval=args.interval,
+                               smoothing=args.smoothing, change_threshold=args.threshold,
+                               min_confidence=0.0)
+
+    base_labels, base_cpu = run_baseline(frames)
+    pipe_labels, pipe_cpu, stats = run_pipeline(frames, config)
+
+    both = [(b, p) for b, p in zip(base_labels, pipe_labels) if b and p]
+    agreement = sum(b == p for b, p in both) / len(both) if both else 0.0
+    duration = frames[-1][0] if frames else 0.0
+    print(f"frames analysed: {len(frames)} ({duration:.0f} s of video, every {args.interval} s)")
+    print(f"baseline: {base_cpu / len(frames) * 1000:7.1f} ms CPU/frame, "
+          f"faces on {sum(1 for b in base_labels if b)} frames")
+    print(f"pipeline: {pipe_cpu / len(frames) * 1000:7.1f} ms CPU/frame, "
+          f"faces on {stats['faces']} frames, classifier runs {stats['classified']}, "
+          f"skipped {stats['skipped']}")
+    print(f"CPU reduction: {base_cpu / pipe_cpu:.1f}x   "
+          f"dominant emotion agreement with baseline: {agreement:.0%}")
+
+
+if __name__ == "__main__":
+    main()
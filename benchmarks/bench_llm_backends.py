@@ -0,0 +1,94 @@
+"""Бенчмарк бэкендов LLM: задержка первого токена и скорость генерации.
+
+Один и тот же разговор прогоняется через run_cycle_stream на:
+  * remote — облачный API (если задан OPENAI_API_KEY) или stub-сервер
+    с сетевой задержкой --remote-delay как его замена;
+  * local — GGUF-модель в тёплом процессе LocalLLMBackend (--model)
+    или уже запущенный OpenAI-совместимый сервер (--local-url).
+Первый ход считается отдельно: на нём ещё нет KV-кэша общего префикса
+system prompt, дальше префикс переиспользуется.
+
+Запуск:
+    python benchmarks/bench_llm_backends.py --model models/model.gguf [--turns 8]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.cognitive_cycle import CognitiveCycle  # noqa: E402
+from core.llm_backend import LLMBackend  # noqa: E402
+from modules.local_llm import LocalLLMBackend, LocalLLMConfig  # noqa: E402
+from benchmarks.stub_llm_server import StubLLMServer  # noqa: E402
+
+TURNS = [
+    "Расскажи коротко, чем ты можешь помочь",
+    "Какие книги про космос посоветуешь",
+    "Объясни, что такое рекурсия, на простом примере",
+    "Придумай название для кофейни у моря",
+    "Как лучше спланировать выходные в горах",
+    "Что приготовить на ужин из курицы и риса",
+    "Дай три совета, как не откладывать дела",
+    "Напиши короткое стихотворение про осень",
+]
+
+
+def run(backend: LLMBackend, turns: int):
+    """Списки TTFT (мс) и скоростей генерации (токенов/с) по ходам"""
+    cycle = CognitiveCycle(backend=backend)
+    ttft, speed = [], []
+    for i in range(turns):
+        tokens = 0
+        for _ in cycle.run_cycle_stream(TURNS[i % len(TURNS)] + f" (#{i})"):
+            tokens += 1
+        metrics = cycle.last_stream_metrics
+        ttft.append(metrics.ttft_ms)
+        decode = (metrics.total_ms - metrics.ttft_ms) / 1000
+        if tokens > 1 and decode > 0:
+            speed.append((tokens - 1) / decode)
+    return ttft, speed
+
+
+def report(name: str, ttft: list, speed: list):
+    warm = ttft[1:] or ttft
+    print(f"{name:<8} first-turn TTFT {ttft[0]:8.0f} ms   warm TTFT p50 {statistics.median(warm):8.0f} ms   "
+          f"decode {statistics.median(speed) if speed else 0:6.1f} tok/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=os.getenv("LOCAL_LLM_MODEL", ""), help="GGUF-модель")
+    parser.add_argument("--local-url", default="", help="уже запущенный локальный сервер")
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--remote-delay", type=float, default=0.6,
+                        help="TTFT stub-сервера, если нет OPENAI_API_KEY, секунды")
+    parser.add_argument("--remote-token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    api_key = os.getenv("OPENAI_API_KEY", "")
+    if api_key:
+        report("remote", *run(LLMBackend(api_key), args.turns))
+    else:
+        with StubLLMServer(delay=args.remote_delay, token_delay=args.remote_token_delay) as stub:
+            report("remote*", *run(LLMBackend("stub", stub.url), args.turns))
+        print("         * stub с сетевой задержкой (OPENAI_API_KEY не задан)")
+
+    if not args.model and not args.local_url:
+        print("local    пропущен: укажите --model или --local-url")
+        return
+    backend = LocalLLMBackend(LocalLLMConfig(model_path=args.model, url=args.local_url))
+    start = time.perf_counter()
+    backend.start()
+    print(f"local    model ready in {time.perf_counter() - start:.1f} s (one-time)")
+    try:
+        report("local", *run(backend, args.turns))
+    finally:
+        backend.stop()
+
+
+if __name__ == "__main__":
+    main()
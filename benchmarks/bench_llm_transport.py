@@ -0,0 +1,96 @@
+"""Бенчмарк хвостовых задержек LLM-транспорта на stub-сервере со сбоями.
+
+Stub отвечает 503 на долю --error-rate запросов, рвёт соединение на
+доле --drop-rate и отвечает с задержкой --slow-delay на доле --slow-rate.
+Один и тот же поток запросов (--requests, по --concurrency параллельно)
+проходит через:
+  * single — одна попытка без повторов (как раньше: сбой = «Ошибка API»);
+  * retry  — LLMTransport: дедлайн, повторы с джиттером, предохранитель;
+  * hedge  — то же плюс дублирующий запрос после p95 задержки.
+Считаются доля успешных ответов и задержка до первого токена
+(p50 / p95 / p99) по успешным.
+
+Запуск:
+    python benchmarks/bench_llm_transport.py [--requests 400] [--error-rate 0.05]
+"""
+import argparse
+import logging
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.llm_backend import LLMBackend  # noqa: E402
+from core.llm_transport import TransportConfig  # noqa: E402
+from benchmarks.stub_llm_server import StubLLMServer  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "Привет! Как дела?"}]
+
+
+def request(transport) -> float:
+    """Задержка до первого токена, секунды (исключение — ответа нет)"""
+    start = time.perf_counter()
+    deltas = transport.stream(model="stub", messages=MESSAGES, max_tokens=32)
+    try:
+        next(deltas)
+        return time.perf_counter() - start
+    finally:
+        deltas.close()
+
+
+def run(transport, requests: int, concurrency: int):
+    def one(_):
+        try:
+            return request(transport)
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    return [r * 1000 for r in results if r is not None], results.count(None)
+
+
+def quantile(values: list, q: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.05, help="обычная задержка stub, секунды")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--drop-rate", type=float, default=0.02)
+    parser.add_argument("--slow-rate", type=float, default=0.03)
+    parser.add_argument("--slow-delay", type=float, default=1.5)
+    args = parser.parse_args()
+    logging.getLogger("core.llm_transport").setLevel(logging.ERROR)  # сбои stub ожидаемы
+
+    modes = {
+        "single": TransportConfig(max_retries=0, breaker_threshold=10 ** 9, hedge=False, timeout=10),
+        "retry": TransportConfig(max_retries=3, backoff_base=0.02, hedge=False, timeout=10),
+        "hedge": TransportConfig(max_retries=3, backoff_base=0.02, hedge=True, timeout=10),
+    }
+    print(f"{args.requests} requests x{args.concurrency}: error {args.error_rate:.0%}, "
+          f"drop {args.drop_rate:.0%}, slow {args.slow_rate:.0%} ({args.slow_delay:.1f} s)")
+    for name, config in modes.items():
+        with StubLLMServer(delay=args.delay, token_delay=0, error_rate=args.error_rate,
+                           drop_rate=args.drop_rate, slow_rate=args.slow_rate,
+                           slow_delay=args.slow_delay, seed=1) as server:
+            transport = LLMBackend("stub", server.url, "stub", config).get_transport()
+            latencies, failed = run(transport, args.requests, args.concurrency)
+            sent = server.requests
+        latencies.sort()
+        stats = transport.get_stats()
+        print(f"{name:<7} ok {len(latencies) / args.requests:6.1%}  "
+              f"TTFT p50 {statistics.median(latencies):6.0f} ms  p95 {quantile(latencies, 0.95):6.0f} ms  "
+              f"p99 {quantile(latencies, 0.99):6.0f} ms   "
+              f"sent {sent:4d}  retries {stats['retries']:3d}  hedged {stats['hedged']:3d}  "
+              f"failed {failed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Бенчмарк восприятия: стоимость разбора реплики при росте словаря.
+
+Сравниваются:
+  * baseline — старый подход: lower() в каждом шаге и any(w in text)
+    по спискам ключевых слов каждой группы;
+  * lexicon — Lexicon.perceive: один проход по дереву ключей.
+Словарь LEXICON дополняется синтетическими словами до --sizes записей,
+разложенными по 12 группам; реплики — обычные фразы чата.
+
+Запуск:
+    python benchmarks/bench_perception.py [--sizes 14,100,1000,5000] [--turns 2000]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.perception import LEXICON, Lexicon  # noqa: E402
+
+PHRASES = [
+    "Привет! Как дела?", "Мне сегодня грустно, всё плохо на работе",
+    "Найди, пожалуйста, рецепт борща", "Спасибо, пока!",
+    "Что думаешь про новый фильм? Стоит посмотреть?",
+    "Меня бесит, что сервер опять упал ночью и никто не заметил",
+    "Расскажи что-нибудь интересное про космос и чёрные дыры",
+    "Доброе утро, какие планы на выходные?",
+]
+LETTERS = "абвгдежзиклмнопрстуфхцчшщэюя"
+
+
+def grow_table(size: int, seed: int = 3) -> dict:
+    """LEXICON плюс синтетические слова до size записей"""
+    rng = random.Random(seed)
+    table = {tag: list(terms) for tag, terms in LEXICON.items()}
+    total = sum(len(terms) for terms in table.values())
+    groups = [f"skill:synthetic_{i}" for i in range(12)]
+    while total < size:
+        word = "".join(rng.choice(LETTERS) for _ in range(rng.randint(5, 10)))
+        table.setdefault(groups[total % len(groups)], []).append(word)
+        total += 1
+    return table
+
+
+def baseline_perceive(text: str, table: dict):
+    """Как раньше: каждый шаг сам приводит текст к нижнему регистру и сканирует свои списки"""
+    hits = []
+    for step in range(4):
+        text_lower = text.lower()
+        for tag, terms in table.items():
+            if hash(tag) % 4 == step and any(w.rstrip("*") in text_lower for w in terms):
+                hits.append(tag)
+    return hits
+
+
+def per_turn_us(fn, turns) -> float:
+    start = time.perf_counter()
+    for text in turns:
+        fn(text)
+    return (time.perf_counter() - start) / len(turns) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="14,100,1000,5000")
+    parser.add_argument("--turns", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    turns = [rng.choice(PHRASES) for _ in range(args.turns)]
+    print(f"{'entries':>8} {'baseline us':>12} {'lexicon us':>11} {'build ms':>9} {'speedup':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        table = grow_table(size)
+        start = time.perf_counter()
+        lexicon = Lexicon(table)
+        build = (time.perf_counter() - start) * 1000
+        base = per_turn_us(lambda t: baseline_perceive(t, table), turns)
+        fast = per_turn_us(lexicon.perceive, turns)
+        print(f"{lexicon.size:>8} {base:12.1f} {fast:11.1f} {build:9.1f} {base / fast:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
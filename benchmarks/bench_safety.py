@@ -0,0 +1,121 @@
+"""Бенчмарк фильтра безопасности: пропускная способность на мегабайтах текста.
+
+Сравниваются:
+  * baseline — старый check_input: lower() и отдельный re.search на каждый
+    шаблон из BLOCKED_PATTERNS;
+  * scan — SafetySystem.scan: одно скомпилированное выражение на режим
+    (и check_input на потоке коротких сообщений по 80 символов);
+  * stream — OutputStream: тот же текст кусками по --chunk символов,
+    как приходит стриминговый ответ.
+Текст чистый (худший случай — просматривается целиком); отдельно
+проверяется, что совпадение на стыке кусков находится и его начало
+не успевает уйти пользователю.
+
+Запуск:
+    python benchmarks/bench_safety.py [--mb 8] [--chunk 24]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.safety_system import SafetyMode, SafetySystem  # noqa: E402
+
+BLOCKED_PATTERNS = [
+    r"(взлом|хакер|ddos|exploit)",
+    r"(бомб|оруж|убить|насилие)",
+    r"(нарко|наркотик|героин|кокаин)",
+]
+
+WORDS = (
+    "Привет погода работа музыка фильм книга кофе чай кошка собака город "
+    "поездка отпуск море горы программа Python код ошибка сервер база данные "
+    "друг семья учеба экзамен проект дедлайн встреча hello weather music "
+    "movie book coffee travel code bug server friend project deadline"
+).split()
+
+
+def make_text(mb: float) -> str:
+    rng = random.Random(7)
+    words, size = [], 0
+    while size < mb * 2**20:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word.encode("utf-8")) + 1
+    return " ".join(words)
+
+
+def baseline_check(text: str) -> bool:
+    text_lower = text.lower()
+    for pattern in BLOCKED_PATTERNS:
+        if re.search(pattern, text_lower):
+            return False
+    return True
+
+
+def measure(name: str, fn, megabytes: float, repeat: int = 3):
+    best = min(_timed(fn) for _ in range(repeat))
+    print(f"{name:<28} {megabytes / best:8.1f} MB/s   ({best * 1000:.0f} ms)")
+    return best
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mb", type=float, default=8.0)
+    parser.add_argument("--chunk", type=int, default=24, help="размер куска стрима, символов")
+    args = parser.parse_args()
+
+    text = make_text(args.mb)
+    megabytes = len(text.encode("utf-8")) / 2**20
+    print(f"text: {megabytes:.1f} MB, {len(text)} chars")
+
+    safety = SafetySystem(SafetyMode.NORMAL)
+    assert baseline_check(text) and safety.scan(text) is None
+
+    base = measure("baseline (lower + 3x re)", lambda: baseline_check(text), megabytes)
+    for mode in SafetyMode:
+        safety.mode = mode
+        fast = measure(f"scan input [{mode.value}]", lambda: safety.scan(text), megabytes)
+        print(f"{'':<28} speedup {base / fast:.1f}x")
+
+    # Живой режим: много коротких сообщений, где доминируют накладные расходы вызова
+    safety.mode = SafetyMode.NORMAL
+    messages = [text[i:i + 80] for i in range(0, min(len(text), 80 * 100_000), 80)]
+    mb_messages = sum(len(m.encode("utf-8")) for m in messages) / 2**20
+    base = measure(f"baseline, {len(messages)} msgs", lambda: [baseline_check(m) for m in messages], mb_messages)
+    fast = measure(f"check_input, {len(messages)} msgs", lambda: [safety.check_input(m) for m in messages],
+                   mb_messages)
+    print(f"{'':<28} speedup {base / fast:.1f}x")
+
+    chunks = [text[i:i + args.chunk] for i in range(0, len(text), args.chunk)]
+    safety.mode = SafetyMode.STRICT  # правила ответа действуют в STRICT
+
+    def stream_all():
+        stream = safety.open_output_stream()
+        for chunk in chunks:
+            stream.feed(chunk)
+            stream.release()
+    measure(f"stream output ({args.chunk}-char chunks)", stream_all, megabytes)
+
+    # Совпадение, разрезанное между кусками, должно находиться
+    stream = safety.open_output_stream()
+    released = ""
+    for chunk in ("как сделать бо", "мбу дома"):
+        match = stream.feed(chunk)
+        released += stream.release()
+    print(f"split match: {match.category if match else None} at {match.start if match else '-'}, "
+          f"released before it: {released!r}")
+
+
+if __name__ == "__main__":
+    main()
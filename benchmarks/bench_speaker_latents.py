@@ -0,0 +1,78 @@
+"""Бенчмарк XTTS: задержка фразы с предвычисленными латентами голоса и без.
+
+Без кэша каждая фраза заново извлекает латенты из референсного аудио
+(как tts_to_file(speaker_wav=...)); с кэшем они берутся из памяти.
+Нужен установленный Coqui TTS (Python 3.9–3.11) и семпл голоса.
+
+Запуск:
+    python benchmarks/bench_speaker_latents.py --voice voices/<id>/sample.wav [--runs 5]
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+import shutil
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.speaker_latents import SpeakerLatentCache, compute_latents  # noqa: E402
+
+PHRASES = [
+    "Привет! Рад тебя видеть.",
+    "Интересный вопрос, дай подумать.",
+    "Сегодня хороший день, чтобы узнать что-то новое.",
+]
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--voice", required=True, help="референсное аудио")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--language", default="ru")
+    args = parser.parse_args()
+
+    try:
+        import torch
+        from TTS.api import TTS
+    except ImportError:
+        sys.exit("Coqui TTS не установлен: pip install TTS (Python 3.9-3.11)")
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = TTS("tts_models/multilingual/multi-dataset/xtts_v2").to(device).synthesizer.tts_model
+
+    def utterance(text, latents):
+        model.inference(text, args.language, *latents)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Раскладка как в библиотеке голосов, чтобы латенты сохранились рядом
+        sample = Path(tmp) / f"sample{Path(args.voice).suffix}"
+        shutil.copy2(args.voice, sample)
+
+        extract = [timed(lambda: compute_latents(model, str(sample))) for _ in range(args.runs)]
+        cold = [timed(lambda: utterance(text, compute_latents(model, str(sample))))
+                for _ in range(args.runs) for text in PHRASES]
+
+        cache = SpeakerLatentCache()
+        first_ms = timed(lambda: cache.get(model, str(sample)))
+        warm = [timed(lambda: utterance(text, cache.get(model, str(sample))))
+                for _ in range(args.runs) for text in PHRASES]
+        reload_ms = timed(lambda: SpeakerLatentCache().get(model, str(sample)))
+
+    print(f"device: {device}")
+    print(f"latent extraction:          {statistics.median(extract):8.1f} ms")
+    print(f"utterance, no precompute:   {statistics.median(cold):8.1f} ms (median)")
+    print(f"utterance, cached latents:  {statistics.median(warm):8.1f} ms (median)")
+    print(f"first use (compute + save): {first_ms:8.1f} ms")
+    print(f"restart (load latents.pt):  {reload_ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
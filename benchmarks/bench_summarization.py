@@ -0,0 +1,151 @@
+"""Бенчмарк стоимости промпта в длинных разговорах на stub LLM.
+
+Скриптованный разговор (реплики разной длины, в том числе длинные)
+прогоняется через CognitiveCycle.run_cycle. Сравниваются:
+  * baseline — старое окно: последние 10 реплик рабочей памяти целиком,
+    старые реплики просто отбрасываются;
+  * summary — окно по числу реплик и токенам + скользящее резюме
+    (ConversationSummarizer), которое stub сворачивает в фоне, и
+    раскладка промпта PromptBuilder (стабильное начало, изменчивое в конце).
+Считаются токены промптов на пути ответа (p50 / p95 / max / сумма),
+доля токенов в начале промпта, совпадающем с прошлым запросом (её может
+взять кэш префиксов), токены фоновых запросов на резюме и задержка run_cycle.
+
+Запуск:
+    python benchmarks/bench_summarization.py [--turns 300] [--conversations 3]
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.cognitive_cycle import CognitiveCycle  # noqa: E402
+from core.conversation_summary import extractive_summary  # noqa: E402
+from core.episodic_memory import EpisodicMemory  # noqa: E402
+from core.episode_log import EpisodeLog  # noqa: E402
+from utils import count_tokens  # noqa: E402
+from benchmarks.stub_llm_server import StubLLMServer, DEFAULT_REPLY  # noqa: E402
+
+TOPICS = [
+    "Вчера ходил в горы с друзьями, погода была отличная, видели озеро.",
+    "На работе завал: дедлайн по проекту в пятницу, сервер опять падает.",
+    "Думаю завести собаку, но в квартире мало места и я часто уезжаю.",
+    "Посоветуй книгу про историю, что-нибудь не слишком академичное.",
+    "Учу Python, не понимаю декораторы и зачем нужен functools.wraps.",
+    "Сестра выходит замуж в августе, надо придумать подарок.",
+]
+
+
+def script(turns: int, seed: int) -> list:
+    """Реплики пользователя: короткие и длинные вперемешку"""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(turns):
+        repeat = rng.choice([1, 1, 1, 2, 4, 12])
+        lines.append(f"[{i}] " + " ".join(rng.choice(TOPICS) for _ in range(repeat)))
+    return lines
+
+
+class LegacyCycle(CognitiveCycle):
+    """Рабочая память и промпт в старом виде, для сравнения"""
+
+    def _update_working_memory(self, user_input: str):
+        self.working_memory.append({"role": "user", "content": user_input})
+        if len(self.working_memory) > 20:
+            self.working_memory = self.working_memory[-20:]
+
+    def _apply_attention(self):
+        return self.working_memory[-10:]
+
+    def _build_messages(self, user_input: str, context, retrieved):
+        emotion, conf = self.emotion.get_dominant_emotion()
+        system_prompt = (
+            f"Ты AI-компаньон. Твоя эмоция: {emotion.value} ({conf:.0%}). "
+            f"Отвечай кратко и дружелюбно."
+        )
+        recalled = self._format_retrieved(retrieved)
+        if recalled:
+            system_prompt += "\n\nРелевантные воспоминания:\n" + recalled
+        return ([{"role": "system", "content": system_prompt}] + list(context)
+                + [{"role": "user", "content": user_input}])
+
+
+class Meter:
+    """Ответы stub LLM и учёт токенов промптов по типу запроса"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reply_tokens = []
+        self.prefix_tokens = 0
+        self._previous = []
+        self.summary_tokens = 0
+        self.summary_requests = 0
+
+    def __call__(self, messages) -> str:
+        tokens = sum(count_tokens(m.get("content", "")) for m in messages)
+        system = messages[0].get("content", "") if messages else ""
+        if system.startswith(("Кратко перескажи", "Объедини")):
+            with self.lock:
+                self.summary_tokens += tokens
+                self.summary_requests += 1
+            return extractive_summary(system, messages[-1]["content"], 80)
+        with self.lock:
+            self.reply_tokens.append(tokens)
+            # Совпадающее с прошлым запросом начало (по целым сообщениям)
+            for new, old in zip(messages, self._previous):
+                if new != old:
+                    break
+                self.prefix_tokens += count_tokens(new.get("content", ""))
+            self._previous = messages
+        return DEFAULT_REPLY
+
+
+def run(cls, url: str, lines: list, meter: Meter) -> list:
+    with tempfile.TemporaryDirectory() as tmp:
+        log = EpisodeLog(Path(tmp) / "episodes.jsonl")
+        cycle = cls(api_key="stub", base_url=url, memory_store=EpisodicMemory(log=log))
+        latencies = []
+        for line in lines:
+            start = time.perf_counter()
+            cycle.run_cycle(line)
+            latencies.append((time.perf_counter() - start) * 1000)
+        cycle.summarizer.wait(10)
+        log.close()
+    return latencies
+
+
+def report(name: str, meter: Meter, latencies: list):
+    tokens = sorted(meter.reply_tokens)
+    p95 = tokens[int(len(tokens) * 0.95)]
+    print(f"{name:<9} prompt tokens p50 {statistics.median(tokens):7.0f}  p95 {p95:6d}  "
+          f"max {tokens[-1]:6d}  total {sum(tokens):9d}  prefix {meter.prefix_tokens / sum(tokens):4.0%}   "
+          f"summary: {meter.summary_requests:4d} req / {meter.summary_tokens:7d} tok   "
+          f"cycle p50 {statistics.median(latencies):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--conversations", type=int, default=3)
+    parser.add_argument("--delay", type=float, default=0.0, help="задержка stub LLM, секунды")
+    args = parser.parse_args()
+
+    for n in range(args.conversations):
+        lines = script(args.turns, seed=n)
+        print(f"--- conversation {n}: {args.turns} turns, "
+              f"{sum(count_tokens(line) for line in lines)} user tokens ---")
+        for name, cls in (("baseline", LegacyCycle), ("summary", CognitiveCycle)):
+            meter = Meter()
+            with StubLLMServer(delay=args.delay, reply=meter, token_delay=0) as server:
+                latencies = run(cls, server.url, lines, meter)
+            report(name, meter, latencies)
+
+
+if __name__ == "__main__":
+    main()
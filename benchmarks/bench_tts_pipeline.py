@@ -0,0 +1,104 @@
+"""Бенчмарк конвейерного TTS: time-to-first-audio на длинном ответе.
+
+Движок синтеза имитируется: синтез занимает overhead + rtf × длительность
+аудио, воспроизведение — длительность аудио (все времена умножаются на
+--scale, чтобы бенчмарк шёл быстро). Сравниваются:
+  * whole — старое поведение: синтез всего ответа, затем воспроизведение;
+  * pipeline — TTSPipeline: синтез предложения N+1 во время игры N.
+
+Запуск:
+    python benchmarks/bench_tts_pipeline.py [--rtf 0.3] [--scale 0.1]
+"""
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.cognitive_cycle import StreamMetrics  # noqa: E402
+from modules.tts_engine import AudioChunk, TTSPipeline, split_sentences  # noqa: E402
+
+REPLY = (
+    "Хороший вопрос! Давай разберёмся по порядку. Сначала стоит понять, что именно "
+    "тебя беспокоит, а потом уже искать решение. Если речь о работе, попробуй "
+    "разбить задачу на небольшие шаги и делать по одному в день. Не забывай про "
+    "отдых: короткая прогулка часто помогает лучше, чем ещё час за компьютером. "
+    "Если хочешь, я могу составить план на неделю. Ещё можно вести короткий дневник, "
+    "чтобы видеть прогресс. Главное — не ругать себя за неидеальные дни. "
+    "Расскажи, что из этого кажется тебе реальным?"
+)
+SECONDS_PER_CHAR = 0.065  # ~15 символов речи в секунду
+SAMPLE_RATE = 16000
+
+
+class FakeEngine:
+    def __init__(self, rtf: float, overhead: float, scale: float):
+        self.rtf, self.overhead, self.scale = rtf, overhead, scale
+
+    def synthesize_pcm(self, text: str) -> AudioChunk:
+        audio = len(text) * SECONDS_PER_CHAR * self.scale
+        time.sleep((self.overhead + self.rtf * len(text) * SECONDS_PER_CHAR) * self.scale)
+        return AudioChunk(b"\0\0" * int(audio * SAMPLE_RATE), SAMPLE_RATE)
+
+    def play_pcm(self, chunk: AudioChunk, cancel: threading.Event = None) -> bool:
+        return not (cancel or threading.Event()).wait(chunk.duration)
+
+
+def run_whole(engine: FakeEngine, text: str):
+    metrics = StreamMetrics()
+    chunk = engine.synthesize_pcm(text)
+    metrics.mark_first_audio()
+    engine.play_pcm(chunk)
+    return metrics.ttfa_ms, (time.perf_counter() - metrics.started) * 1000
+
+
+def run_pipeline(engine: FakeEngine, text: str):
+    pipeline = TTSPipeline(engine).start()
+    chunks = len(split_sentences(text))
+    metrics = StreamMetrics()
+    pipeline.speak(text, metrics)
+    while pipeline.stats["played"] < chunks:
+        time.sleep(0.001)
+    total = (time.perf_counter() - metrics.started) * 1000
+    pipeline.close()
+    return metrics.ttfa_ms, total
+
+
+def run_barge_in(engine: FakeEngine, text: str) -> float:
+    pipeline = TTSPipeline(engine).start()
+    metrics = StreamMetrics()
+    pipeline.speak(text, metrics)
+    while metrics.first_audio is None:
+        time.sleep(0.001)
+    time.sleep(0.05)
+    start = time.perf_counter()
+    pipeline.cancel()
+    elapsed = (time.perf_counter() - start) * 1000
+    pipeline.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rtf", type=float, default=0.3, help="real-time factor синтеза")
+    parser.add_argument("--overhead", type=float, default=0.15, help="накладные расходы вызова, c")
+    parser.add_argument("--scale", type=float, default=0.1)
+    args = parser.parse_args()
+    engine = FakeEngine(args.rtf, args.overhead, args.scale)
+
+    audio = len(REPLY) * SECONDS_PER_CHAR
+    print(f"reply: {len(REPLY)} chars, {len(split_sentences(REPLY))} chunks, "
+          f"~{audio:.0f} s of speech (times below ×{args.scale})")
+    results = {}
+    for name, runner in (("whole", run_whole), ("pipeline", run_pipeline)):
+        ttfa, total = runner(engine, REPLY)
+        results[name] = ttfa
+        print(f"{name:>9}: time-to-first-audio {ttfa:7.1f} ms   until silence {total:7.1f} ms")
+    print(f"TTFA speedup: {results['whole'] / results['pipeline']:.1f}x")
+    print(f"barge-in: cancel() returned in {run_barge_in(engine, REPLY):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Нагрузочный тест Telegram-бота на фейковых апдейтах и stub LLM.
+
+Несколько чатов одновременно шлют серии сообщений. Сравниваются:
+  * blocking — старое поведение: апдейты обрабатываются по одному,
+    run_cycle блокирует event loop на время запроса к LLM;
+  * pool — CognitiveWorkerPool + arun_cycle.
+Проверяется, что ответы внутри каждого чата приходят по порядку.
+
+Запуск:
+    python benchmarks/load_telegram.py [--chats 20] [--messages 5] [--delay 0.2]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.cognitive_cycle import CognitiveCycle  # noqa: E402
+from modules.telegram_integration import TelegramBot, TelegramConfig  # noqa: E402
+from benchmarks.stub_llm_server import StubLLMServer  # noqa: E402
+
+
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.first_name = f"user{user_id}"
+
+
+class FakeChat:
+    def __init__(self, chat_id: int):
+        self.id = chat_id
+
+
+class FakeMessage:
+    def __init__(self, text: str, replies: list):
+        self.text = text
+        self._replies = replies
+        self.sent_at = time.perf_counter()
+
+    async def reply_text(self, text: str, **kwargs):
+        self._replies.append((self.text, time.perf_counter() - self.sent_at))
+
+
+class FakeUpdate:
+    def __init__(self, chat_id: int, text: str, replies: list):
+        self.effective_user = FakeUser(chat_id)
+        self.effective_chat = FakeChat(chat_id)
+        self.message = FakeMessage(text, replies)
+
+
+class FakeBot:
+    async def send_chat_action(self, **kwargs):
+        pass
+
+
+class FakeContext:
+    bot = FakeBot()
+
+
+def make_updates(chats: int, messages: int):
+    replies = {chat_id: [] for chat_id in range(chats)}
+    updates = [
+        FakeUpdate(chat_id, f"сообщение {n} из чата {chat_id}", replies[chat_id])
+        for n in range(messages)
+        for chat_id in range(chats)
+    ]
+    return updates, replies
+
+
+async def run_pool(bot: TelegramBot, updates):
+    context = FakeContext()
+    await asyncio.gather(*(bot._handle_message(u, context) for u in updates))
+
+
+async def run_blocking(bot: TelegramBot, updates):
+    for update in updates:
+        response = bot.cognitive.run_cycle(update.message.text)
+        await update.message.reply_text(response)
+
+
+def report(name: str, elapsed: float, replies: dict, messages: int):
+    latencies = sorted(lat for chat in replies.values() for _, lat in chat)
+    ordered = all(
+        [text for text, _ in chat] == sorted((text for text, _ in chat), key=lambda t: int(t.split()[1]))
+        for chat in replies.values()
+    )
+    complete = all(len(chat) == messages for chat in replies.values())
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:>9}: {len(latencies) / elapsed:7.1f} msg/s  "
+          f"p50 {statistics.median(latencies) * 1000:7.0f} ms  p95 {p95 * 1000:7.0f} ms  "
+          f"ordered={ordered} complete={complete}")
+
+
+def main():
+    logging.disable(logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--delay", type=float, default=0.2, help="задержка stub LLM, c")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    with StubLLMServer(delay=args.delay) as server, tempfile.TemporaryDirectory() as session_dir:
+        config = TelegramConfig(token="fake", typing_simulation=False, max_concurrency=args.concurrency,
+                                session_dir=session_dir, stream_responses=False)
+        for name, runner in (("blocking", run_blocking), ("pool", run_pool)):
+            cycle = CognitiveCycle(api_key="stub", base_url=server.url)
+            bot = TelegramBot(config, cycle)
+            updates, replies = make_updates(args.chats, args.messages)
+            start = time.perf_counter()
+            asyncio.run(runner(bot, updates))
+            report(name, time.perf_counter() - start, replies, args.messages)
+            if name == "pool":
+                print(f"pool metrics: {bot.get_metrics()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Локальный OpenAI-совместимый stub-сервер для нагрузочных тестов.
+
+Отвечает на POST /v1/chat/completions с настраиваемой задержкой, не
+обращаясь к внешнему API; поддерживает stream=true (SSE). Используется
+бенчмарками как base_url для CognitiveCycle. Может внедрять сбои:
+ответы 503, обрыв соединения без ответа и медленный хвост задержек.
+
+Запуск отдельно:
+    python benchmarks/stub_llm_server.py --port 8765 --delay 0.3 [--error-rate 0.1]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = "Понял тебя! Это ответ тестового сервера. Что-нибудь ещё?"
+
+
+class StubLLMServer:
+    """Stub chat.completions в фоновом потоке.
+
+    Args:
+        delay: Задержка перед ответом (до первого токена), секунды.
+        reply: Текст ответа (или функция messages -> str).
+        port: Порт (0 — выбрать свободный).
+        token_delay: Пауза между токенами при stream=true, секунды.
+        error_rate: Доля запросов с ответом 503.
+        drop_rate: Доля запросов, на которые соединение закрывается без ответа.
+        slow_rate: Доля запросов с задержкой slow_delay вместо delay (хвост).
+        seed: Зерно генератора сбоев.
+    """
+
+    def __init__(self, delay: float = 0.2, reply=DEFAULT_REPLY, port: int = 0,
+                 token_delay: float = 0.02, error_rate: float = 0.0, drop_rate: float = 0.0,
+                 slow_rate: float = 0.0, slow_delay: float = 2.0, seed: int = 0):
+        self.delay = delay
+        self.token_delay = token_delay
+        self.reply = reply
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.faults = {"error": 0, "drop": 0, "slow": 0}
+        self._rng = random.Random(seed)
+        self.requests = 0
+        self.prompt_chars = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1"
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                messages = body.get("messages", [])
+                with stub._lock:
+                    stub.requests += 1
+                    stub.prompt_chars += sum(len(m.get("content", "")) for m in messages)
+                    fault = stub._fault()
+                if fault == "drop":
+                    self.close_connection = True
+                    return
+                if fault == "error":
+                    stub.respond_error(self)
+                    return
+                text = stub.reply(messages) if callable(stub.reply) else stub.reply
+                time.sleep(stub.slow_delay if fault == "slow" else stub.delay)
+                if body.get("stream"):
+                    stub.respond_stream(self, body, text)
+                else:
+                    stub.respond(self, body, text)
+
+        return Handler
+
+    def _fault(self):
+        """Сбой для очередного запроса (вызывается под self._lock)"""
+        roll = self._rng.random()
+        for fault, rate in (("error", self.error_rate), ("drop", self.drop_rate),
+                            ("slow", self.slow_rate)):
+            if roll < rate:
+                self.faults[fault] += 1
+                return fault
+            roll -= rate
+        return None
+
+    def respond_error(self, handler: BaseHTTPRequestHandler, status: int = 503):
+        payload = json.dumps({"error": {"message": "stub overloaded", "type": "server_error"}}).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def respond(self, handler: BaseHTTPRequestHandler, body: dict, text: str):
+        """Отправить ответ в формате chat.completions."""
+        prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+        payload = json.dumps({
+            "id": f"chatcmpl-stub-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(text) // 4,
+                "total_tokens": prompt_tokens + len(text) // 4,
+            },
+        }, ensure_ascii=False).encode("utf-8")
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def respond_stream(self, handler: BaseHTTPRequestHandler, body: dict, text: str):
+        """Отправить ответ как поток chat.completion.chunk (SSE)."""
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        tokens = [w + " " for w in text.split(" ")]
+        tokens[-1] = tokens[-1].rstrip()
+        for i, token in enumerate(tokens):
+            chunk = {
+                "id": f"chatcmpl-stub-{self.requests}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": token},
+                    "finish_reason": "stop" if i == len(tokens) - 1 else None,
+                }],
+            }
+            data = json.dumps(chunk, ensure_ascii=False)
+            try:
+                handler.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+                handler.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            if i < len(tokens) - 1:
+                time.sleep(self.token_delay)
+        handler.close_connection = True
+        try:
+            handler.wfile.write(b"data: [DONE]\n\n")
+            handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.3)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-delay", type=float, default=2.0)
+    args = parser.parse_args()
+    server = StubLLMServer(delay=args.delay, port=args.port, error_rate=args.error_rate,
+                           drop_rate=args.drop_rate, slow_rate=args.slow_rate,
+                           slow_delay=args.slow_delay)
+    print(f"Stub LLM on {server.url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
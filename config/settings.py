@@ -21,21 +21,45 @@ OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN', '')
 GOOGLE_CALENDAR_CREDENTIALS = os.getenv('GOOGLE_CALENDAR_CREDENTIALS', 'config/google_credentials.json')
 
+# === LLM ===
+# Бэкенд: openai (облачный API по OPENAI_API_KEY) или local (GGUF через llama.cpp)
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'openai').lower()
+
 # === Настройки приложения ===
 DEBUG = os.getenv('DEBUG', 'False').lower() in ('true', '1', 'yes')
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 
+# === Память ===
+# Каталог для журналов эпизодов и переписок
+MEMORY_DIR = os.getenv('MEMORY_DIR', 'data/memory')
+# Сколько эпизодов хранить (0 — без ограничения); журнал уплотняется при двукратном превышении
+MAX_EPISODES = int(os.getenv('MAX_EPISODES', '200000'))
+
 # === TTS Настройки ===
 TTS_USE_GPU = os.getenv('TTS_USE_GPU', 'True').lower() in ('true', '1', 'yes')
 TTS_LANGUAGE = os.getenv('TTS_LANGUAGE', 'ru')
 TTS_SPEED = float(os.getenv('TTS_SPEED', '1.0'))
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', 'cache/tts')
+TTS_CACHE_MB = int(os.getenv('TTS_CACHE_MB', '256'))
+
+# === 3D Аватар ===
+# Кэш декодированных мешей и запечённых кадров
+MODEL_CACHE_DIR = os.getenv('MODEL_CACHE_DIR', 'cache/models')
+
+# === Метрики ===
+# Гистограммы задержек шагов цикла: HTTP на 127.0.0.1 (0 — выкл.) и/или JSON-файл
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+METRICS_FILE = os.getenv('METRICS_FILE', '')
 
 # === Проверка обязательных настроек ===
 def validate_config():
     """Проверить наличие необходимых настроек"""
     warnings = []
     
-    if not OPENAI_API_KEY:
+    if LLM_BACKEND == 'local':
+        if not os.getenv('LOCAL_LLM_MODEL') and not os.getenv('LOCAL_LLM_URL'):
+            warnings.append("LLM_BACKEND=local, но не задан LOCAL_LLM_MODEL или LOCAL_LLM_URL")
+    elif not OPENAI_API_KEY:
         warnings.append("OPENAI_API_KEY не установлен - AI будет работать в offline режиме")
     
     if not TELEGRAM_TOKEN:
@@ -1,13 +1,28 @@
 from .emotion_engine import EmotionEngine, EmotionType, PADState
 from .cognitive_cycle import CognitiveCycle
+from .episodic_memory import EpisodeStore, EpisodicMemory
+from .episode_log import EpisodeLog
+from .state_events import StateBus
+from .conversation_summary import ConversationSummarizer
+from .response_cache import ResponseCache
+from .perception import Lexicon, Perception, get_lexicon
+from .prompt_layout import PromptBuilder
+from .llm_transport import LLMTransport, LLMUnavailable, TransportConfig
+from .cycle_trace import CycleTracer, LatencyHistogram, MetricsExporter, format_latency_lines, get_tracer
 from .skill_system import SkillSystem, Skill, SkillLevel
-from .safety_system import SafetySystem, SafetyMode
+from .safety_system import SafetySystem, SafetyMode, SafetyRule, SafetyMatch
 from .autonomous_life import AutonomousLife
 
 __all__ = [
     'EmotionEngine', 'EmotionType', 'PADState',
     'CognitiveCycle',
+    'EpisodeStore', 'EpisodicMemory', 'EpisodeLog',
+    'StateBus',
+    'ConversationSummarizer', 'ResponseCache',
+    'Lexicon', 'Perception', 'get_lexicon', 'PromptBuilder',
+    'LLMTransport', 'LLMUnavailable', 'TransportConfig',
+    'CycleTracer', 'LatencyHistogram', 'MetricsExporter', 'format_latency_lines', 'get_tracer',
     'SkillSystem', 'Skill', 'SkillLevel',
-    'SafetySystem', 'SafetyMode',
+    'SafetySystem', 'SafetyMode', 'SafetyRule', 'SafetyMatch',
     'AutonomousLife',
 ]
@@ -6,6 +6,12 @@ from typing import Optional
 class AutonomousLife(QObject):
     thought_changed = pyqtSignal(str)
     
+    THOUGHTS = [
+        "Интересно, что происходит в мире...",
+        "Хочется узнать что-то новое",
+        "Как там дела у пользователя?",
+    ]
+    
     def __init__(self, cognitive_cycle):
         super().__init__()
         self.cognitive = cognitive_cycle
@@ -28,10 +34,5 @@ class AutonomousLife(QObject):
         if not self.running:
             return
         if random.random() < 0.3:
-            thoughts = [
-                "Интересно, что происходит в мире...",
-                "Хочется узнать что-то новое",
-                "Как там дела у пользователя?",
-            ]
-            self.current_thought = random.choice(thoughts)
+            self.current_thought = random.choice(self.THOUGHTS)
             self.thought_changed.emit(self.current_thought)
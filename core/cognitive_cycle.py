@@ -1,134 +1,462 @@
 """Когнитивный цикл"""
 
-from typing import Dict, Any
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Iterator, AsyncIterator
 from .emotion_engine import EmotionEngine, EmotionType
 from .skill_system import SkillSystem
 from .safety_system import SafetySystem
+from .episodic_memory import EpisodeStore, EpisodicMemory
+from .state_events import StateBus
+from .conversation_summary import ConversationSummarizer
+from .response_cache import ResponseCache
+from .llm_backend import LLMBackend
+from .llm_transport import LLMTransport, LLMUnavailable
+from .prompt_layout import PromptBuilder
+from .cycle_trace import CycleTracer, TurnTrace, format_latency_lines, get_tracer
+from .perception import Lexicon, Perception, get_lexicon
+from utils import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModerationReport:
+    """Итог проверки ответа на выходе (шаг 8b)."""
+    category: Optional[str] = None  # сработавшее правило; None — ответ пропущен
+    reason: str = "OK"
+    tokens_generated: int = 0
+    # Сколько токенов из лимита max_tokens не пришлось генерировать (верхняя оценка)
+    tokens_saved: int = 0
+
+    @property
+    def aborted(self) -> bool:
+        return self.category is not None
+
+
+@dataclass
+class CycleTurn:
+    """Состояние одного прохода цикла между шагами."""
+    user_input: str
+    action: str = ""
+    context: List[Dict[str, str]] = field(default_factory=list)
+    retrieved: List[Dict[str, Any]] = field(default_factory=list)
+    response: Optional[str] = None
+    blocked: bool = False
+    moderation: Optional[ModerationReport] = None
+    perception: Optional[Perception] = None
+    cache_key: Optional[tuple] = None  # (ввод, отпечаток), если ответ можно кэшировать
+    cached: bool = False
+    degraded: bool = False  # LLM недоступен, ответ из fallback
+    started: float = field(default_factory=time.perf_counter)
+    trace: TurnTrace = field(default_factory=TurnTrace)
+
+
+@dataclass
+class StreamMetrics:
+    """Тайминги стримингового ответа (time.perf_counter, секунды).
+
+    Если задан tracer, TTFT и полное время попадают в его гистограммы
+    при завершении ответа, TTFA — в момент первого звука (TTS может
+    начать говорить и после того, как текст уже догенерирован).
+    """
+    started: float = field(default_factory=time.perf_counter)
+    first_token: Optional[float] = None
+    first_audio: Optional[float] = None
+    finished: Optional[float] = None
+    chunks: int = 0
+    tracer: Optional[CycleTracer] = field(default=None, repr=False)
+
+    def mark_token(self):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+        self.chunks += 1
+
+    def mark_first_audio(self):
+        if self.first_audio is None:
+            self.first_audio = time.perf_counter()
+            if self.tracer is not None:
+                self.tracer.record_stream("ttfa", int((self.first_audio - self.started) * 1e9))
+
+    @property
+    def ttft_ms(self) -> Optional[float]:
+        """Time to first token."""
+        return (self.first_token - self.started) * 1000 if self.first_token else None
+
+    @property
+    def ttfa_ms(self) -> Optional[float]:
+        """Time to first audio."""
+        return (self.first_audio - self.started) * 1000 if self.first_audio else None
+
+    @property
+    def total_ms(self) -> Optional[float]:
+        return (self.finished - self.started) * 1000 if self.finished else None
 
 
 class CognitiveCycle:
-    def __init__(self, api_key: str = None):
+    # Фиксированные ответы fallback-режима
+    GREETING_RESPONSE = "Привет! Рад тебя видеть! 😊"
+    MOOD_RESPONSE = "У меня всё хорошо! Чувствую {emotion}. А у тебя как?"
+    QUESTION_RESPONSE = "Интересный вопрос! Дай подумать..."
+    DEFAULT_RESPONSE = "Понял тебя! Что-нибудь ещё?"
+    MODERATION_NOTICE = "⚠️ Ответ остановлен фильтром безопасности"
+    MAX_TOKENS = 500
+    # Окно рабочей памяти: реплики сверх него сворачиваются в резюме
+    WORKING_TURNS = 8
+    WORKING_TOKENS = 500
+    SUMMARY_MAX_TOKENS = 300
+    API_ERROR = "Ошибка API"
+    CACHE_MAX_TOKENS = 32
+    SESSION_CACHE_ENTRIES = 16
+    # Стимулы эмоций из тегов "emotion:*" словаря; первый по приоритету
+    EMOTION_STIMULI = {
+        "joy": (EmotionType.JOY, 0.3),
+        "sadness": (EmotionType.SADNESS, 0.4),
+        "anger": (EmotionType.ANGER, 0.3),
+    }
+
+    def __init__(self, api_key: str = None, memory_store: EpisodeStore = None,
+                 base_url: str = None, response_cache: ResponseCache = None,
+                 lexicon: Lexicon = None, backend: LLMBackend = None, tracer: CycleTracer = None):
         self.api_key = api_key
+        # Словарь ключевых слов: один проход по реплике на весь цикл
+        self.lexicon = lexicon or get_lexicon()
+        # Гистограммы задержек шагов; по умолчанию общие на процесс
+        self.tracer = tracer or get_tracer()
         self.emotion = EmotionEngine()
         self.skills = SkillSystem()
         self.safety = SafetySystem()
 
-        # Эпизодическая память (как было)
-        self.memory = []
-        # Рабочая память короткого контекста
-        self.working_memory = []
+        # Изменения состояния для GUI, аватара и Telegram (вместо опроса)
+        self.events = StateBus()
+        self.emotion.add_listener(self._publish_emotion)
+        self.skills.add_listener(self._publish_skill)
+        self._publish_emotion(self.emotion.snapshot())
+        for skill in self.skills.skills.values():
+            self._publish_skill(skill)
+
+        # Эпизодическая память: индексированное хранилище эпизодов
+        self.memory = memory_store if memory_store is not None else EpisodicMemory()
+        # Рабочая память короткого контекста; если хранилище персистентно,
+        # восстанавливается из хвоста журнала без полной загрузки индекса
+        self.working_memory = [
+            {"role": "user", "content": ep["input"]} for ep in self.memory.recent(self.WORKING_TURNS)
+        ]
 
         self.cycle_count = 0
+        self.model = "gpt-4o-mini"
         self.client = None
-
-        if api_key:
+        self.async_client = None
+        self.transport: Optional[LLMTransport] = None
+        # Защищает состояние цикла; запрос к LLM выполняется вне блокировки
+        self._lock = threading.RLock()
+        # Метрики последних стриминговых ответов
+        self.last_stream_metrics: Optional[StreamMetrics] = None
+        self.stream_history: deque = deque(maxlen=100)
+        # Итоги проверки ответов на выходе
+        self.last_moderation: Optional[ModerationReport] = None
+        self.moderation_stats = {"checked": 0, "aborted": 0, "tokens_saved": 0}
+
+        # Бэкенд LLM: облачный API по ключу или локальный сервер
+        if backend is None and api_key:
+            backend = LLMBackend(api_key, base_url, self.model)
+        self.backend = backend
+        if backend is not None:
+            self.model = backend.model
             try:
-                from openai import OpenAI
-                self.client = OpenAI(api_key=api_key)
+                # Общий транспорт бэкенда: пул соединений, повторы, предохранитель
+                self.transport = backend.get_transport()
+                self.client, self.async_client = self.transport.client, self.transport.async_client
             except Exception:
                 pass
+        self.summarizer = ConversationSummarizer(self._summarize_llm if self.client else None)
+        # Сборка промпта: стабильный префикс первым, учёт его переиспользования
+        self.prompt = PromptBuilder()
+        # Кэш ответов LLM; можно передать общий на несколько сессий
+        self.cache = response_cache if response_cache is not None else ResponseCache()
+
+    def new_session(self, memory_store: EpisodeStore = None) -> "CognitiveCycle":
+        """Новый цикл с собственным состоянием, но общими LLM-клиентами.
+
+        Кэш ответов у сессии свой (ответы могут опираться на её воспоминания),
+        поэтому небольшой: SESSION_CACHE_ENTRIES.
+        """
+        cache = ResponseCache(max_entries=self.SESSION_CACHE_ENTRIES, ttl=self.cache.ttl,
+                              similarity=self.cache.similarity)
+        session = CognitiveCycle(memory_store=memory_store, response_cache=cache)
+        session.api_key = self.api_key
+        session.backend = self.backend
+        session.model = self.model
+        session.client = self.client
+        session.async_client = self.async_client
+        session.transport = self.transport
+        if self.transport is not None:
+            session.summarizer.summarize_fn = session._summarize_llm
+        session.safety.mode = self.safety.mode
+        return session
 
     # ================== Публичный вход ==================
 
     def run_cycle(self, user_input: str) -> str:
-        """Полный когнитивный цикл из 10 шагов."""
+        """Полный когнитивный цикл из 10 шагов.
+
+        Шаги, меняющие состояние, выполняются под блокировкой, а медленный
+        запрос к LLM — вне её, поэтому цикл можно вызывать из разных потоков.
+        Ответ LLM генерируется стримом, чтобы проверка на выходе (8b) могла
+        оборвать генерацию на первом нарушении.
+        """
+        with self._lock:
+            turn = self._begin_cycle(user_input)
+        if turn.response is None:
+            turn.response = self._generate_moderated(turn)
+        with self._lock:
+            self._end_cycle(turn)
+        return turn.response
+
+    async def arun_cycle(self, user_input: str) -> str:
+        """Асинхронный вариант run_cycle: не блокирует event loop на время запроса к LLM."""
+        with self._lock:
+            turn = self._begin_cycle(user_input)
+        if turn.response is None:
+            if self.async_client is not None:
+                deltas = self._astream_llm_response(turn)
+                turn.response = "".join([d async for d in self._amoderate_stream(deltas, turn)])
+            else:
+                loop = asyncio.get_running_loop()
+                turn.response = await loop.run_in_executor(None, self._generate_moderated, turn)
+        with self._lock:
+            self._end_cycle(turn)
+        return turn.response
+
+    def run_cycle_stream(self, user_input: str) -> Iterator[str]:
+        """Стриминговый run_cycle: отдаёт ответ LLM кусками по мере генерации.
+
+        Ответы без LLM (команды, fallback) отдаются одним куском. Тайминги
+        пишутся в self.last_stream_metrics.
+        """
+        metrics = self._start_stream_metrics()
+        with self._lock:
+            turn = self._begin_cycle(user_input)
+        parts = []
+        try:
+            if turn.response is not None:
+                metrics.mark_token()
+                parts.append(turn.response)
+                yield turn.response
+            else:
+                deltas = self._stream_llm_response(turn)
+                for delta in self._moderate_stream(deltas, turn):
+                    metrics.mark_token()
+                    parts.append(delta)
+                    yield delta
+        finally:
+            if turn.response is None:
+                turn.response = "".join(parts)
+            with self._lock:
+                self._end_cycle(turn)
+            self._finish_stream_metrics(metrics)
+
+    async def arun_cycle_stream(self, user_input: str) -> AsyncIterator[str]:
+        """Асинхронный стриминговый вариант run_cycle."""
+        metrics = self._start_stream_metrics()
+        with self._lock:
+            turn = self._begin_cycle(user_input)
+        parts = []
+        try:
+            if turn.response is None and self.async_client is None:
+                loop = asyncio.get_running_loop()
+                turn.response = await loop.run_in_executor(None, self._generate_moderated, turn)
+            if turn.response is not None:
+                metrics.mark_token()
+                parts.append(turn.response)
+                yield turn.response
+            else:
+                deltas = self._astream_llm_response(turn)
+                async for delta in self._amoderate_stream(deltas, turn):
+                    metrics.mark_token()
+                    parts.append(delta)
+                    yield delta
+        finally:
+            if turn.response is None:
+                turn.response = "".join(parts)
+            with self._lock:
+                self._end_cycle(turn)
+            self._finish_stream_metrics(metrics)
+
+    def _start_stream_metrics(self) -> StreamMetrics:
+        metrics = StreamMetrics(tracer=self.tracer)
+        self.last_stream_metrics = metrics
+        return metrics
+
+    def _finish_stream_metrics(self, metrics: StreamMetrics):
+        metrics.finished = time.perf_counter()
+        self.stream_history.append(metrics)
+        if metrics.first_token is not None:
+            self.tracer.record_stream("ttft", int((metrics.first_token - metrics.started) * 1e9))
+        self.tracer.record_stream("total", int((metrics.finished - metrics.started) * 1e9))
+
+    def get_stream_metrics(self) -> Dict[str, Any]:
+        """Средние TTFT / TTFA / полное время по последним стриминговым ответам."""
+        def avg(values):
+            values = [v for v in values if v is not None]
+            return sum(values) / len(values) if values else None
+
+        history = list(self.stream_history)
+        return {
+            "responses": len(history),
+            "ttft_ms": avg(m.ttft_ms for m in history),
+            "ttfa_ms": avg(m.ttfa_ms for m in history),
+            "total_ms": avg(m.total_ms for m in history),
+        }
+
+    def _begin_cycle(self, user_input: str) -> CycleTurn:
+        """Шаги 1–8. Для действия "llm" ответ остаётся пустым."""
 
         self.cycle_count += 1
+        turn = CycleTurn(user_input=user_input)
+        trace = turn.trace
 
         # 1. Perception — парсинг входа + безопасность
-        safe, msg = self._perceive(user_input)
-        if not safe:
-            return f"⚠️ {msg}"
+        turn.perception = perception = self._perceive(user_input)
+        trace.mark("perceive")
+        if not perception.safe:
+            turn.blocked = True
+            turn.response = f"⚠️ {perception.safety_message}"
+            return turn
 
         # 2. Working Memory Update — добавление перцептов
         self._update_working_memory(user_input)
+        trace.mark("working_memory")
 
         # 3. Attention — выбор фокуса
-        context = self._apply_attention()
+        turn.context = self._apply_attention()
+        trace.mark("attention")
 
         # 4. Retrieval — получение релевантных воспоминаний
-        retrieved = self._retrieve_memory(user_input)
+        turn.retrieved = self._retrieve_memory(user_input)
+        trace.mark("retrieval")
 
         # 5. Emotion Update — обновление эмоций
-        self._update_emotion(user_input)
+        self._update_emotion(perception)
+        trace.mark("emotion")
 
         # 6. Goal Check — мониторинг целей (заглушка)
-        self._check_goals(user_input, context, retrieved)
+        self._check_goals(user_input, turn.context, turn.retrieved)
+        trace.mark("goals")
 
         # 7. Action Selection — выбор действия / rule engine
-        action = self._select_action(user_input, context, retrieved)
-
-        # 8. Action Execution — генерация ответа
-        response = self._execute_action(user_input, action, context, retrieved)
+        turn.action = self._select_action(perception, turn.context, turn.retrieved)
+        trace.mark("select")
+
+        # 8. Action Execution — генерация ответа (кроме запроса к LLM)
+        turn.response = self._execute_action(perception, turn.action, turn.context, turn.retrieved)
+        trace.mark("execute")
+
+        # 8a. Response Cache — повторный вопрос без запроса к LLM
+        if turn.response is None:
+            turn.response = self._lookup_cache(turn)
+            trace.mark("cache")
+
+        # 8b. Output Moderation — готовый ответ проверяется сразу; ответ LLM
+        # проверяется по мере генерации (_moderate_stream)
+        if turn.response is not None:
+            self._moderate_response(turn)
+            trace.mark("moderation")
+        return turn
+
+    def _end_cycle(self, turn: CycleTurn):
+        """Шаги 9–10 и запись трассы хода."""
+        trace = turn.trace
+        if turn.blocked:
+            self.tracer.record(trace, "blocked")
+            return
+        if turn.action == "llm" and not turn.cached:
+            # Стрим LLM с проверкой 8b, вне блокировки
+            trace.mark("generate")
+
+        if turn.cache_key and not turn.cached:
+            self._store_cache(turn)
+            trace.mark("cache_store")
 
         # 9. Learning — сохранение эпизода
-        self._learn(user_input, response, context, retrieved)
+        self._learn(turn.user_input, turn.response, turn.context, turn.retrieved)
+        trace.mark("learn")
 
         # 10. Cleanup — decay эмоций и памяти
         self._cleanup()
-
-        return response
+        trace.mark("cleanup")
+        action = "cache" if turn.cached else "fallback" if turn.degraded else turn.action
+        self.tracer.record(trace, action)
 
     # ================== 1. Perception ==================
 
-    def _perceive(self, user_input: str):
+    def _perceive(self, user_input: str) -> Perception:
         """
-        Perception: здесь можно расширять парсинг, intent, слоты.
-        Пока — проверка безопасности, как было в run_cycle.
+        Perception: разбор реплики словарём (намерения, стимулы эмоций,
+        навыки, команды) и проверка безопасности. Дальше шаги читают
+        только эту запись и текст повторно не сканируют.
         """
-        safe, msg = self.safety.check_input(user_input)
-        return safe, msg
+        perception = self.lexicon.perceive(user_input)
+        perception.safe, perception.safety_message = self.safety.check_input(user_input)
+        return perception
 
     # ================== 2. Working Memory Update ==================
 
     def _update_working_memory(self, user_input: str):
         """
         Добавляем текущий ввод в рабочую память.
+        Реплики, не влезающие в окно (по числу и по токенам), уходят
+        в фоновое резюме, а не отбрасываются.
         """
         self.working_memory.append({"role": "user", "content": user_input})
-        # Ограничение размера рабочей памяти
-        if len(self.working_memory) > 20:
-            self.working_memory = self.working_memory[-20:]
+        overflow = max(0, len(self.working_memory) - self.WORKING_TURNS)
+        if overflow:
+            # Сдвиг окна блоками: начало промпта меняется раз в несколько ходов
+            overflow = max(overflow, self.summarizer.chunk_turns)
+        tokens = sum(count_tokens(m["content"]) for m in self.working_memory[overflow:])
+        while overflow < len(self.working_memory) - 1 and tokens > self.WORKING_TOKENS:
+            tokens -= count_tokens(self.working_memory[overflow]["content"])
+            overflow += 1
+        if overflow:
+            self.summarizer.fold(self.working_memory[:overflow])
+            del self.working_memory[:overflow]
 
     # ================== 3. Attention ==================
 
     def _apply_attention(self):
         """
         Attention: выделение фокуса из рабочей памяти.
-        Сейчас — просто последние N сообщений.
+        Резюме старых реплик и окно последних сообщений; текущий ввод
+        (последний в окне) _build_messages добавляет сам.
         """
-        focus_window = 10
-        return self.working_memory[-focus_window:]
+        return self.summarizer.context_messages() + self.working_memory[:-1]
 
     # ================== 4. Retrieval ==================
 
     def _retrieve_memory(self, user_input: str):
         """
         Retrieval: получение релевантных прошлых эпизодов.
-        Пока — просто последние несколько элементов self.memory.
+        Top-k по индексу эпизодической памяти (BM25 / векторы).
         """
         retrieved_window = 5
-        return self.memory[-retrieved_window:]
+        return self.memory.search(user_input, k=retrieved_window)
 
     # ================== 5. Emotion Update ==================
 
-    def _update_emotion(self, text: str):
+    def _update_emotion(self, perception: Perception):
         """
         Emotion Update: то, что раньше было _analyze_input.
         """
-        text_lower = text.lower()
-
-        if any(w in text_lower for w in ["привет", "здравствуй", "добрый"]):
-            self.emotion.apply_stimulus(EmotionEngine.EmotionType.JOY, 0.3)  # type: ignore
-        elif any(w in text_lower for w in ["грустно", "плохо", "печаль"]):
-            self.emotion.apply_stimulus(EmotionEngine.EmotionType.SADNESS, 0.4)  # type: ignore
-        elif any(w in text_lower for w in ["злюсь", "бесит", "раздражает"]):
-            self.emotion.apply_stimulus(EmotionEngine.EmotionType.ANGER, 0.3)  # type: ignore
-        elif "?" in text:
-            self.emotion.apply_stimulus(EmotionEngine.EmotionType.INTEREST, 0.2)  # type: ignore
-
-    # Если хочешь без type: ignore — используй импорт EmotionType, как было:
-    # self.emotion.apply_stimulus(EmotionType.JOY, 0.3) и т.д.
+        for name in perception.values("emotion"):
+            if name in self.EMOTION_STIMULI:
+                self.emotion.apply_stimulus(*self.EMOTION_STIMULI[name])
+                return
+        if perception.question:
+            self.emotion.apply_stimulus(EmotionType.INTEREST, 0.2)
 
     # ================== 6. Goal Check ==================
 
@@ -141,17 +469,16 @@ class CognitiveCycle:
 
     # ================== 7. Action Selection ==================
 
-    def _select_action(self, user_input: str, context, retrieved) -> str:
+    def _select_action(self, perception: Perception, context, retrieved) -> str:
         """
         Action Selection: выбор, что делать.
         Здесь можно вешать правила, команды и выбор LLM / fallback.
         """
-        text_lower = user_input.lower()
-
         # простые команды
-        if text_lower.startswith("/status"):
+        command = perception.command or ""
+        if command.startswith("/status"):
             return "status"
-        if text_lower.startswith("/reset"):
+        if command.startswith("/reset"):
             return "reset"
 
         # если есть клиент LLM — используем его, иначе fallback
@@ -161,114 +488,286 @@ class CognitiveCycle:
 
     # ================== 8. Action Execution ==================
 
-    def _execute_action(self, user_input: str, action: str, context, retrieved) -> str:
+    def _execute_action(self, perception: Perception, action: str, context, retrieved) -> Optional[str]:
         """
         Action Execution: выполняем выбранное действие.
+        Для "llm" возвращает None: генерацию выполняет run_cycle/arun_cycle
+        вне блокировки состояния.
         """
 
         # спец-действия
         if action == "status":
             state = self.get_state()
-            return (
+            return "\n".join([
                 f"Цикл: {state['cycle']}, эмоция: {state['emotion']} "
-                f"({state['confidence']:.0%}), настроение: {state['mood']}"
-            )
+                f"({state['confidence']:.0%}), настроение: {state['mood']}",
+                *format_latency_lines(state['trace']),
+            ])
 
         if action == "reset":
             self.working_memory.clear()
+            self.summarizer.clear()
+            self.prompt.reset()
             self.memory.clear()
             return "Память очищена. Начинаем заново!"
 
         # обновляем навыки (как раньше _update_skills)
-        self._update_skills(user_input)
+        self._update_skills(perception)
 
         # llm / fallback
         if action == "llm":
-            return self._generate_llm_response(user_input, context, retrieved)
+            return None
+
+        return self._fallback_response(perception)
 
-        return self._fallback_response(user_input)
+    def _build_messages(self, user_input: str, context, retrieved) -> List[Dict[str, str]]:
+        """Собрать сообщения для chat.completions.
 
-    def _generate_llm_response(self, user_input: str, context, retrieved) -> str:
+        Персона и контекст внимания идут первыми и почти не меняются между
+        ходами; эмоция, PAD и найденные воспоминания — в конце, перед вводом.
         """
-        Генерация ответа через LLM (как старый _generate_response, но с контекстом).
+        pad = self.emotion.pad
+        emotion, conf = self.emotion.get_dominant_emotion(pad)
+        state = (
+            f"Состояние: эмоция {emotion.value} ({conf:.0%}), "
+            f"PAD {pad.pleasure:+.2f}/{pad.arousal:+.2f}/{pad.dominance:+.2f}."
+        )
+        recalled = self._format_retrieved(retrieved)
+        if recalled:
+            state += "\nРелевантные воспоминания:\n" + recalled
+        return self.prompt.build(context, state, user_input)
+
+    def _stream_llm_response(self, turn: CycleTurn) -> Iterator[str]:
+        """Стриминговая генерация: отдаёт дельты токенов.
+
+        Если потребитель перестал читать (close), HTTP-стрим закрывается —
+        генерация на стороне модели прекращается. Если LLM недоступен
+        (предохранитель, исчерпаны повторы), отвечает fallback.
         """
-        if not self.client:
-            return self._fallback_response(user_input)
-
+        if self.transport is None:
+            turn.degraded = True
+            yield self._fallback_response(turn.perception)
+            return
+
+        yielded = False
+        deltas = self.transport.stream(
+            model=self.model,
+            messages=self._build_messages(turn.user_input, turn.context, turn.retrieved),
+            max_tokens=self.MAX_TOKENS,
+        )
         try:
-            emotion, conf = self.emotion.get_dominant_emotion()
-            system_prompt = (
-                f"Ты AI-компаньон. Твоя эмоция: {emotion.value} ({conf:.0%}). "
-                f"Отвечай кратко и дружелюбно."
-            )
+            for delta in deltas:
+                yielded = True
+                yield delta
+        except Exception as e:
+            yield self._degrade(turn, e, yielded)
+        finally:
+            deltas.close()
+
+    async def _astream_llm_response(self, turn: CycleTurn) -> AsyncIterator[str]:
+        """Асинхронная стриминговая генерация через AsyncOpenAI."""
+        yielded = False
+        deltas = self.transport.astream(
+            model=self.model,
+            messages=self._build_messages(turn.user_input, turn.context, turn.retrieved),
+            max_tokens=self.MAX_TOKENS,
+        )
+        try:
+            async for delta in deltas:
+                yielded = True
+                yield delta
+        except Exception as e:
+            yield self._degrade(turn, e, yielded)
+        finally:
+            await deltas.aclose()
+
+    def _degrade(self, turn: CycleTurn, error: Exception, yielded: bool) -> str:
+        """Хвост ответа при сбое LLM: fallback, если ответ ещё не начался."""
+        turn.degraded = True
+        if yielded:
+            logger.warning(f"LLM stream broke mid-response: {error}")
+            return f"\n{self.API_ERROR}"
+        if not isinstance(error, LLMUnavailable):
+            logger.warning(f"LLM request failed: {error}")
+        return self._fallback_response(turn.perception)
+
+    def _summarize_llm(self, instruction: str, text: str, max_tokens: int) -> str:
+        """Резюме для ConversationSummarizer (фоновый поток, не в пути ответа)."""
+        return self.transport.complete(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": instruction},
+                {"role": "user", "content": text},
+            ],
+            max_tokens=min(max_tokens, self.SUMMARY_MAX_TOKENS),
+        )
+
+    # ================== 8a. Response Cache ==================
+
+    def _cache_key(self, perception: Perception) -> Optional[tuple]:
+        """Ключ кэша или None, если ответ зависит от контекста разговора."""
+        tokens = perception.tokens
+        if not tokens or len(tokens) > self.CACHE_MAX_TOKENS:
+            return None
+        if perception.has("flag:context"):
+            return None
+        # Отпечаток: квантованное состояние, от которого зависит system prompt
+        emotion, _ = self.emotion.get_dominant_emotion()
+        return perception.text, f"{emotion.value}|{self.safety.mode.value}|{self.model}"
+
+    def _lookup_cache(self, turn: CycleTurn) -> Optional[str]:
+        turn.cache_key = self._cache_key(turn.perception)
+        if turn.cache_key is None:
+            self.cache.bypass()
+            return None
+        response = self.cache.get(*turn.cache_key)
+        turn.cached = response is not None
+        return response
 
-            messages = [{"role": "system", "content": system_prompt}]
+    def _store_cache(self, turn: CycleTurn):
+        """Сохранить полный ответ LLM (не оборванный модерацией и не fallback)."""
+        if not turn.response or turn.degraded:
+            return
+        if turn.moderation is not None and turn.moderation.aborted:
+            return
+        self.cache.put(*turn.cache_key, turn.response, time.perf_counter() - turn.started)
 
-            # подмешиваем контекст внимания (по желанию можно убрать)
-            for m in context:
-                messages.append({"role": m["role"], "content": m["content"]})
+    # ================== 8b. Output Moderation ==================
 
-            messages.append({"role": "user", "content": user_input})
+    def _moderate_response(self, turn: CycleTurn):
+        """Проверить готовый ответ целиком."""
+        report = turn.moderation = ModerationReport()
+        safe, reason = self.safety.check_output(turn.response)
+        if not safe:
+            report.category = self.safety.last_match.category if self.safety.last_match else "length"
+            report.reason = reason
+            turn.response = self.MODERATION_NOTICE
+        self._record_moderation(report)
 
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                max_tokens=500,
-            )
-            return response.choices[0].message.content
+    def _moderate_stream(self, deltas: Iterator[str], turn: CycleTurn) -> Iterator[str]:
+        """Пропускать дельты LLM, проверяя их по мере генерации.
 
-        except Exception as e:
-            return f"Ошибка API: {e}"
+        На первом нарушении генерация обрывается (поток LLM закрывается),
+        вместо остатка ответа отдаётся MODERATION_NOTICE. Отдаётся только
+        текст, который stream уже не придерживает (см. OutputStream.release).
+        """
+        report = turn.moderation = ModerationReport()
+        stream = self.safety.open_output_stream()
+        try:
+            for delta in deltas:
+                if not self._moderate_delta(delta, stream, report):
+                    yield f"\n{self.MODERATION_NOTICE}"
+                    return
+                checked = stream.release()
+                if checked:
+                    yield checked
+            rest = stream.flush()
+            if rest:
+                yield rest
+        finally:
+            deltas.close()
+            self._record_moderation(report)
+
+    async def _amoderate_stream(self, deltas: AsyncIterator[str], turn: CycleTurn) -> AsyncIterator[str]:
+        """Асинхронный вариант _moderate_stream."""
+        report = turn.moderation = ModerationReport()
+        stream = self.safety.open_output_stream()
+        try:
+            async for delta in deltas:
+                if not self._moderate_delta(delta, stream, report):
+                    yield f"\n{self.MODERATION_NOTICE}"
+                    return
+                checked = stream.release()
+                if checked:
+                    yield checked
+            rest = stream.flush()
+            if rest:
+                yield rest
+        finally:
+            await deltas.aclose()
+            self._record_moderation(report)
+
+    def _generate_moderated(self, turn: CycleTurn) -> str:
+        """Полный ответ LLM, собранный из проверенного стрима."""
+        deltas = self._stream_llm_response(turn)
+        return "".join(self._moderate_stream(deltas, turn))
+
+    def _moderate_delta(self, delta: str, stream, report: ModerationReport) -> bool:
+        """Проверить очередную дельту (~1 токен); False — генерацию прервать."""
+        report.tokens_generated += 1
+        safe, reason = self.safety.check_output(delta, stream=stream)
+        if safe:
+            return True
+        report.category = stream.match.category if stream.match else "length"
+        report.reason = reason
+        report.tokens_saved = max(0, self.MAX_TOKENS - report.tokens_generated)
+        return False
+
+    def _record_moderation(self, report: ModerationReport):
+        with self._lock:
+            self.last_moderation = report
+            self.moderation_stats["checked"] += 1
+            if report.aborted:
+                self.moderation_stats["aborted"] += 1
+                self.moderation_stats["tokens_saved"] += report.tokens_saved
+        if report.aborted:
+            logger.info(f"Output blocked ({report.category}) after {report.tokens_generated} tokens, "
+                        f"saved up to {report.tokens_saved}")
+
+    @staticmethod
+    def _format_retrieved(retrieved) -> str:
+        """Сжатое представление найденных эпизодов для system prompt."""
+        lines = []
+        for ep in retrieved:
+            lines.append(f"- Пользователь: {ep['input'][:200]} / Ты: {ep['output'][:200]}")
+        return "\n".join(lines)
 
     # ================== Fallback ==================
 
-    def _fallback_response(self, text: str) -> str:
+    def _fallback_response(self, perception: Perception) -> str:
         """
-        Старый fallback-ответ, оставлен без изменений.
+        Старый fallback-ответ по намерениям из Perception.
         """
-        text_lower = text.lower()
-
-        if any(w in text_lower for w in ["привет", "здравствуй"]):
-            return "Привет! Рад тебя видеть! 😊"
-        elif "как дела" in text_lower:
+        if perception.has("intent:greeting"):
+            return self.GREETING_RESPONSE
+        elif perception.has("intent:how_are_you"):
             emotion, _ = self.emotion.get_dominant_emotion()
-            return f"У меня всё хорошо! Чувствую {emotion.value}. А у тебя как?"
-        elif "?" in text:
-            return "Интересный вопрос! Дай подумать..."
-        return "Понял тебя! Что-нибудь ещё?"
+            return self.MOOD_RESPONSE.format(emotion=emotion.value)
+        elif perception.question:
+            return self.QUESTION_RESPONSE
+        return self.DEFAULT_RESPONSE
+
+    def canned_responses(self) -> List[str]:
+        """Все фиксированные ответы (для заблаговременной озвучки)."""
+        return [
+            self.GREETING_RESPONSE, self.QUESTION_RESPONSE, self.DEFAULT_RESPONSE,
+            *(self.MOOD_RESPONSE.format(emotion=e.value) for e in EmotionType),
+        ]
 
     # ================== Skills ==================
 
-    def _update_skills(self, text: str):
+    def _update_skills(self, perception: Perception):
         """
-        Логика прокачки навыков из старой версии.
+        Прокачка навыков по тегам "skill:*" словаря.
         """
-        text_lower = text.lower()
-
-        if any(w in text_lower for w in ["привет", "пока", "спасибо"]):
-            self.skills.use_skill("приветствие")
-        if any(w in text_lower for w in ["найди", "поищи", "загугли"]):
-            self.skills.use_skill("поиск_в_интернете")
-        if any(w in text_lower for w in ["грустно", "плохо", "расстроен"]):
-            self.skills.use_skill("эмпатия")
+        for name in perception.values("skill"):
+            self.skills.use_skill(name)
 
     # ================== 9. Learning ==================
 
     def _learn(self, user_input: str, response: str, context, retrieved):
         """
         Learning: сохраняем эпизод в память.
-        Раньше сохранялось только input/output; теперь добавлен контекст.
+        Эпизод индексируется хранилищем; найденные эпизоды сохраняются
+        ссылками (id), чтобы не вкладывать эпизоды друг в друга.
         """
         episode = {
             "input": user_input,
             "output": response,
             "context": context,
-            "retrieved": retrieved,
+            "retrieved": [ep.get("id") for ep in retrieved],
         }
-        self.memory.append(episode)
-
-        if len(self.memory) > 100:
-            self.memory = self.memory[-100:]
+        self.memory.add(episode)
 
     # ================== 10. Cleanup ==================
 
@@ -280,19 +779,64 @@ class CognitiveCycle:
 
     # ================== Состояние ==================
 
+    def export_state(self, max_episodes: int = 50) -> Dict[str, Any]:
+        """Сериализуемое состояние цикла (для выгрузки сессии на диск)."""
+        with self._lock:
+            return {
+                "cycle": self.cycle_count,
+                "working_memory": list(self.working_memory),
+                "summary": self.summarizer.to_dict(),
+                "emotion": self.emotion.to_dict(),
+                "skills": self.skills.to_dict(),
+                "episodes": [
+                    {k: ep[k] for k in ("input", "output", "timestamp") if k in ep}
+                    for ep in self.memory.recent(max_episodes)
+                ],
+            }
+
+    def load_state(self, state: Dict[str, Any]):
+        """Восстановить состояние, сохранённое export_state()."""
+        with self._lock:
+            self.cycle_count = state.get("cycle", 0)
+            self.working_memory = list(state.get("working_memory", []))
+            self.summarizer.load_dict(state.get("summary", {}))
+            self.emotion.load_dict(state.get("emotion", {}))
+            self.skills.load_dict(state.get("skills", {}))
+            for episode in state.get("episodes", []):
+                self.memory.add(dict(episode))
+
+    def _publish_emotion(self, pad):
+        """Разослать PAD и — если сменились — эмоцию и настроение."""
+        emotion, _ = self.emotion.get_dominant_emotion(pad)
+        self.events.publish("pad", (pad.pleasure, pad.arousal, pad.dominance))
+        self.events.publish("emotion", (emotion.value, self.emotion.get_mood_description(pad)))
+
+    def _publish_skill(self, skill):
+        """Разослать изменение навыка и общего уровня."""
+        self.events.publish(f"skill.{skill.name}", (skill.level.value, skill.experience, skill.uses))
+        self.events.publish("level", self.skills.get_total_level())
+
     def get_state(self) -> Dict[str, Any]:
-        emotion, confidence = self.emotion.get_dominant_emotion()
+        # Один снимок PAD на весь ответ; чтение не блокирует источники стимулов
+        pad = self.emotion.pad
+        emotion, confidence = self.emotion.get_dominant_emotion(pad)
         return {
             "cycle": self.cycle_count,
             "emotion": emotion.value,
             "confidence": confidence,
-            "mood": self.emotion.get_mood_description(),
+            "mood": self.emotion.get_mood_description(pad),
             "pad": {
-                "pleasure": self.emotion.pad.pleasure,
-                "arousal": self.emotion.pad.arousal,
-                "dominance": self.emotion.pad.dominance,
+                "pleasure": pad.pleasure,
+                "arousal": pad.arousal,
+                "dominance": pad.dominance,
             },
             "total_level": self.skills.get_total_level(),
             "safety_mode": self.safety.mode.value,
+            "moderation": dict(self.moderation_stats),
+            "cache": self.cache.get_stats(),
+            "prompt": self.prompt.get_stats(),
+            "transport": self.transport.get_stats() if self.transport else None,
+            "trace": self.tracer.get_stats(),
+            "stream": self.get_stream_metrics(),
         }
 
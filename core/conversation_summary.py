@@ -0,0 +1,169 @@
+"""Скользящее резюме разговора
+
+Реплики, вытесненные из окна рабочей памяти, сворачиваются в два уровня:
+пачка из chunk_turns реплик -> короткий конспект, а когда конспектов
+становится больше fanout, они вливаются в общее резюме. В промпт идут
+резюме, конспекты и ещё не свёрнутые реплики, поэтому его размер
+ограничен, а дальний контекст не теряется.
+
+Свёртка выполняется в отдельном потоке и не задерживает ответ; готовые
+конспекты и резюме хранятся и переиспользуются всеми следующими запросами.
+"""
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from utils import count_tokens
+
+# (инструкция, текст, лимит токенов) -> резюме
+SummarizeFn = Callable[[str, str, int], str]
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s")
+
+# Общий пул на все сессии: у каждого резюме не больше одной задачи за раз
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summary")
+
+
+def extractive_summary(instruction: str, text: str, max_tokens: int) -> str:
+    """Резюме без LLM: первые предложения строк, самые свежие в пределах лимита"""
+    lines = []
+    for line in text.splitlines():
+        line = _SENTENCE_END.split(line.strip(), 1)[0]
+        if line:
+            lines.append(line[:160])
+    kept, total = [], 0
+    for line in reversed(lines):
+        tokens = count_tokens(line) + 1
+        if total + tokens > max_tokens:
+            break
+        kept.append(line)
+        total += tokens
+    return "\n".join(reversed(kept))
+
+
+class ConversationSummarizer:
+    """Фоновая свёртка старых реплик в конспекты и общее резюме"""
+
+    CHUNK_PROMPT = ("Кратко перескажи фрагмент диалога: факты, имена, просьбы и "
+                    "договорённости. Не более {tokens} токенов.")
+    MERGE_PROMPT = ("Объедини резюме и конспекты разговора в одно резюме, сохранив "
+                    "важные факты. Не более {tokens} токенов.")
+
+    def __init__(self, summarize_fn: Optional[SummarizeFn] = None, chunk_turns: int = 4,
+                 fanout: int = 3, digest_tokens: int = 60, summary_tokens: int = 200,
+                 pending_tokens: int = 250):
+        self.summarize_fn = summarize_fn or extractive_summary
+        self.chunk_turns = chunk_turns
+        self.fanout = fanout
+        self.digest_tokens = digest_tokens
+        self.summary_tokens = summary_tokens
+        self.pending_tokens = pending_tokens
+
+        self.summary = ""
+        self._digests: List[str] = []
+        self._pending: List[Dict[str, str]] = []  # вытесненные, ещё не свёрнутые
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._generation = 0  # растёт при clear(): результаты старых задач отбрасываются
+        self.stats = {"chunks": 0, "merges": 0}
+
+    # ================== Свёртка ==================
+
+    def fold(self, turns: List[Dict[str, str]]):
+        """Принять реплики, вытесненные из окна; свернуть их в фоне"""
+        with self._lock:
+            self._pending.extend(turns)
+            if not self._idle.is_set() or len(self._pending) < self.chunk_turns:
+                return
+            self._idle.clear()
+        _executor.submit(self._run)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if len(self._pending) < self.chunk_turns:
+                    self._idle.set()
+                    return
+                generation = self._generation
+                chunk = self._pending[:self.chunk_turns]
+            digest = self._summarize(self.CHUNK_PROMPT, self._format(chunk), self.digest_tokens)
+
+            with self._lock:
+                if generation != self._generation:
+                    continue
+                del self._pending[:len(chunk)]
+                self._digests.append(digest)
+                self.stats["chunks"] += 1
+                if len(self._digests) <= self.fanout:
+                    continue
+                parts = ([self.summary] if self.summary else []) + self._digests
+                merged = len(self._digests)
+            summary = self._summarize(self.MERGE_PROMPT, "\n\n".join(parts), self.summary_tokens)
+
+            with self._lock:
+                if generation != self._generation:
+                    continue
+                self.summary = summary
+                del self._digests[:merged]
+                self.stats["merges"] += 1
+
+    def _summarize(self, prompt: str, text: str, max_tokens: int) -> str:
+        try:
+            return self.summarize_fn(prompt.format(tokens=max_tokens), text, max_tokens)
+        except Exception:
+            return extractive_summary(prompt, text, max_tokens)
+
+    @staticmethod
+    def _format(turns: List[Dict[str, str]]) -> str:
+        return "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+
+    # ================== Контекст ==================
+
+    def context_messages(self) -> List[Dict[str, str]]:
+        """Сообщения для промпта: резюме и конспекты, затем несвёрнутые реплики"""
+        with self._lock:
+            parts = ([self.summary] if self.summary else []) + self._digests
+            pending = list(self._pending)
+        messages = []
+        if parts:
+            messages.append({"role": "system", "content": "Ранее в разговоре:\n" + "\n".join(parts)})
+        # Если свёртка отстаёт, в промпт идёт только свежий хвост очереди
+        start, total = len(pending), 0
+        while start > 0:
+            total += count_tokens(pending[start - 1]["content"])
+            if total > self.pending_tokens:
+                break
+            start -= 1
+        messages.extend(pending[start:])
+        return messages
+
+    def wait(self, timeout: float = None) -> bool:
+        """Дождаться текущей свёртки (для бенчмарков)"""
+        return self._idle.wait(timeout)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.summary = ""
+            self._digests.clear()
+            self._pending.clear()
+
+    # ================== Состояние ==================
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "summary": self.summary,
+                "digests": list(self._digests),
+                "pending": list(self._pending),
+            }
+
+    def load_dict(self, data: Dict[str, Any]):
+        with self._lock:
+            self._generation += 1
+            self.summary = data.get("summary", "")
+            self._digests = list(data.get("digests", []))
+            self._pending = list(data.get("pending", []))
+        self.fold([])
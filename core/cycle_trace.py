@@ -0,0 +1,285 @@
+"""Трассировка шагов когнитивного цикла
+
+Каждый ход несёт TurnTrace: после шага вызывается mark(step), который
+берёт time.perf_counter_ns и запоминает длительность шага. В конце хода
+CycleTracer одним захватом блокировки раскладывает длительности по
+гистограммам: по шагам и по действию (llm, fallback, status, reset,
+cache, blocked) — полное время хода. Стриминговые ответы дополнительно
+пишут TTFT, TTFA и полное время ответа (record_stream).
+
+LatencyHistogram устроена как HDR: логарифмические октавы по 16 линейных
+корзин, относительная ошибка квантилей не больше ~6%, память постоянна,
+запись — несколько целочисленных операций. Поэтому трассировка
+включена всегда.
+
+MetricsExporter отдаёт снимок по HTTP на localhost (/metrics в формате
+Prometheus, /metrics.json) и/или периодически пишет JSON в файл.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SUB_BITS = 5  # 2**(SUB_BITS-1) = 16 корзин на октаву
+BUCKETS = 64 << (SUB_BITS - 1)  # хватает на любое int64 значение в нс
+QUANTILES = (0.5, 0.95, 0.99)
+_clock = time.perf_counter_ns
+
+
+def _bucket(value: int) -> int:
+    """Корзина для значения: линейно до 2**SUB_BITS, дальше 16 на октаву"""
+    shift = value.bit_length() - SUB_BITS
+    return value if shift <= 0 else (shift << (SUB_BITS - 1)) + (value >> shift)
+
+
+class LatencyHistogram:
+    """Гистограмма задержек в наносекундах (лог-линейные корзины)"""
+    __slots__ = ("counts", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int):
+        self.counts[_bucket(value)] += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    @staticmethod
+    def _bounds(index: int) -> Tuple[int, int]:
+        if index < 1 << SUB_BITS:
+            return index, index + 1
+        shift = (index >> (SUB_BITS - 1)) - 1
+        mantissa = index - (shift << (SUB_BITS - 1))
+        return mantissa << shift, (mantissa + 1) << shift
+
+    def percentile(self, q: float) -> int:
+        """Квантиль q (0..1) в нс: середина корзины, не больше max"""
+        count = self.count
+        if not count:
+            return 0
+        rank = max(1, int(q * count + 0.5))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                low, high = self._bounds(index)
+                return min((low + high) // 2, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """Сводка в миллисекундах"""
+        count = self.count
+        result = {"count": count,
+                  "mean_ms": self.total / count / 1e6 if count else 0.0,
+                  "max_ms": self.max / 1e6}
+        for q in QUANTILES:
+            result[f"p{int(q * 100)}_ms"] = self.percentile(q) / 1e6
+        return result
+
+
+class TurnTrace:
+    """Отметки времени шагов одного хода; длительности считает CycleTracer"""
+    __slots__ = ("started", "steps")
+
+    def __init__(self):
+        self.started = _clock()
+        self.steps: List[Tuple[str, int]] = []
+
+    def mark(self, step: str):
+        """Закончился шаг step"""
+        self.steps.append((step, _clock()))
+
+
+class CycleTracer:
+    """Гистограммы по шагам цикла и по действиям; общий на все сессии"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.steps: Dict[str, LatencyHistogram] = {}
+        self.actions: Dict[str, LatencyHistogram] = {}
+        self.stream: Dict[str, LatencyHistogram] = {}
+
+    def record(self, trace: TurnTrace, action: str):
+        last = trace.started
+        with self._lock:
+            steps = self.steps
+            # Горячий путь: запись в гистограмму развёрнута без вызовов методов
+            for step, stamp in trace.steps:
+                elapsed = stamp - last
+                last = stamp
+                hist = steps.get(step)
+                if hist is None:
+                    hist = steps[step] = LatencyHistogram()
+                shift = elapsed.bit_length() - SUB_BITS
+                hist.counts[elapsed if shift <= 0 else (shift << (SUB_BITS - 1)) + (elapsed >> shift)] += 1
+                hist.total += elapsed
+                if elapsed > hist.max:
+                    hist.max = elapsed
+            hist = self.actions.get(action)
+            if hist is None:
+                hist = self.actions[action] = LatencyHistogram()
+            hist.record(last - trace.started)
+
+    def record_stream(self, phase: str, elapsed: int):
+        """Задержка стримингового ответа в нс: ttft, ttfa или total"""
+        with self._lock:
+            hist = self.stream.get(phase)
+            if hist is None:
+                hist = self.stream[phase] = LatencyHistogram()
+            hist.record(elapsed)
+
+    def reset(self):
+        with self._lock:
+            self.steps = {}
+            self.actions = {}
+            self.stream = {}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "steps": {name: h.summary() for name, h in self.steps.items()},
+                "actions": {name: h.summary() for name, h in self.actions.items()},
+                "stream": {name: h.summary() for name, h in self.stream.items()},
+            }
+
+    def to_prometheus(self) -> str:
+        """Снимок в текстовом формате Prometheus (summary, секунды)"""
+        lines = []
+        stats = self.get_stats()
+        for group, label, metric in (("steps", "step", "cycle_step_seconds"),
+                                     ("actions", "action", "cycle_action_seconds"),
+                                     ("stream", "phase", "cycle_stream_seconds")):
+            lines.append(f"# TYPE {metric} summary")
+            for name, s in stats[group].items():
+                for q in QUANTILES:
+                    value = s[f"p{int(q * 100)}_ms"] / 1000
+                    lines.append(f'{metric}{{{label}="{name}",quantile="{q}"}} {value:.9f}')
+                lines.append(f'{metric}_sum{{{label}="{name}"}} {s["mean_ms"] * s["count"] / 1000:.9f}')
+                lines.append(f'{metric}_count{{{label}="{name}"}} {s["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+def format_latency_lines(stats: Dict[str, Any], step_format: str = "{}") -> List[str]:
+    """Строки задержек для /status (общие для GUI и Telegram).
+
+    stats — CycleTracer.get_stats(); step_format оформляет имя шага
+    (Telegram передаёт "`{}`", чтобы Markdown не съел подчёркивания).
+    """
+    lines = []
+    actions = stats["actions"]
+    steps = {step: s for step, s in stats["steps"].items() if step != "generate"}
+    slowest = max(steps, key=lambda step: steps[step]["p99_ms"], default=None)
+    if actions and slowest:
+        timing = ", ".join(f"{action} {s['p50_ms']:.1f}/{s['p99_ms']:.1f}" for action, s in actions.items())
+        lines.append(f"⏱️ Ход p50/p99, мс: {timing}; медленный шаг: "
+                     f"{step_format.format(slowest)} ({steps[slowest]['p99_ms']:.1f} мс)")
+    stream = stats.get("stream", {})
+    if "ttft" in stream:
+        lines.append("📡 Стриминг p50/p95, мс: " + ", ".join(
+            f"{phase.upper()} {stream[phase]['p50_ms']:.0f}/{stream[phase]['p95_ms']:.0f}"
+            for phase in ("ttft", "ttfa") if phase in stream))
+    return lines
+
+
+_tracer: Optional[CycleTracer] = None
+
+
+def get_tracer() -> CycleTracer:
+    """Общий трассировщик процесса"""
+    global _tracer
+    if _tracer is None:
+        _tracer = CycleTracer()
+    return _tracer
+
+
+class MetricsExporter:
+    """Локальный HTTP-эндпоинт и/или файл со снимком трассировки.
+
+    Args:
+        port: Порт на 127.0.0.1 (0 — без HTTP).
+        path: JSON-файл для периодической записи ("" — без файла).
+        interval: Период записи файла, секунды.
+    """
+
+    def __init__(self, tracer: CycleTracer = None, port: int = 0, path: str = "",
+                 interval: float = 10.0):
+        self.tracer = tracer or get_tracer()
+        self.port = port
+        self.path = Path(path) if path else None
+        self.interval = interval
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+
+    def start(self) -> "MetricsExporter":
+        if self.port:
+            self._server = ThreadingHTTPServer(("127.0.0.1", self.port), self._make_handler())
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+            logger.info(f"Cycle metrics on http://127.0.0.1:{self._server.server_address[1]}/metrics")
+        if self.path:
+            self._writer = threading.Thread(target=self._write_loop, daemon=True)
+            self._writer.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+            self._writer = None
+            self.write()
+
+    def write(self):
+        """Записать снимок в файл атомарно"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self.tracer.get_stats(), ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def _write_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                logger.warning(f"Cannot write metrics file: {e}")
+
+    def _make_handler(self):
+        tracer = self.tracer
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = tracer.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(tracer.get_stats(), ensure_ascii=False), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                payload = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
@@ -1,8 +1,16 @@
-"""PAD модель эмоций"""
+"""PAD модель эмоций
+
+Стимулы приходят из разных потоков (GUI-воркер, распознавание лица,
+Telegram), поэтому состояние не меняется на месте: стимулы кладутся в
+очередь, применяются пачкой в одном месте (flush), а читатели получают
+неизменяемый снимок PADState, опубликованный одной атомарной ссылкой.
+"""
+from collections import deque
 from enum import Enum
 from dataclasses import dataclass
-from typing import Dict, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import math
+import threading
 
 class EmotionType(Enum):
     NEUTRAL = "нейтрально"
@@ -14,7 +22,7 @@ class EmotionType(Enum):
     DISGUST = "отвращение"
     INTEREST = "интерес"
 
-@dataclass
+@dataclass(frozen=True)
 class PADState:
     pleasure: float = 0.0
     arousal: float = 0.0
@@ -33,34 +41,89 @@ class EmotionEngine:
     }
     
     def __init__(self):
-        self.pad = PADState()
         self.history = []
         self.decay_rate = 0.95
+        # Очередь стимулов: deque.append/popleft потокобезопасны и не блокируют
+        self._events: deque = deque()
+        self._apply_lock = threading.Lock()
+        self._pad = PADState()
+        self._listeners: List[Callable[[PADState], None]] = []
+    
+    def add_listener(self, callback: Callable[[PADState], None]):
+        """Уведомлять о каждом новом снимке PAD (вызывается под блокировкой применения)"""
+        self._listeners.append(callback)
+    
+    @property
+    def pad(self) -> PADState:
+        """Согласованный снимок PAD (применяет накопленные стимулы, если никто не занят этим)"""
+        self.flush(block=False)
+        return self._pad
+    
+    # ================== Производители ==================
     
     def update_pad(self, pleasure=None, arousal=None, dominance=None):
-        if pleasure is not None:
-            self.pad.pleasure = max(-1, min(1, pleasure))
-        if arousal is not None:
-            self.pad.arousal = max(-1, min(1, arousal))
-        if dominance is not None:
-            self.pad.dominance = max(-1, min(1, dominance))
+        self._events.append(("set", pleasure, arousal, dominance))
+        self.flush(block=False)
+    
+    def nudge(self, pleasure: float = 0.0, arousal: float = 0.0, dominance: float = 0.0):
+        """Сдвинуть PAD на дельту (вместо чтения-изменения-записи снаружи)"""
+        self._events.append(("add", pleasure, arousal, dominance))
+        self.flush(block=False)
     
     def apply_stimulus(self, emotion: EmotionType, intensity: float = 0.5):
         target = self.EMOTION_MAP.get(emotion, (0, 0, 0))
-        self.pad.pleasure += target[0] * intensity * 0.3
-        self.pad.arousal += target[1] * intensity * 0.3
-        self.pad.dominance += target[2] * intensity * 0.3
-        self.pad.pleasure = max(-1, min(1, self.pad.pleasure))
-        self.pad.arousal = max(-1, min(1, self.pad.arousal))
-        self.pad.dominance = max(-1, min(1, self.pad.dominance))
+        self.nudge(*(t * intensity * 0.3 for t in target))
     
     def decay(self):
-        self.pad.pleasure *= self.decay_rate
-        self.pad.arousal *= self.decay_rate
-        self.pad.dominance *= self.decay_rate
+        self._events.append(("scale", self.decay_rate, self.decay_rate, self.decay_rate))
+        self.flush(block=False)
+    
+    # ================== Применение ==================
     
-    def get_dominant_emotion(self) -> Tuple[EmotionType, float]:
-        current = (self.pad.pleasure, self.pad.arousal, self.pad.dominance)
+    def flush(self, block: bool = True) -> bool:
+        """Применить накопленные стимулы одной пачкой и опубликовать снимок.
+        
+        block=False — не ждать, если пачку уже применяет другой поток:
+        он применит и наши стимулы.
+        """
+        while self._events:
+            if not self._apply_lock.acquire(blocking=block):
+                return False
+            try:
+                self._apply_events()
+            finally:
+                self._apply_lock.release()
+            # Стимул мог прийти, пока блокировка была занята — тогда его
+            # владелец ничего не применил, и пачку повторяем мы
+        return True
+    
+    def _apply_events(self):
+        if not self._events:
+            return
+        p, a, d = self._pad.pleasure, self._pad.arousal, self._pad.dominance
+        while self._events:
+            kind, dp, da, dd = self._events.popleft()
+            if kind == "add":
+                p, a, d = p + dp, a + da, d + dd
+            elif kind == "scale":
+                p, a, d = p * dp, a * da, d * dd
+            else:
+                p = p if dp is None else dp
+                a = a if da is None else da
+                d = d if dd is None else dd
+            p, a, d = (max(-1, min(1, v)) for v in (p, a, d))
+        self._pad = PADState(p, a, d)
+        for callback in self._listeners:
+            callback(self._pad)
+    
+    def snapshot(self) -> PADState:
+        """Актуальный снимок PAD (ждёт применения своих стимулов)"""
+        self.flush()
+        return self._pad
+    
+    def get_dominant_emotion(self, pad: Optional[PADState] = None) -> Tuple[EmotionType, float]:
+        pad = pad or self.snapshot()
+        current = (pad.pleasure, pad.arousal, pad.dominance)
         best_emotion = EmotionType.NEUTRAL
         best_dist = float('inf')
         for emotion, target in self.EMOTION_MAP.items():
@@ -71,8 +134,20 @@ class EmotionEngine:
         confidence = max(0, 1 - best_dist/2)
         return best_emotion, confidence
     
-    def get_mood_description(self) -> str:
-        p, a, d = self.pad.pleasure, self.pad.arousal, self.pad.dominance
+    def to_dict(self) -> Dict[str, float]:
+        pad = self.snapshot()
+        return {
+            "pleasure": pad.pleasure,
+            "arousal": pad.arousal,
+            "dominance": pad.dominance,
+        }
+    
+    def load_dict(self, data: Dict[str, float]):
+        self.update_pad(**{k: data[k] for k in ("pleasure", "arousal", "dominance") if k in data})
+    
+    def get_mood_description(self, pad: Optional[PADState] = None) -> str:
+        pad = pad or self.snapshot()
+        p, a, d = pad.pleasure, pad.arousal, pad.dominance
         if p > 0.3 and a > 0.3:
             return "Энергичное и позитивное настроение"
         elif p > 0.3 and a < -0.3:
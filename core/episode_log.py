@@ -0,0 +1,232 @@
+"""Append-only журнал эпизодов
+
+Write-ahead JSONL лог: каждая запись — одна строка, добавление за O(1).
+Рядом лежит бинарный снапшот индекса смещений (`<log>.idx`), который
+периодически переписывается целиком. При открытии файл отображается в
+память (mmap), индекс читается из снапшота, досканируется только хвост,
+а записи декодируются лениво по обращению.
+
+Снапшот сверяется с журналом: в нём хранится CRC последней покрытой
+записи, и если журнал был переписан (compact) после снапшота — снапшот
+отбрасывается, смещения пересчитываются сканированием.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+_IDX_MAGIC = b"EPLG"
+_IDX_HEADER = struct.Struct("<4sIQQI")  # magic, version, count, covered_bytes, crc последней записи
+_IDX_VERSION = 2
+
+
+class EpisodeLog:
+    """Append-only журнал JSON-записей с ленивым чтением через mmap.
+
+    Args:
+        path: Путь к файлу журнала (JSONL).
+        snapshot_every: Через сколько добавлений переписывать снапшот индекса.
+        fsync: Делать fsync после каждой записи (надёжнее, но медленнее).
+    """
+
+    def __init__(self, path: Union[str, Path], snapshot_every: int = 1000, fsync: bool = False):
+        self.path = Path(path)
+        self.idx_path = self.path.with_name(self.path.name + ".idx")
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._offsets = array("Q")
+        self._end = 0
+        self._mmap: Optional[mmap.mmap] = None
+        self._read_fh = None
+        self._since_snapshot = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+        self._recover()
+        self._write_fh = open(self.path, "ab")
+
+    # ================== Открытие / восстановление ==================
+
+    def _recover(self):
+        """Восстановить индекс смещений: снапшот + досканирование хвоста."""
+        size = self.path.stat().st_size
+        self._map(size)
+        covered = self._load_index_snapshot(size)
+        pos = covered
+        while pos < size:
+            nl = self._mmap.find(b"\n", pos, size)
+            if nl < 0:
+                break
+            self._offsets.append(pos)
+            pos = nl + 1
+
+        if pos < size:
+            # Недописанная последняя строка (сбой во время записи) — отрезаем
+            logger.warning(f"Truncating torn record in {self.path} at {pos}")
+            self._unmap()
+            with open(self.path, "r+b") as f:
+                f.truncate(pos)
+            size = pos
+            self._map(size)
+        self._end = size
+
+    def _load_index_snapshot(self, size: int) -> int:
+        try:
+            with open(self.idx_path, "rb") as f:
+                header = f.read(_IDX_HEADER.size)
+                magic, version, count, covered, crc = _IDX_HEADER.unpack(header)
+                if magic != _IDX_MAGIC or version != _IDX_VERSION or covered > size:
+                    return 0
+                self._offsets.frombytes(f.read(count * self._offsets.itemsize))
+                if len(self._offsets) != count or self._last_crc(covered) != crc:
+                    # Снапшот не от этого файла (например, сбой посреди compact)
+                    del self._offsets[:]
+                    return 0
+                return covered
+        except (FileNotFoundError, struct.error):
+            return 0
+
+    def _last_crc(self, end: int) -> int:
+        """CRC последней записи, заканчивающейся на end (0 — записей нет)"""
+        if not self._offsets:
+            return 0 if end == 0 else -1
+        start = self._offsets[-1]
+        if start >= end or self._mmap is None or self._mmap[end - 1:end] != b"\n":
+            return -1
+        return zlib.crc32(self._mmap[start:end])
+
+    def _map(self, size: int):
+        if size == 0:
+            self._mmap = None
+            return
+        if self._read_fh is None:
+            self._read_fh = open(self.path, "rb")
+        self._mmap = mmap.mmap(self._read_fh.fileno(), size, access=mmap.ACCESS_READ)
+
+    def _unmap(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    # ================== Запись ==================
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Добавить запись в конец журнала. Возвращает её индекс."""
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self._lock:
+            self._write_fh.write(line)
+            self._write_fh.flush()
+            if self.fsync:
+                os.fsync(self._write_fh.fileno())
+            self._offsets.append(self._end)
+            self._end += len(line)
+            self._since_snapshot += 1
+            if self.snapshot_every and self._since_snapshot >= self.snapshot_every:
+                self.snapshot()
+            return len(self._offsets) - 1
+
+    def snapshot(self):
+        """Атомарно переписать снапшот индекса смещений."""
+        with self._lock:
+            tmp = self.idx_path.with_name(self.idx_path.name + ".tmp")
+            self._ensure_mapped()
+            crc = self._last_crc(self._end) & 0xFFFFFFFF
+            with open(tmp, "wb") as f:
+                f.write(_IDX_HEADER.pack(_IDX_MAGIC, _IDX_VERSION, len(self._offsets), self._end, crc))
+                self._offsets.tofile(f)
+            os.replace(tmp, self.idx_path)
+            self._since_snapshot = 0
+
+    def compact(self, keep_last: int):
+        """Переписать журнал, оставив только последние keep_last записей."""
+        with self._lock:
+            keep_last = max(0, min(keep_last, len(self._offsets)))
+            start = self._offsets[len(self._offsets) - keep_last] if keep_last else self._end
+            self._ensure_mapped()
+            data = self._mmap[start:self._end] if self._mmap is not None else b""
+
+            self._write_fh.close()
+            self._unmap()
+            if self._read_fh is not None:
+                self._read_fh.close()
+                self._read_fh = None
+
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            # Старый снапшот убираем до подмены: сбой между шагами оставит
+            # журнал без снапшота (полное сканирование), а не с чужим
+            self.idx_path.unlink(missing_ok=True)
+            os.replace(tmp, self.path)
+
+            self._offsets = array("Q", (off - start for off in self._offsets[len(self._offsets) - keep_last:]))
+            self._end = len(data)
+            self._map(self._end)
+            self._write_fh = open(self.path, "ab")
+            self.snapshot()
+
+    def offset(self, index: int) -> int:
+        """Смещение начала записи index в байтах (len(self) — конец журнала)"""
+        with self._lock:
+            return self._offsets[index] if index < len(self._offsets) else self._end
+
+    def truncate(self):
+        """Очистить журнал полностью."""
+        self.compact(0)
+
+    # ================== Чтение ==================
+
+    def _ensure_mapped(self):
+        mapped = len(self._mmap) if self._mmap is not None else 0
+        if mapped < self._end:
+            self._unmap()
+            self._map(self._end)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        with self._lock:
+            count = len(self._offsets)
+            if index < 0:
+                index += count
+            if not 0 <= index < count:
+                raise IndexError("episode log index out of range")
+            start = self._offsets[index]
+            end = self._offsets[index + 1] if index + 1 < count else self._end
+            if end > (len(self._mmap) if self._mmap is not None else 0):
+                self._ensure_mapped()
+            return json.loads(self._mmap[start:end])
+
+    def tail(self, n: int) -> List[Dict[str, Any]]:
+        """Последние n записей (декодируются только они)."""
+        count = len(self)
+        return [self[i] for i in range(max(0, count - n), count)]
+
+    def iter_from(self, start: int = 0) -> Iterator[Dict[str, Any]]:
+        for i in range(start, len(self)):
+            yield self[i]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.iter_from(0)
+
+    def close(self):
+        with self._lock:
+            if self._since_snapshot:
+                self.snapshot()
+            self._write_fh.close()
+            self._unmap()
+            if self._read_fh is not None:
+                self._read_fh.close()
+                self._read_fh = None
@@ -0,0 +1,663 @@
+"""Эпизодическая память с индексированным поиском
+
+Хранилище эпизодов для CognitiveCycle: инкрементальный инвертированный
+индекс BM25 по токенам (русский/английский) и опциональный векторный
+индекс на NumPy для переранжирования кандидатов. Может опираться на
+EpisodeLog, чтобы эпизоды переживали перезапуск процесса.
+
+Рядом с журналом периодически пишется снимок индекса (`<log>.state`):
+при старте он загружается целиком, а из журнала индексируется только
+хвост, дописанный после снимка.
+"""
+import bisect
+import heapq
+import logging
+import math
+import os
+import pickle
+import re
+import threading
+import time
+import zlib
+from array import array
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[0-9a-zа-я]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Разбить текст на нормализованные токены."""
+    return TOKEN_RE.findall(text.lower().replace("ё", "е"))
+
+
+class EpisodeStore:
+    """Интерфейс хранилища эпизодов, которое можно подключить к CognitiveCycle."""
+
+    def add(self, episode: Dict[str, Any]) -> int:
+        raise NotImplementedError
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def recent(self, n: int = 5) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class BM25Index:
+    """Инкрементальный инвертированный индекс с ранжированием BM25.
+
+    Постинги — компактные массивы (array("I")) в порядке добавления, то
+    есть по возрастанию id. Поиск точный и отсекает работу по верхним
+    границам вклада термов (MaxScore): термы идут от редких к частым, и как
+    только сумма границ оставшихся термов не дотягивает до k-го скора,
+    новые документы в top-k уже не попадут — у частых термов досчитываются
+    только кандидаты, бинарным поиском по постингу. Длинные постинги
+    считаются векторно на NumPy, если он установлен.
+
+    scan_budget (по умолчанию выключен) ограничивает число просматриваемых
+    постингов на запрос: у частых термов смотрится только хвост, то есть
+    самые свежие документы. Время запроса ограничено, но top-k —
+    приближённый и смещён к новым эпизодам.
+    """
+
+    # С какой суммы df по термам запроса считать на NumPy
+    VECTOR_MIN_POSTINGS = 4096
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, scan_budget: Optional[int] = None):
+        self.k1 = k1
+        self.b = b
+        self.scan_budget = scan_budget
+        # term -> (ids, tfs); после load_state — номер слота в _frozen,
+        # массивы вырезаются из него при первом обращении к терму
+        self._postings: Dict[str, Any] = {}
+        self._frozen: Optional[tuple] = None
+        # Длины и признак «живой» по id, начиная с _first (уплотнение сдвигает)
+        self._first = 0
+        self._doc_len = array("I")
+        self._alive = bytearray()
+        self._total_len = 0
+        self._live = 0
+        self._deleted = 0
+        try:
+            import numpy
+            self._np = numpy
+        except ImportError:
+            self._np = None
+
+    def __len__(self) -> int:
+        return self._live
+
+    def add(self, doc_id: int, tokens: List[str]):
+        index = doc_id - self._first
+        if index < 0:
+            raise ValueError(f"doc_id {doc_id} is below the compacted range")
+        if index >= len(self._doc_len):
+            grow = index + 1 - len(self._doc_len)
+            self._doc_len.frombytes(bytes(grow * self._doc_len.itemsize))
+            self._alive.extend(bytes(grow))
+        tf: Dict[str, int] = defaultdict(int)
+        for tok in tokens:
+            tf[tok] += 1
+        for term, count in tf.items():
+            posting = self._posting(term)
+            if posting is None:
+                posting = self._postings[term] = (array("I"), array("I"))
+            posting[0].append(doc_id)
+            posting[1].append(count)
+        self._doc_len[index] = len(tokens)
+        self._alive[index] = 1
+        self._total_len += len(tokens)
+        self._live += 1
+
+    def _posting(self, term: str) -> Optional[tuple]:
+        posting = self._postings.get(term)
+        if posting.__class__ is int:
+            ids, tfs, starts = self._frozen
+            lo, hi = starts[posting], starts[posting + 1]
+            posting = self._postings[term] = (ids[lo:hi], tfs[lo:hi])
+        return posting
+
+    def remove(self, doc_id: int):
+        index = doc_id - self._first
+        if not 0 <= index < len(self._alive) or not self._alive[index]:
+            return
+        self._alive[index] = 0
+        self._total_len -= self._doc_len[index]
+        self._live -= 1
+        self._deleted += 1
+
+    def search(self, tokens: List[str], k: int = 5) -> List[tuple]:
+        """Вернуть [(score, doc_id), ...] по убыванию релевантности."""
+        if not self._live or not tokens:
+            return []
+        n = self._live
+        terms = []
+        for posting in map(self._posting, set(tokens)):
+            if posting:
+                df = len(posting[0])
+                # df может включать ещё не уплотнённые удалённые документы
+                live_df = min(df, n)
+                terms.append((df, math.log(1.0 + (n - live_df + 0.5) / (live_df + 0.5)), posting))
+        terms.sort(key=lambda item: item[0])
+        # Вклад терма меньше idf * (k1 + 1); rest[i] — граница для термов i..
+        rest = [0.0] * (len(terms) + 1)
+        for i in range(len(terms) - 1, -1, -1):
+            rest[i] = rest[i + 1] + terms[i][1] * (self.k1 + 1)
+
+        if (self._np is not None and self.scan_budget is None
+                and sum(item[0] for item in terms) >= self.VECTOR_MIN_POSTINGS):
+            return self._search_vectorized(terms, rest, k)
+        return self._search_scalar(terms, rest, k)
+
+    def _search_scalar(self, terms: list, rest: List[float], k: int) -> List[tuple]:
+        avg_len = self._total_len / self._live
+        k1, b = self.k1, self.b
+        first, doc_len, alive = self._first, self._doc_len, self._alive
+        scores: Dict[int, float] = defaultdict(float)
+        budget = self.scan_budget
+        for i, (df, idf, (ids, tfs)) in enumerate(terms):
+            if len(scores) >= k:
+                threshold = heapq.nlargest(k, scores.values())[-1]
+                if rest[i] < threshold:
+                    # Новые документы в top-k не попадут; кандидаты, которым
+                    # не хватит и всех оставшихся термов, отбрасываются
+                    scores = defaultdict(float, {d: s for d, s in scores.items() if s + rest[i] >= threshold})
+                    for doc_id in scores:
+                        j = bisect.bisect_left(ids, doc_id)
+                        if j < df and ids[j] == doc_id:
+                            tf = tfs[j]
+                            scores[doc_id] += idf * tf * (k1 + 1) / (
+                                tf + k1 * (1 - b + b * doc_len[doc_id - first] / avg_len))
+                    continue
+            start = 0
+            if budget is not None:
+                # Делим остаток бюджета поровну между оставшимися термами
+                share = max(budget // (len(terms) - i), 1)
+                start = max(0, df - share)
+                budget -= df - start
+            for j in range(start, df):
+                doc_id = ids[j]
+                if not alive[doc_id - first]:
+                    continue
+                tf = tfs[j]
+                scores[doc_id] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_len[doc_id - first] / avg_len))
+
+        return heapq.nlargest(k, ((s, d) for d, s in scores.items()))
+
+    def _search_vectorized(self, terms: list, rest: List[float], k: int) -> List[tuple]:
+        """Тот же MaxScore на NumPy: плотный массив скоров по id."""
+        np = self._np
+        avg_len = self._total_len / self._live
+        k1, b = self.k1, self.b
+        first = self._first
+        # Копии, а не представления: массивы индекса должны оставаться расширяемыми
+        doc_len = np.frombuffer(self._doc_len.tobytes(), dtype=np.uint32)
+        alive = np.frombuffer(bytes(self._alive), dtype=np.uint8)
+        scores = np.zeros(len(doc_len))
+        candidates = None
+        for i, (df, idf, (ids, tfs)) in enumerate(terms):
+            ids = np.frombuffer(ids.tobytes(), dtype=np.uint32)
+            tfs = np.frombuffer(tfs.tobytes(), dtype=np.uint32).astype(np.float64)
+            if candidates is None and i:
+                threshold = -np.partition(-scores, k - 1)[k - 1] if len(scores) >= k else 0.0
+                if threshold > 0 and rest[i] < threshold:
+                    candidates = np.flatnonzero(scores + rest[i] >= threshold)
+            # Бинарный поиск окупается, только когда кандидатов заметно меньше df
+            if candidates is not None and len(candidates) * 8 < df:
+                pos = np.searchsorted(ids, candidates + first)
+                hit = pos < df
+                hit[hit] = ids[pos[hit]] == candidates[hit] + first
+                pos = pos[hit]
+                ids, tfs = ids[pos], tfs[pos]
+            index = ids.astype(np.int64) - first
+            # Удалённые получают 0, чтобы не завышать порог отсечения
+            scores[index] += alive[index] * idf * tfs * (k1 + 1) / (
+                tfs + k1 * (1 - b + b * doc_len[index] / avg_len))
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return sorted(((float(scores[i]), int(i) + first) for i in top if scores[i] > 0), reverse=True)
+
+    @property
+    def deleted_count(self) -> int:
+        return self._deleted
+
+    def compact(self):
+        """Физически убрать удалённые документы из постингов."""
+        first, alive = self._first, self._alive
+        for term in list(self._postings):
+            ids, tfs = self._posting(term)
+            kept_ids, kept_tfs = array("I"), array("I")
+            for d, t in zip(ids, tfs):
+                if alive[d - first]:
+                    kept_ids.append(d)
+                    kept_tfs.append(t)
+            if kept_ids:
+                self._postings[term] = (kept_ids, kept_tfs)
+            else:
+                del self._postings[term]
+        # Вытесняются старейшие: срезаем начало таблиц длин
+        shift = alive.find(1)
+        if shift < 0:
+            shift = len(alive)
+        del self._doc_len[:shift]
+        del self._alive[:shift]
+        self._first += shift
+        self._deleted = 0
+        self._frozen = None
+
+    def export_state(self) -> Dict[str, Any]:
+        """Плоский снимок индекса: термы одной строкой, постинги массивами."""
+        terms, ids, tfs, starts = [], array("I"), array("I"), array("I")
+        for term in self._postings:
+            posting = self._posting(term)
+            terms.append(term)
+            starts.append(len(ids))
+            ids += posting[0]
+            tfs += posting[1]
+        starts.append(len(ids))
+        return {"terms": "\n".join(terms), "ids": ids, "tfs": tfs, "starts": starts,
+                "first": self._first, "doc_len": array("I", self._doc_len),
+                "alive": bytes(self._alive), "total_len": self._total_len,
+                "live": self._live, "deleted": self._deleted}
+
+    def load_state(self, state: Dict[str, Any]):
+        """Восстановить индекс из export_state; постинги не разворачиваются."""
+        terms = state["terms"].split("\n") if state["terms"] else []
+        self._postings = dict(zip(terms, range(len(terms))))
+        self._frozen = (state["ids"], state["tfs"], state["starts"])
+        self._first = state["first"]
+        self._doc_len = state["doc_len"]
+        self._alive = bytearray(state["alive"])
+        self._total_len = state["total_len"]
+        self._live = state["live"]
+        self._deleted = state["deleted"]
+
+    def clear(self):
+        self._postings.clear()
+        self._frozen = None
+        self._first = 0
+        self._doc_len = array("I")
+        self._alive = bytearray()
+        self._total_len = 0
+        self._live = 0
+        self._deleted = 0
+
+
+def hashing_embedding(text: str, dim: int = 256):
+    """Дешёвый эмбеддинг без модели: hashing trick по токенам и триграммам."""
+    import numpy as np
+
+    vec = np.zeros(dim, dtype=np.float32)
+    for tok in tokenize(text):
+        vec[zlib.crc32(tok.encode("utf-8")) % dim] += 1.0
+        padded = f"#{tok}#"
+        for i in range(len(padded) - 2):
+            vec[zlib.crc32(padded[i:i + 3].encode("utf-8")) % dim] += 0.5
+    norm = float(np.linalg.norm(vec))
+    if norm > 0:
+        vec /= norm
+    return vec
+
+
+class VectorIndex:
+    """Плотный векторный индекс на NumPy (косинусная близость).
+
+    Строка матрицы — doc_id - _first. Удалённые строки обнуляются, а
+    compact() срезает вытесненное начало, как таблицы длин в BM25Index,
+    так что при ограничении числа эпизодов матрица остаётся ограниченной.
+    """
+
+    def __init__(self, embed_fn: Callable[[str], Any] = None, dim: int = 256):
+        import numpy as np
+
+        self._np = np
+        self.dim = dim
+        self.embed_fn = embed_fn or (lambda text: hashing_embedding(text, dim))
+        self._matrix = np.zeros((1024, dim), dtype=np.float32)
+        self._first = 0
+        self._size = 0  # Занятых строк
+
+    def add(self, doc_id: int, text: str):
+        np = self._np
+        row = doc_id - self._first
+        if row < 0:
+            raise ValueError(f"doc_id {doc_id} is below the compacted range")
+        if row >= len(self._matrix):
+            grown = np.zeros((max(row + 1, len(self._matrix) * 2), self.dim), dtype=np.float32)
+            grown[:len(self._matrix)] = self._matrix
+            self._matrix = grown
+        self._matrix[row] = self.embed_fn(text)
+        self._size = max(self._size, row + 1)
+
+    def remove(self, doc_id: int):
+        row = doc_id - self._first
+        if 0 <= row < self._size:
+            self._matrix[row] = 0.0
+
+    def compact(self, first: int):
+        """Выбросить строки документов с id меньше first."""
+        np = self._np
+        shift = min(max(first - self._first, 0), self._size)
+        if not shift:
+            return
+        kept = self._size - shift
+        matrix = np.zeros((max(1024, 2 * kept), self.dim), dtype=np.float32)
+        matrix[:kept] = self._matrix[shift:self._size]
+        self._matrix = matrix
+        self._first += shift
+        self._size = kept
+
+    def similarity(self, query_vec, doc_ids: List[int]):
+        return self._matrix[[d - self._first for d in doc_ids]] @ query_vec
+
+    def search(self, query_vec, k: int = 5) -> List[tuple]:
+        np = self._np
+        if not self._size:
+            return []
+        scores = self._matrix[:self._size] @ query_vec
+        k = min(k, self._size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return sorted(((float(scores[i]), int(i) + self._first) for i in top), reverse=True)
+
+    def export_state(self) -> Dict[str, Any]:
+        return {"first": self._first, "rows": self._matrix[:self._size].copy()}
+
+    def load_state(self, state: Dict[str, Any]):
+        np = self._np
+        rows = state["rows"]
+        self._matrix = np.zeros((max(1024, 2 * len(rows)), self.dim), dtype=np.float32)
+        self._matrix[:len(rows)] = rows
+        self._first = state["first"]
+        self._size = len(rows)
+
+    def clear(self):
+        self._matrix = self._np.zeros((1024, self.dim), dtype=np.float32)
+        self._first = 0
+        self._size = 0
+
+
+class EpisodicMemory(EpisodeStore):
+    """Эпизодическая память с BM25 и опциональным векторным индексом.
+
+    Args:
+        max_episodes: Ограничение числа эпизодов (None — без ограничения).
+            При переполнении вытесняются самые старые; журнал уплотняется,
+            когда в нём накапливается вдвое больше записей.
+        use_vectors: Включить векторный индекс (нужен NumPy).
+        embed_fn: Функция эмбеддинга текста (по умолчанию hashing trick).
+        rerank_candidates: Сколько кандидатов BM25 переранжировать векторами.
+        log: Журнал EpisodeLog для персистентности. Эпизоды из журнала
+            индексируются лениво — при первом поиске, а не при старте.
+        state_every: Через сколько добавлений переписывать снимок индекса
+            (в фоне; 0 — только по save_state()).
+        scan_budget: Лимит просмотра постингов на запрос (None — точный
+            поиск); см. BM25Index.
+    """
+
+    PERSISTED_FIELDS = ("id", "input", "output", "retrieved", "timestamp")
+    STATE_VERSION = 3
+
+    def __init__(self, max_episodes: Optional[int] = None, use_vectors: bool = False,
+                 embed_fn: Callable[[str], Any] = None, rerank_candidates: int = 50,
+                 log=None, state_every: int = 10000, scan_budget: Optional[int] = None):
+        self.max_episodes = max_episodes
+        self.rerank_candidates = rerank_candidates
+        self.log = log
+        self.state_every = state_every
+        self.state_path = log.path.with_name(log.path.name + ".state") if log is not None else None
+        self._lock = threading.RLock()
+        self._state_lock = threading.Lock()
+        self._state_thread: Optional[threading.Thread] = None
+        self._since_state = 0
+        self._state_stale = False  # Журнал уплотнён, снимок на диске не сходится с ним
+        # Эпизоды, добавленные в этом процессе; загруженные из журнала
+        # декодируются по обращению
+        self._episodes: Dict[int, Dict[str, Any]] = {}
+        self._next_id = 0
+        self._oldest_id = 0
+        self._bm25 = BM25Index(scan_budget=scan_budget)
+        self._vectors: Optional[VectorIndex] = None
+        if use_vectors:
+            try:
+                self._vectors = VectorIndex(embed_fn)
+            except ImportError:
+                self._vectors = None
+
+        # id первой записи журнала (после уплотнения журнал начинается не с 0)
+        self._log_base = 0
+        # Диапазон id эпизодов, лежащих в журнале, но ещё не проиндексированных
+        self._unloaded: Optional[tuple] = None
+        if log is not None and len(log):
+            self._log_base = log[0].get("id", 0)
+            total = self._log_base + len(log)
+            start = max(self._log_base, total - max_episodes) if max_episodes else self._log_base
+            self._next_id = total
+            self._oldest_id = start
+            self._unloaded = (start, total)
+
+    @staticmethod
+    def episode_text(episode: Dict[str, Any]) -> str:
+        return f"{episode.get('input', '')} {episode.get('output', '')}"
+
+    def _ensure_loaded(self):
+        """Проиндексировать эпизоды из журнала (однократно, по требованию)."""
+        if self._unloaded is None:
+            return
+        with self._lock:
+            if self._unloaded is None:
+                return
+            start, end = self._unloaded
+            for doc_id in range(self._load_state(start), end):
+                episode = self.log[doc_id - self._log_base]
+                episode["id"] = doc_id
+                self._index(doc_id, episode, keep=False)
+            self._unloaded = None
+
+    def _load_state(self, start: int) -> int:
+        """Загрузить снимок индекса; вернуть первый id, которого в нём нет."""
+        try:
+            with open(self.state_path, "rb") as f:
+                state = pickle.load(f)
+            count = state["count"]
+            if (state["version"] != self.STATE_VERSION or state["base"] != self._log_base
+                    or count > len(self.log) or self.log.offset(count) != state["end"]
+                    or (state["vectors"] is None) != (self._vectors is None)):
+                return start
+        except FileNotFoundError:
+            return start
+        except Exception as e:
+            logger.warning(f"Ignoring broken index state {self.state_path}: {e}")
+            return start
+
+        self._bm25.load_state(state["bm25"])
+        if self._vectors is not None:
+            self._vectors.load_state(state["vectors"])
+        # Снимок мог быть сделан при большем max_episodes
+        for doc_id in range(state["oldest"], start):
+            self._bm25.remove(doc_id)
+            if self._vectors is not None:
+                self._vectors.remove(doc_id)
+        self._oldest_id = max(start, state["oldest"])
+        return max(start, self._log_base + count)
+
+    def save_state(self):
+        """Записать снимок индекса рядом с журналом (атомарно)."""
+        if self.log is None:
+            return
+        with self._state_lock:
+            with self._lock:
+                if self._unloaded is not None or (
+                        not self._since_state and not self._state_stale and self.state_path.exists()):
+                    return  # Индекс не построен или не менялся с прошлого снимка
+                count = self._next_id - self._log_base
+                state = {
+                    "version": self.STATE_VERSION,
+                    "base": self._log_base,
+                    "count": count,
+                    "end": self.log.offset(count),
+                    "oldest": self._oldest_id,
+                    "bm25": self._bm25.export_state(),
+                    "vectors": self._vectors.export_state() if self._vectors is not None else None,
+                }
+                self._since_state = 0
+                self._state_stale = False
+            tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.state_path)
+
+    def _save_state_background(self):
+        def run():
+            try:
+                self.save_state()
+                while self._state_stale:  # Журнал уплотнили, пока писали снимок
+                    self.save_state()
+            except OSError as e:
+                logger.warning(f"Cannot write index state {self.state_path}: {e}")
+
+        if self._state_thread is None or not self._state_thread.is_alive():
+            self._state_thread = threading.Thread(target=run, daemon=True)
+            self._state_thread.start()
+
+    def warm_up(self):
+        """Построить индекс по журналу в фоне, не дожидаясь первого поиска."""
+        if self._unloaded is not None:
+            threading.Thread(target=self._ensure_loaded, daemon=True).start()
+
+    def _index(self, doc_id: int, episode: Dict[str, Any], keep: bool = True):
+        if keep:
+            self._episodes[doc_id] = episode
+        text = self.episode_text(episode)
+        self._bm25.add(doc_id, tokenize(text))
+        if self._vectors is not None:
+            self._vectors.add(doc_id, text)
+
+    def add(self, episode: Dict[str, Any]) -> int:
+        if self.max_episodes is not None:
+            self._ensure_loaded()
+        with self._lock:
+            return self._add_locked(episode)
+
+    def _add_locked(self, episode: Dict[str, Any]) -> int:
+        doc_id = self._next_id
+        self._next_id += 1
+        episode.setdefault("id", doc_id)
+        episode.setdefault("timestamp", time.time())
+        self._index(doc_id, episode)
+
+        if self.max_episodes is not None:
+            while len(self) > self.max_episodes:
+                self._evict_oldest()
+
+        if self.log is not None:
+            self.log.append({k: episode[k] for k in self.PERSISTED_FIELDS if k in episode})
+            self._since_state += 1
+            if self.max_episodes is not None and len(self.log) > 2 * max(self.max_episodes, 1024):
+                self._compact_log()
+            elif self.state_every and self._since_state >= self.state_every:
+                self._save_state_background()
+        return doc_id
+
+    # Совместимость со старым self.memory.append(...)
+    append = add
+
+    def _compact_log(self):
+        """Оставить в журнале только живые эпизоды; старый снимок индекса
+        после этого не сходится с журналом по base и будет переписан."""
+        self.log.compact(self._next_id - self._oldest_id)
+        self._log_base = self._oldest_id
+        self._state_stale = True
+        self._save_state_background()
+
+    def _evict_oldest(self):
+        doc_id = self._oldest_id
+        self._episodes.pop(doc_id, None)
+        self._bm25.remove(doc_id)
+        if self._vectors is not None:
+            self._vectors.remove(doc_id)
+        self._oldest_id += 1
+
+        # Если накопилось много удалённых — уплотняем постинги
+        if self._bm25.deleted_count > max(1024, len(self)):
+            self._bm25.compact()
+            if self._vectors is not None:
+                self._vectors.compact(self._oldest_id)
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Top-k релевантных эпизодов для запроса."""
+        self._ensure_loaded()
+        with self._lock:
+            return self._search_locked(query, k)
+
+    def _search_locked(self, query: str, k: int) -> List[Dict[str, Any]]:
+        tokens = tokenize(query)
+        if self._vectors is None:
+            hits = self._bm25.search(tokens, k)
+            return [self.get(doc_id) for _, doc_id in hits]
+
+        candidates = self._bm25.search(tokens, max(k, self.rerank_candidates))
+        query_vec = self._vectors.embed_fn(query)
+        if not candidates:
+            hits = self._vectors.search(query_vec, k)
+            return [self.get(d) for s, d in hits if s > 0 and self._oldest_id <= d < self._next_id]
+
+        doc_ids = [d for _, d in candidates]
+        top_bm25 = candidates[0][0] or 1.0
+        sims = self._vectors.similarity(query_vec, doc_ids)
+        # Гибридный скор: нормированный BM25 + косинусная близость
+        ranked = sorted(
+            ((s / top_bm25 + float(sim), d) for (s, d), sim in zip(candidates, sims)),
+            reverse=True,
+        )
+        return [self.get(d) for _, d in ranked[:k]]
+
+    def recent(self, n: int = 5) -> List[Dict[str, Any]]:
+        result = []
+        doc_id = self._next_id - 1
+        while doc_id >= self._oldest_id and len(result) < n:
+            episode = self.get(doc_id)
+            if episode is not None:
+                result.append(episode)
+            doc_id -= 1
+        result.reverse()
+        return result
+
+    def get(self, doc_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            episode = self._episodes.get(doc_id)
+            if episode is None and self.log is not None and self._oldest_id <= doc_id < self._next_id:
+                episode = self.log[doc_id - self._log_base]
+                episode["id"] = doc_id
+            return episode
+
+    def clear(self):
+        with self._lock:
+            self._episodes.clear()
+            self._bm25.clear()
+            if self._vectors is not None:
+                self._vectors.clear()
+            self._next_id = 0
+            self._oldest_id = 0
+            self._log_base = 0
+            self._unloaded = None
+            if self.log is not None:
+                self.log.truncate()
+                self.state_path.unlink(missing_ok=True)
+
+    def __len__(self) -> int:
+        return self._next_id - self._oldest_id
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        self._ensure_loaded()
+        with self._lock:
+            return iter([self.get(d) for d in range(self._oldest_id, self._next_id)])
@@ -0,0 +1,55 @@
+"""Бэкенд LLM для CognitiveCycle
+
+Цикл говорит с моделью через OpenAI-совместимый клиент; бэкенд решает,
+куда этот клиент смотрит: облачный OpenAI или локальный сервер
+(см. modules.local_llm). Бэкенд владеет жизненным циклом сервера и
+общим транспортом (core.llm_transport): одни клиенты с пулом соединений,
+повторами и предохранителем на все сессии.
+"""
+import threading
+from typing import Optional, Tuple
+
+from .llm_transport import LLMTransport, TransportConfig
+
+
+class LLMBackend:
+    """Удалённый OpenAI-совместимый API"""
+    name = "openai"
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, model: str = "gpt-4o-mini",
+                 transport_config: TransportConfig = None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.transport_config = transport_config or TransportConfig()
+        self._transport: Optional[LLMTransport] = None
+        self._transport_lock = threading.Lock()
+
+    def start(self) -> "LLMBackend":
+        return self
+
+    def stop(self):
+        pass
+
+    def create_clients(self) -> Tuple[object, object]:
+        """(OpenAI, AsyncOpenAI) клиенты, смотрящие на этот бэкенд.
+
+        Повторы SDK выключены: их делает LLMTransport с общим дедлайном.
+        """
+        from openai import OpenAI, AsyncOpenAI
+        options = {"api_key": self.api_key, "base_url": self.base_url,
+                   "timeout": self.transport_config.timeout, "max_retries": 0}
+        return OpenAI(**options), AsyncOpenAI(**options)
+
+    def get_transport(self) -> LLMTransport:
+        """Общий транспорт бэкенда (создаётся один раз)"""
+        with self._transport_lock:
+            if self._transport is None:
+                self._transport = LLMTransport(*self.create_clients(), self.transport_config)
+            return self._transport
+
+    def get_status(self) -> dict:
+        status = {"backend": self.name, "model": self.model, "url": self.base_url}
+        if self._transport is not None:
+            status["transport"] = self._transport.get_stats()
+        return status
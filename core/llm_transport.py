@@ -0,0 +1,380 @@
+"""Устойчивый транспорт к LLM: пул соединений, повторы, предохранитель, хеджирование
+
+Один LLMTransport на бэкенд: его клиенты (и их пул keep-alive соединений)
+делят все сессии. Каждый запрос:
+  * ограничен дедлайном — общим на все попытки, каждая попытка получает
+    таймаут не больше остатка;
+  * повторяется при сетевых ошибках, 408/429/5xx с экспоненциальной
+    паузой и полным джиттером, но только пока не пришёл первый токен;
+  * проходит через предохранитель: после серии неудач запросы какое-то
+    время не отправляются вовсе, и цикл сразу отвечает без LLM;
+  * по желанию хеджируется: если первый токен не пришёл за p95 недавних
+    задержек, уходит второй такой же запрос, побеждает первый ответивший,
+    проигравший закрывается.
+Неудача до первого токена поднимает LLMUnavailable.
+"""
+import asyncio
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+@dataclass
+class TransportConfig:
+    """Таймауты и политика повторов (секунды)"""
+    timeout: float = field(default_factory=lambda: float(os.getenv("LLM_TIMEOUT", "30")))
+    deadline: float = field(default_factory=lambda: float(os.getenv("LLM_DEADLINE", "45")))
+    max_retries: int = field(default_factory=lambda: int(os.getenv("LLM_RETRIES", "2")))
+    backoff_base: float = 0.25
+    backoff_cap: float = 4.0
+    max_concurrency: int = field(default_factory=lambda: int(os.getenv("LLM_MAX_CONCURRENCY", "8")))
+    breaker_threshold: int = 5  # неудач подряд до размыкания
+    breaker_cooldown: float = 30.0
+    hedge: bool = field(default_factory=lambda: _env_bool("LLM_HEDGE", "false"))
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20
+    hedge_min_delay: float = 0.05
+
+
+class LLMUnavailable(Exception):
+    """LLM не ответил: предохранитель разомкнут или попытки исчерпаны"""
+
+
+class CircuitBreaker:
+    """Предохранитель: closed → open (после threshold неудач) → half-open (одна проба)"""
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+        self._probe = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probe:
+                self._probe = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probe = False
+
+    def release_probe(self):
+        """Освободить пробу half-open, не меняя состояния"""
+        with self._lock:
+            self._probe = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probe or self.failures >= self.threshold:
+                if self.opened_at is None or self._probe:
+                    self.trips += 1
+                self.opened_at = time.monotonic()
+                self._probe = False
+
+
+def _retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    try:
+        from openai import APIConnectionError
+    except ImportError:
+        return isinstance(error, (OSError, TimeoutError))
+    return isinstance(error, (APIConnectionError, OSError, TimeoutError))
+
+
+def _delta(chunk) -> Optional[str]:
+    return chunk.choices[0].delta.content if chunk.choices else None
+
+
+# Открытый стрим: (объект стрима, итератор чанков, первая непустая дельта)
+Opened = Tuple[Any, Any, Optional[str]]
+
+
+class LLMTransport:
+    """Вызовы chat.completions поверх общих клиентов бэкенда"""
+
+    def __init__(self, client, async_client=None, config: TransportConfig = None):
+        self.client = client
+        self.async_client = async_client
+        self.config = config or TransportConfig()
+        self.breaker = CircuitBreaker(self.config.breaker_threshold, self.config.breaker_cooldown)
+        self._slots = threading.BoundedSemaphore(self.config.max_concurrency)
+        self._aslots: Dict[int, asyncio.Semaphore] = {}
+        self._latencies: deque = deque(maxlen=200)  # время до первого токена, секунды
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "rejected": 0,
+                      "hedged": 0, "hedge_wins": 0}
+
+    # ================== Синхронный путь ==================
+
+    def stream(self, **params) -> Iterator[str]:
+        """Дельты ответа. LLMUnavailable — если ответ не начался."""
+        self._count("requests")
+        with self._slots:
+            stream, chunks, first = self._open_with_retries(params)
+            try:
+                if first:
+                    yield first
+                for chunk in chunks:
+                    delta = _delta(chunk)
+                    if delta:
+                        yield delta
+            finally:
+                stream.close()
+
+    def complete(self, **params) -> str:
+        """Ответ целиком (без стрима), с теми же повторами и предохранителем."""
+        self._count("requests")
+        deadline = time.monotonic() + self.config.deadline
+        with self._slots:
+            for attempt, timeout in self._attempts(deadline):
+                try:
+                    response = self.client.chat.completions.create(timeout=timeout, **params)
+                except Exception as e:
+                    time.sleep(self._failed(e, attempt, deadline))
+                    continue
+                self.breaker.record_success()
+                return response.choices[0].message.content or ""
+        raise AssertionError("unreachable")
+
+    def _open_with_retries(self, params: dict) -> Opened:
+        deadline = time.monotonic() + self.config.deadline
+        for attempt, timeout in self._attempts(deadline):
+            try:
+                opened = self._open_hedged(params, timeout)
+            except Exception as e:
+                time.sleep(self._failed(e, attempt, deadline))
+                continue
+            self.breaker.record_success()
+            return opened
+        raise AssertionError("unreachable")
+
+    def _open(self, params: dict, timeout: float) -> Opened:
+        """Отправить запрос и дождаться первой непустой дельты"""
+        started = time.monotonic()
+        stream = self.client.chat.completions.create(stream=True, timeout=timeout, **params)
+        chunks = iter(stream)
+        first = None
+        try:
+            for chunk in chunks:
+                first = _delta(chunk)
+                if first:
+                    break
+        except BaseException:
+            stream.close()
+            raise
+        self._record_latency(time.monotonic() - started)
+        return stream, chunks, first
+
+    def _open_hedged(self, params: dict, timeout: float) -> Opened:
+        delay = self._hedge_delay()
+        if delay is None:
+            return self._open(params, timeout)
+        results: queue.Queue = queue.Queue()
+
+        def attempt(tag: str):
+            try:
+                results.put((tag, self._open(params, timeout), None))
+            except Exception as e:
+                results.put((tag, None, e))
+
+        threading.Thread(target=attempt, args=("primary",), daemon=True).start()
+        try:
+            tag, opened, error = results.get(timeout=delay)
+        except queue.Empty:
+            self._count("hedged")
+            threading.Thread(target=attempt, args=("hedge",), daemon=True).start()
+            tag, opened, error = results.get()
+            if error is not None:  # первый ответивший упал — ждём второй
+                tag, opened, error = results.get()
+            else:
+                threading.Thread(target=self._discard, args=(results,), daemon=True).start()
+        if error is not None:
+            raise error
+        if tag == "hedge":
+            self._count("hedge_wins")
+        return opened
+
+    @staticmethod
+    def _discard(results: queue.Queue):
+        """Закрыть проигравший запрос, когда он ответит"""
+        _, opened, _ = results.get()
+        if opened is not None:
+            opened[0].close()
+
+    # ================== Асинхронный путь ==================
+
+    async def astream(self, **params) -> AsyncIterator[str]:
+        """Асинхронный вариант stream через AsyncOpenAI."""
+        self._count("requests")
+        async with self._async_slots():
+            stream, chunks, first = await self._aopen_with_retries(params)
+            try:
+                if first:
+                    yield first
+                async for chunk in chunks:
+                    delta = _delta(chunk)
+                    if delta:
+                        yield delta
+            finally:
+                await stream.close()
+
+    async def _aopen_with_retries(self, params: dict) -> Opened:
+        deadline = time.monotonic() + self.config.deadline
+        for attempt, timeout in self._attempts(deadline):
+            try:
+                opened = await self._aopen_hedged(params, timeout)
+            except Exception as e:
+                await asyncio.sleep(self._failed(e, attempt, deadline))
+                continue
+            self.breaker.record_success()
+            return opened
+        raise AssertionError("unreachable")
+
+    async def _aopen(self, params: dict, timeout: float) -> Opened:
+        started = time.monotonic()
+        stream = await self.async_client.chat.completions.create(stream=True, timeout=timeout, **params)
+        chunks = stream.__aiter__()
+        first = None
+        try:
+            async for chunk in chunks:
+                first = _delta(chunk)
+                if first:
+                    break
+        except BaseException:
+            await stream.close()
+            raise
+        self._record_latency(time.monotonic() - started)
+        return stream, chunks, first
+
+    async def _aopen_hedged(self, params: dict, timeout: float) -> Opened:
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._aopen(params, timeout)
+        primary = asyncio.ensure_future(self._aopen(params, timeout))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+        self._count("hedged")
+        hedge = asyncio.ensure_future(self._aopen(params, timeout))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                opened = [task for task in done if task.exception() is None]
+                if not opened:
+                    error = next(iter(done)).exception()
+                    continue
+                for loser in pending:
+                    loser.cancel()  # отмена закрывает стрим в _aopen
+                # Обе попытки могли завершиться в одном wait: лишний стрим закрываем
+                opened.sort(key=lambda task: task is hedge)
+                for extra in opened[1:]:
+                    await extra.result()[0].close()
+                if opened[0] is hedge:
+                    self._count("hedge_wins")
+                return opened[0].result()
+        except asyncio.CancelledError:
+            for task in pending:
+                task.cancel()
+            raise
+        raise error
+
+    def _async_slots(self) -> asyncio.Semaphore:
+        # Семафор asyncio привязан к своему event loop
+        loop = id(asyncio.get_running_loop())
+        if loop not in self._aslots:
+            self._aslots[loop] = asyncio.Semaphore(self.config.max_concurrency)
+        return self._aslots[loop]
+
+    # ================== Политика ==================
+
+    def _attempts(self, deadline: float) -> Iterator[Tuple[int, float]]:
+        """(номер, таймаут) попыток; LLMUnavailable, если запрос не разрешён"""
+        for attempt in range(self.config.max_retries + 1):
+            if not self.breaker.allow():
+                self._count("rejected")
+                raise LLMUnavailable("circuit open")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if attempt:
+                self._count("retries")
+            yield attempt, min(self.config.timeout, remaining)
+        raise LLMUnavailable("deadline exceeded")
+
+    def _failed(self, error: Exception, attempt: int, deadline: float) -> float:
+        """Учесть неудачу: пауза перед повтором (полный джиттер) или LLMUnavailable"""
+        self._count("failures")
+        logger.warning(f"LLM request failed (attempt {attempt + 1}): {error}")
+        if not _retryable(error):
+            # Запрос плохой (400/401/404): повтор не поможет, а о здоровье
+            # сервера ответ ничего не говорит — состояние не меняем
+            self.breaker.release_probe()
+            raise LLMUnavailable(str(error)) from error
+        self.breaker.record_failure()
+        if attempt >= self.config.max_retries:
+            return 0.0
+        pause = random.uniform(0, min(self.config.backoff_cap, self.config.backoff_base * 2 ** attempt))
+        return max(0.0, min(pause, deadline - time.monotonic()))
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Через сколько отправить дублирующий запрос (None — не хеджировать)"""
+        if not self.config.hedge or len(self._latencies) < self.config.hedge_min_samples:
+            return None
+        return max(self.config.hedge_min_delay, self._quantile(self.config.hedge_quantile))
+
+    def _record_latency(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def _quantile(self, q: float) -> float:
+        with self._lock:
+            samples = sorted(self._latencies)
+        return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["breaker"] = self.breaker.state
+        stats["breaker_trips"] = self.breaker.trips
+        stats["ttft_p50_ms"] = self._quantile(0.5) * 1000
+        stats["ttft_p95_ms"] = self._quantile(0.95) * 1000
+        return stats
@@ -1,11 +1,31 @@
-"""Memory Manager - manages conversation history and context for AI Humanity."""
+"""Memory Manager - manages conversation history and context for AI Humanity.
+
+Every message is appended to a per-conversation EpisodeLog
+(`<storage_dir>/<id>.jsonl`) as it arrives; saving only refreshes the
+log's offset snapshot and the small `<id>.jsonl.meta` file with the
+conversation's creation time and metadata. Loading maps the log and
+decodes just the tail that fits into `max_history`.
+
+A conversation saved by older versions as a whole `<id>.json` is
+migrated into the log the first time it is opened; the JSON file is
+then renamed to `<id>.json.migrated`.
+
+Token counts are computed once per message and kept as prefix sums, so
+`get_context` picks the window that fits a token budget by binary search.
+"""
+import bisect
 import json
 import logging
+import os
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 from dataclasses import dataclass, field, asdict
 
+from utils import count_tokens
+
+from .episode_log import EpisodeLog
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,6 +46,34 @@ class Conversation:
     created_at: str = field(default_factory=lambda: datetime.now().isoformat())
     updated_at: str = field(default_factory=lambda: datetime.now().isoformat())
     metadata: Dict[str, Any] = field(default_factory=dict)
+    # token_prefix[i] = tokens of context lines of messages[:i]
+    token_prefix: List[int] = field(default_factory=lambda: [0], repr=False)
+
+    def append(self, message: Message) -> None:
+        self.messages.append(message)
+        self.token_prefix.append(self.token_prefix[-1] + _line_tokens(message))
+
+    def index_tokens(self) -> None:
+        """Recompute token prefix sums for all messages."""
+        self.token_prefix = [0]
+        for message in self.messages:
+            self.token_prefix.append(self.token_prefix[-1] + _line_tokens(message))
+
+    def trim(self, keep: int) -> None:
+        """Keep only the last `keep` messages."""
+        drop = len(self.messages) - keep
+        if drop > 0:
+            del self.messages[:drop]
+            del self.token_prefix[:drop]
+
+
+def _context_line(message: Message) -> str:
+    return f"{message.role}: {message.content}"
+
+
+def _line_tokens(message: Message) -> int:
+    """Tokens of the message's context line plus its newline separator."""
+    return count_tokens(_context_line(message)) + 1
 
 
 class MemoryManager:
@@ -36,7 +84,72 @@ class MemoryManager:
         self.storage_dir.mkdir(parents=True, exist_ok=True)
         self.max_history = max_history
         self._conversations: Dict[str, Conversation] = {}
+        self._logs: Dict[str, EpisodeLog] = {}
         self._current_conversation_id: Optional[str] = None
+
+    def _log_path(self, conversation_id: str) -> Path:
+        return self.storage_dir / f"{conversation_id}.jsonl"
+
+    def _meta_path(self, conversation_id: str) -> Path:
+        return self.storage_dir / f"{conversation_id}.jsonl.meta"
+
+    def _get_log(self, conversation_id: str) -> EpisodeLog:
+        """Get (open lazily) append-only log of conversation."""
+        log = self._logs.get(conversation_id)
+        if log is None:
+            self._migrate_legacy_json(conversation_id)
+            log = EpisodeLog(self._log_path(conversation_id))
+            self._logs[conversation_id] = log
+        return log
+
+    def _migrate_legacy_json(self, conversation_id: str) -> None:
+        """Move messages of a legacy `<id>.json` in front of the log.
+
+        The merged log is written next to the old one and swapped in, so
+        a crash leaves either the old files or the migrated log. Messages
+        already in the log (written before the legacy file was migrated)
+        are kept after the legacy ones.
+        """
+        legacy = self.storage_dir / f"{conversation_id}.json"
+        if not legacy.exists():
+            return
+        with open(legacy, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        log_path = self._log_path(conversation_id)
+        tmp = log_path.with_name(log_path.name + ".migrating")
+        tmp.unlink(missing_ok=True)
+        merged = EpisodeLog(tmp, snapshot_every=0)
+        for m in data.get("messages", []):
+            merged.append(asdict(Message(**m)))
+        if log_path.exists():
+            existing = EpisodeLog(log_path)
+            for record in existing:
+                merged.append(record)
+            existing.close()
+        merged.close()
+        # Offset snapshots of both files do not describe the merged log
+        merged.idx_path.unlink(missing_ok=True)
+        log_path.with_name(log_path.name + ".idx").unlink(missing_ok=True)
+        os.replace(tmp, log_path)
+
+        self._write_meta(conversation_id, data.get("created_at", ""), data.get("metadata", {}))
+        legacy.rename(legacy.with_name(legacy.name + ".migrated"))
+        logger.info(f"Migrated legacy conversation: {conversation_id}")
+
+    def _write_meta(self, conversation_id: str, created_at: str, metadata: Dict[str, Any]) -> None:
+        path = self._meta_path(conversation_id)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"created_at": created_at, "metadata": metadata}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def _read_meta(self, conversation_id: str) -> Dict[str, Any]:
+        try:
+            with open(self._meta_path(conversation_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
         
     def create_conversation(self, conversation_id: str = None) -> str:
         """Create new conversation."""
@@ -64,13 +177,13 @@ class MemoryManager:
             metadata=metadata or {}
         )
         
-        self._conversations[conv_id].messages.append(message)
-        self._conversations[conv_id].updated_at = datetime.now().isoformat()
+        conversation = self._conversations[conv_id]
+        conversation.append(message)
+        conversation.updated_at = datetime.now().isoformat()
+        self._get_log(conv_id).append(asdict(message))
         
         # Trim history if needed
-        if len(self._conversations[conv_id].messages) > self.max_history:
-            self._conversations[conv_id].messages = \
-                self._conversations[conv_id].messages[-self.max_history:]
+        conversation.trim(self.max_history)
                 
     def get_history(self, conversation_id: str = None, 
                     limit: int = None) -> List[Dict[str, str]]:
@@ -84,82 +197,107 @@ class MemoryManager:
             messages = messages[-limit:]
             
         return [{"role": m.role, "content": m.content} for m in messages]
+
+    def count_messages(self, conversation_id: str = None) -> int:
+        """Number of messages stored in the conversation log."""
+        conv_id = conversation_id or self._current_conversation_id
+        if conv_id is None:
+            return 0
+        return len(self._get_log(conv_id))
+
+    def get_messages(self, start: int, end: int,
+                     conversation_id: str = None) -> List[Dict[str, Any]]:
+        """Read messages [start, end) straight from the conversation log.
+
+        Not limited by `max_history`: only the requested records are
+        decoded, so views can page through arbitrarily long conversations.
+        """
+        conv_id = conversation_id or self._current_conversation_id
+        if conv_id is None:
+            return []
+        log = self._get_log(conv_id)
+        return [log[i] for i in range(max(0, start), min(end, len(log)))]
         
     def get_context(self, conversation_id: str = None, 
                     max_tokens: int = 4000) -> str:
-        """Get conversation context as string."""
-        history = self.get_history(conversation_id)
-        context_parts = []
-        total_chars = 0
-        
-        for msg in reversed(history):
-            msg_text = f"{msg['role']}: {msg['content']}"
-            if total_chars + len(msg_text) > max_tokens * 4:  # rough char estimate
-                break
-            context_parts.insert(0, msg_text)
-            total_chars += len(msg_text)
-            
-        return "\n".join(context_parts)
+        """Get the latest messages that fit into `max_tokens` as a string."""
+        conv_id = conversation_id or self._current_conversation_id
+        conversation = self._conversations.get(conv_id)
+        if conversation is None:
+            return ""
+
+        # Smallest start whose suffix fits: prefix[start] >= total - max_tokens
+        prefix = conversation.token_prefix
+        start = bisect.bisect_left(prefix, prefix[-1] - max_tokens)
+        messages = conversation.messages
+        return "\n".join(_context_line(messages[i]) for i in range(start, len(messages)))
         
     def save_conversation(self, conversation_id: str = None) -> bool:
-        """Save conversation to file."""
+        """Persist conversation.
+
+        Messages are already in the append-only log, so this only writes
+        the offset snapshot that makes the next load skip the scan and the
+        conversation's metadata file.
+        """
         conv_id = conversation_id or self._current_conversation_id
         if conv_id is None or conv_id not in self._conversations:
             return False
-            
-        filepath = self.storage_dir / f"{conv_id}.json"
+
         try:
-            conv = self._conversations[conv_id]
-            data = {
-                "id": conv.id,
-                "messages": [asdict(m) for m in conv.messages],
-                "created_at": conv.created_at,
-                "updated_at": conv.updated_at,
-                "metadata": conv.metadata
-            }
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self._get_log(conv_id).snapshot()
+            conversation = self._conversations[conv_id]
+            self._write_meta(conv_id, conversation.created_at, conversation.metadata)
             logger.info(f"Saved conversation: {conv_id}")
             return True
         except Exception as e:
             logger.error(f"Failed to save conversation: {e}")
             return False
-            
+
     def load_conversation(self, conversation_id: str) -> bool:
-        """Load conversation from file."""
-        filepath = self.storage_dir / f"{conversation_id}.json"
-        if not filepath.exists():
+        """Load conversation from its log (migrating a legacy JSON file)."""
+        if not (self._log_path(conversation_id).exists()
+                or (self.storage_dir / f"{conversation_id}.json").exists()):
             return False
-            
+
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            messages = [Message(**m) for m in data.get("messages", [])]
+            log = self._get_log(conversation_id)
+            meta = self._read_meta(conversation_id)
+            messages = [Message(**m) for m in log.tail(self.max_history)]
             self._conversations[conversation_id] = Conversation(
                 id=conversation_id,
                 messages=messages,
-                created_at=data.get("created_at", ""),
-                updated_at=data.get("updated_at", ""),
-                metadata=data.get("metadata", {})
+                created_at=meta.get("created_at") or (log[0]["timestamp"] if len(log) else ""),
+                updated_at=messages[-1].timestamp if messages else "",
+                metadata=meta.get("metadata", {}),
             )
+            self._conversations[conversation_id].index_tokens()
             self._current_conversation_id = conversation_id
             logger.info(f"Loaded conversation: {conversation_id}")
             return True
         except Exception as e:
             logger.error(f"Failed to load conversation: {e}")
             return False
-            
+
     def clear_conversation(self, conversation_id: str = None) -> None:
         """Clear conversation history."""
         conv_id = conversation_id or self._current_conversation_id
         if conv_id and conv_id in self._conversations:
             self._conversations[conv_id].messages.clear()
+            self._conversations[conv_id].index_tokens()
+            self._get_log(conv_id).truncate()
             logger.info(f"Cleared conversation: {conv_id}")
             
     def list_conversations(self) -> List[str]:
         """List all saved conversations."""
-        return [f.stem for f in self.storage_dir.glob("*.json")]
+        ids = {f.stem for f in self.storage_dir.glob("*.jsonl")}
+        ids.update(f.stem for f in self.storage_dir.glob("*.json"))
+        return sorted(ids)
+
+    def close(self) -> None:
+        """Write offset snapshots and close all conversation logs."""
+        for log in self._logs.values():
+            log.close()
+        self._logs.clear()
 
 
 # Global instance
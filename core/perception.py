@@ -0,0 +1,152 @@
+"""Восприятие: словарь ключевых слов и разбор реплики за один проход
+
+Декларативная таблица LEXICON (тег -> слова и фразы) один раз
+компилируется в префиксное дерево по символам. Слова приводятся к основе
+(stem): отбрасывается типичное окончание, и основа совпадает с любым
+словом, которое с неё начинается ("грустно" -> "грустн" ловит "грустный").
+Слово со звёздочкой ("спасиб*") — явный префикс, короткое слово без
+окончания совпадает только целиком. Фразы сравниваются по словам.
+
+Разбор проходит по дереву от начала каждого слова реплики; длина прохода
+ограничена длиной самого длинного ключа, поэтому стоимость не зависит от
+размера таблицы. Итог — запись Perception, которую читают все шаги цикла.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Sequence, Set
+
+from .episodic_memory import tokenize
+
+# Теги вида "<вид>:<значение>"; порядок тегов в таблице задаёт приоритет
+LEXICON: Dict[str, Sequence[str]] = {
+    "intent:greeting": ("привет*", "здравствуй*"),
+    "intent:how_are_you": ("как дела", "как ты", "как поживаешь"),
+    "emotion:joy": ("привет*", "здравствуй*", "добрый", "доброе", "добрая"),
+    "emotion:sadness": ("грустно", "плохо", "печаль"),
+    "emotion:anger": ("злюсь", "злой", "бесит", "раздражает"),
+    "skill:приветствие": ("привет*", "пока", "спасибо"),
+    "skill:поиск_в_интернете": ("найди", "поищи", "загугли"),
+    "skill:эмпатия": ("грустно", "плохо", "расстроен"),
+    # Ссылки на предыдущий контекст (такие реплики не кэшируются)
+    "flag:context": (
+        "это", "этот", "эта", "эти", "этого", "он", "она", "оно", "они", "его", "ее", "их",
+        "ему", "ей", "им", "там", "тогда", "тоже", "еще", "дальше", "продолжи",
+        "подробнее", "почему", "зачем", "it", "this", "that", "they", "more",
+    ),
+}
+
+# Окончания, от длинных к коротким; основа не короче MIN_STEM
+_ENDINGS = sorted((
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ешь", "ишь",
+    "ете", "ите", "ает", "яет", "ают", "яют", "ует", "уют", "ться", "тся", "ись", "ась",
+    "ать", "ять", "ить", "еть", "ла", "ло", "ли", "ый", "ий", "ой", "ая", "яя", "ое", "ее",
+    "ые", "ие", "ов", "ев", "ам", "ям", "ах", "ях", "ом", "ем", "ую", "юю", "ет", "ит",
+    "ут", "ют", "ат", "ят", "ен", "на", "но", "ны", "сь", "а", "я", "о", "е", "ы", "и",
+    "у", "ю", "ь",
+), key=len, reverse=True)
+MIN_STEM = 4
+
+
+def stem(word: str) -> str:
+    """Основа слова: без типичного русского окончания"""
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+@dataclass
+class Perception:
+    """Результат разбора одной реплики"""
+    text: str
+    tokens: List[str]
+    tags: Set[str] = field(default_factory=set)
+    ordered: List[str] = field(default_factory=list)  # теги в порядке таблицы
+    question: bool = False
+    command: Optional[str] = None  # "/status" и т.п.
+    safe: bool = True
+    safety_message: str = "OK"
+
+    def has(self, tag: str) -> bool:
+        return tag in self.tags
+
+    def values(self, kind: str) -> List[str]:
+        """Значения тегов вида kind ("emotion" -> ["joy", ...]) по приоритету"""
+        prefix = kind + ":"
+        return [tag[len(prefix):] for tag in self.ordered if tag.startswith(prefix)]
+
+
+class Lexicon:
+    """Таблица ключевых слов, скомпилированная в префиксное дерево"""
+
+    # Служебные ключи узла дерева (символы текста — строки длины 1)
+    _PREFIX = 0  # теги основ и префиксов: совпадение в любом месте слова
+    _EXACT = 1   # теги слов целиком: совпадение только на границе слова
+
+    def __init__(self, table: Mapping[str, Sequence[str]] = None):
+        table = LEXICON if table is None else table
+        self._order: Dict[str, int] = {}
+        self._root: dict = {}
+        self.size = 0
+        for tag, terms in table.items():
+            self._order.setdefault(tag, len(self._order))
+            for term in terms:
+                self._add(term, tag)
+
+    def _add(self, term: str, tag: str):
+        words = tokenize(term)
+        if term.endswith("*"):
+            kind, key = self._PREFIX, " ".join(words)
+        else:
+            last = stem(words[-1])
+            kind = self._PREFIX if last != words[-1] else self._EXACT
+            key = " ".join(words[:-1] + [last])
+        node = self._root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node.setdefault(kind, set()).add(tag)
+        self.size += 1
+
+    def match(self, tokens: List[str]) -> Set[str]:
+        """Теги всех ключей, найденных в последовательности токенов"""
+        text = " ".join(tokens)
+        found: Set[str] = set()
+        root, size = self._root, len(text)
+        start = 0
+        for token in tokens:
+            node, i = root, start
+            while i < size:
+                node = node.get(text[i])
+                if node is None:
+                    break
+                i += 1
+                if self._PREFIX in node:
+                    found.update(node[self._PREFIX])
+                if self._EXACT in node and (i == size or text[i] == " "):
+                    found.update(node[self._EXACT])
+            start += len(token) + 1
+        return found
+
+    def perceive(self, text: str) -> Perception:
+        tokens = tokenize(text)
+        tags = self.match(tokens)
+        stripped = text.lstrip()
+        command = stripped.split(maxsplit=1)[0].lower() if stripped.startswith("/") else None
+        return Perception(
+            text=text,
+            tokens=tokens,
+            tags=tags,
+            ordered=sorted(tags, key=self._order.__getitem__),
+            question="?" in text,
+            command=command,
+        )
+
+
+_lexicon: Optional[Lexicon] = None
+
+
+def get_lexicon() -> Lexicon:
+    """Общий скомпилированный словарь LEXICON"""
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = Lexicon()
+    return _lexicon
@@ -0,0 +1,80 @@
+"""Сборка промпта: сначала статичное, в конце изменчивое
+
+Кэш префиксов у провайдера и KV-кэш локальной модели работают, только
+если начало промпта совпадает с прошлым запросом. Поэтому сообщения
+идут от самых стабильных к самым изменчивым: персона и правила, резюме
+разговора, окно реплик, затем состояние (эмоция, PAD, воспоминания) и
+текущий ввод.
+
+PromptBuilder хранит отпечатки сообщений прошлого запроса и считает,
+сколько токенов в начале нового запроса совпадает с ним, то есть может
+быть взято из кэша.
+"""
+import hashlib
+import threading
+from typing import Any, Dict, List
+
+from utils import count_tokens
+
+Message = Dict[str, str]
+
+
+class PromptBuilder:
+    PERSONA = (
+        "Ты AI-компаньон: живой, внимательный собеседник с собственными эмоциями. "
+        "Отвечай кратко и дружелюбно, на языке пользователя. "
+        "Сообщения «Ранее в разговоре» — резюме прошлых реплик, "
+        "«Состояние» — твоя текущая эмоция и воспоминания; учитывай их, но не пересказывай."
+    )
+
+    def __init__(self, persona: str = None):
+        self.persona = persona or self.PERSONA
+        self._lock = threading.Lock()
+        self._last: List[str] = []  # отпечатки стабильных сообщений прошлого запроса
+        self.fingerprint = ""
+        self.stats = {"requests": 0, "prompt_tokens": 0, "prefix_tokens": 0, "last_prefix_tokens": 0}
+
+    def build(self, history: List[Message], state: str, user_input: str) -> List[Message]:
+        """Сообщения для chat.completions.
+
+        Args:
+            history: Резюме и окно реплик (от старых к новым).
+            state: Изменчивое состояние; идёт последним перед вводом.
+        """
+        stable = [{"role": "system", "content": self.persona}]
+        stable.extend({"role": m["role"], "content": m["content"]} for m in history)
+        volatile = [{"role": "system", "content": state}] if state else []
+        volatile.append({"role": "user", "content": user_input})
+        self._track(stable, volatile)
+        return stable + volatile
+
+    def _track(self, stable: List[Message], volatile: List[Message]):
+        hashes = [hashlib.sha1(f"{m['role']}\0{m['content']}".encode("utf-8")).hexdigest()
+                  for m in stable]
+        tokens = [count_tokens(m["content"]) + 4 for m in stable]  # ~4 служебных токена на сообщение
+        total = sum(tokens) + sum(count_tokens(m["content"]) + 4 for m in volatile)
+        with self._lock:
+            common = 0
+            for new, old in zip(hashes, self._last):
+                if new != old:
+                    break
+                common += 1
+            prefix = sum(tokens[:common])
+            self._last = hashes
+            self.fingerprint = hashlib.sha1("".join(hashes).encode("ascii")).hexdigest()[:16]
+            self.stats["requests"] += 1
+            self.stats["prompt_tokens"] += total
+            self.stats["prefix_tokens"] += prefix
+            self.stats["last_prefix_tokens"] = prefix
+
+    def reset(self):
+        with self._lock:
+            self._last = []
+            self.fingerprint = ""
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["fingerprint"] = self.fingerprint
+        stats["prefix_share"] = stats["prefix_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+        return stats
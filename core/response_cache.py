@@ -0,0 +1,111 @@
+"""Кэш ответов LLM
+
+Ключ — нормализованный ввод (токены tokenize) плюс отпечаток состояния,
+от которого зависит ответ (эмоция, режим безопасности, модель). Записи
+живут ttl секунд, число записей ограничено (LRU). Опционально ищется и
+близкий по смыслу запрос: косинусная близость hashing-эмбеддингов среди
+записей с тем же отпечатком. Какие реплики не кэшировать, решает
+вызывающий код (CognitiveCycle._cache_key).
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from .episodic_memory import hashing_embedding, tokenize
+
+
+@dataclass
+class CacheEntry:
+    response: str
+    fingerprint: str
+    created: float
+    latency: float  # сколько заняла генерация, секунды
+    vector: Any = None
+
+
+class ResponseCache:
+    """LRU-кэш ответов с TTL и опциональным поиском похожих запросов.
+
+    Args:
+        max_entries: Максимум записей; при переполнении вытесняются самые давние.
+        ttl: Время жизни записи, секунды.
+        similarity: Порог косинусной близости для поиска похожих запросов
+            (None — только точное совпадение).
+        embed_fn: Эмбеддинг нормализованного текста (по умолчанию hashing trick).
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 600.0,
+                 similarity: Optional[float] = None, embed_fn: Callable[[str], Any] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.embed_fn = embed_fn or hashing_embedding
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "bypassed": 0, "saved_s": 0.0}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(tokenize(text))
+
+    def get(self, text: str, fingerprint: str) -> Optional[str]:
+        normalized = self.normalize(text)
+        key = f"{fingerprint}|{normalized}"
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.created > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+            elif self.similarity is not None:
+                entry = self._nearest(normalized, fingerprint, now)
+                if entry is not None:
+                    self.stats["semantic_hits"] += 1
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["saved_s"] += entry.latency
+            return entry.response
+
+    def _nearest(self, normalized: str, fingerprint: str, now: float) -> Optional[CacheEntry]:
+        query = self.embed_fn(normalized)
+        best, best_score = None, self.similarity
+        for entry in self._entries.values():
+            if entry.fingerprint != fingerprint or entry.vector is None or now - entry.created > self.ttl:
+                continue
+            score = float(entry.vector @ query)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def put(self, text: str, fingerprint: str, response: str, latency: float = 0.0):
+        normalized = self.normalize(text)
+        vector = self.embed_fn(normalized) if self.similarity is not None else None
+        with self._lock:
+            key = f"{fingerprint}|{normalized}"
+            self._entries[key] = CacheEntry(response, fingerprint, time.monotonic(), latency, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def bypass(self):
+        """Учесть реплику, которую не кэшируют"""
+        with self._lock:
+            self.stats["bypassed"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["semantic_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["semantic_hits"]) / lookups if lookups else 0.0
+        return stats
@@ -1,6 +1,17 @@
-"""Система безопасности"""
+"""Система безопасности
+
+Правила (категория + регулярное выражение) для каждого режима и
+направления (ввод / ответ) компилируются в один RuleSet: правила-списки
+слов сливаются в префиксное дерево, записанное одним регулярным
+выражением, так что текст просматривается за один проход без
+повторных совпадений по общим префиксам. Какое правило сработало,
+определяется уже по найденному фрагменту. Стриминговый ответ
+проверяется кусками через OutputStream; он же придерживает хвост, в
+котором ещё может начаться совпадение на стыке кусков.
+"""
+from dataclasses import dataclass
 from enum import Enum
-from typing import Tuple
+from typing import Dict, FrozenSet, List, Optional, Pattern, Sequence, Tuple
 import re
 
 class SafetyMode(Enum):
@@ -8,30 +19,195 @@ class SafetyMode(Enum):
     NORMAL = "normal"
     PERMISSIVE = "permissive"
 
+ALL_MODES = frozenset(SafetyMode)
+
+
+@dataclass(frozen=True)
+class SafetyRule:
+    """Правило фильтра: список слов через "|" или регулярное выражение.
+
+    max_match — верхняя оценка длины совпадения: столько символов хвоста
+    OutputStream держит между кусками, чтобы не пропустить совпадение на стыке.
+    """
+    category: str
+    pattern: str
+    input_modes: FrozenSet[SafetyMode] = ALL_MODES
+    output_modes: FrozenSet[SafetyMode] = frozenset()
+    max_match: int = 32
+
+
+@dataclass
+class SafetyMatch:
+    """Сработавшее правило и место совпадения"""
+    category: str
+    text: str
+    start: int
+    end: int
+
+
+# Шаблон без спецсимволов: просто слова через "|"
+_WORD_LIST = re.compile(r"[^\\.^$*+?{}\[\]|()]+(?:\|[^\\.^$*+?{}\[\]|()]+)*")
+
+
+def _trie_pattern(words) -> str:
+    """Регулярное выражение-дерево: "нарко|наркотик" -> "нарко(?:тик)?" """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 and "" not in node else f"(?:{'|'.join(branches)})"
+        return body + ("?" if "" in node else "")
+
+    return build(trie)
+
+
+class RuleSet:
+    """Набор правил, скомпилированный в одно выражение.
+
+    Текст проверяется в нижнем регистре, поэтому шаблоны пишутся строчными.
+    """
+
+    def __init__(self, rules: Sequence[SafetyRule]):
+        self._words: Dict[str, str] = {}
+        self._patterns: List[Tuple[Pattern, str]] = []
+        for rule in rules:
+            if _WORD_LIST.fullmatch(rule.pattern):
+                for word in rule.pattern.lower().split("|"):
+                    self._words.setdefault(word, rule.category)
+            else:
+                self._patterns.append((re.compile(rule.pattern), rule.category))
+        parts = [_trie_pattern(self._words)] if self._words else []
+        parts += [f"(?:{pattern.pattern})" for pattern, _ in self._patterns]
+        self._regex = re.compile("|".join(parts)) if parts else None
+
+    def search(self, text_lower: str, offset: int = 0) -> Optional[SafetyMatch]:
+        if self._regex is None:
+            return None
+        m = self._regex.search(text_lower)
+        if not m:
+            return None
+        found = m.group()
+        category = self._words.get(found)
+        if category is None:
+            category = next((c for p, c in self._patterns if p.fullmatch(found)), "unknown")
+        return SafetyMatch(category, found, offset + m.start(), offset + m.end())
+
+
+class OutputStream:
+    """Инкрементальная проверка ответа, приходящего кусками.
+
+    Последние overlap символов не отдаются (release) до следующего куска:
+    совпадение на стыке может начаться в них, и тогда они не должны
+    успеть уйти пользователю.
+    """
+
+    def __init__(self, rules: RuleSet, overlap: int):
+        self._rules = rules
+        self._overlap = overlap
+        self._tail = ""
+        self._pending = ""  # проверенный, но ещё не отданный текст
+        self.length = 0
+        self.match: Optional[SafetyMatch] = None
+
+    def feed(self, chunk: str) -> Optional[SafetyMatch]:
+        """Проверить очередной кусок; после первого совпадения возвращает его же"""
+        if self.match is None:
+            # Хвост прошлых кусков ловит совпадения на стыке
+            window = self._tail + chunk.lower()
+            self.match = self._rules.search(window, self.length - len(self._tail))
+            self._tail = window[-self._overlap:] if self._overlap else ""
+            self._pending += chunk
+        self.length += len(chunk)
+        return self.match
+
+    def release(self) -> str:
+        """Текст, который уже не может войти в совпадение; после совпадения — пусто"""
+        if self.match is not None:
+            return ""
+        cut = len(self._pending) - self._overlap
+        if cut <= 0:
+            return ""
+        text, self._pending = self._pending[:cut], self._pending[cut:]
+        return text
+
+    def flush(self) -> str:
+        """Остаток после последнего куска"""
+        text, self._pending = ("" if self.match is not None else self._pending), ""
+        return text
+
+
 class SafetySystem:
-    BLOCKED_PATTERNS = [
-        r"(взлом|хакер|ddos|exploit)",
-        r"(бомб|оруж|убить|насилие)",
-        r"(нарко|наркотик|героин|кокаин)",
-    ]
-    
-    def __init__(self, mode: SafetyMode = SafetyMode.NORMAL):
+    RULES: Tuple[SafetyRule, ...] = (
+        SafetyRule("hacking", r"взлом|хакер|ddos|exploit",
+                   input_modes=frozenset({SafetyMode.STRICT, SafetyMode.NORMAL}),
+                   output_modes=frozenset({SafetyMode.STRICT})),
+        SafetyRule("violence", r"бомб|оруж|убить|насилие",
+                   output_modes=frozenset({SafetyMode.STRICT})),
+        SafetyRule("drugs", r"нарко|наркотик|героин|кокаин",
+                   output_modes=frozenset({SafetyMode.STRICT})),
+        SafetyRule("self_harm", r"суицид|самоубийств",
+                   input_modes=frozenset({SafetyMode.STRICT}),
+                   output_modes=frozenset({SafetyMode.STRICT})),
+    )
+    MAX_OUTPUT_STRICT = 5000
+
+    def __init__(self, mode: SafetyMode = SafetyMode.NORMAL, rules: Sequence[SafetyRule] = None):
         self.mode = mode
         self.violations = 0
-    
+        self.last_match: Optional[SafetyMatch] = None
+        self.rules = tuple(rules if rules is not None else self.RULES)
+        # Один скомпилированный набор на (направление, режим)
+        self._compiled: Dict[Tuple[str, SafetyMode], RuleSet] = {}
+        # Сколько символов ответа придерживать в стриме: без правил — нисколько
+        self._overlap: Dict[SafetyMode, int] = {}
+        for mode_ in SafetyMode:
+            output = [r for r in self.rules if mode_ in r.output_modes]
+            self._compiled[("input", mode_)] = RuleSet([r for r in self.rules if mode_ in r.input_modes])
+            self._compiled[("output", mode_)] = RuleSet(output)
+            self._overlap[mode_] = max((r.max_match for r in output), default=0)
+
+    def scan(self, text: str, scope: str = "input") -> Optional[SafetyMatch]:
+        """Первое совпадение правил текущего режима для направления scope"""
+        return self._compiled[(scope, self.mode)].search(text.lower())
+
     def check_input(self, text: str) -> Tuple[bool, str]:
-        text_lower = text.lower()
-        for pattern in self.BLOCKED_PATTERNS:
-            if re.search(pattern, text_lower):
-                self.violations += 1
-                return False, "Запрос содержит недопустимый контент"
+        match = self.scan(text, "input")
+        if match:
+            self.violations += 1
+            self.last_match = match
+            return False, "Запрос содержит недопустимый контент"
         return True, "OK"
-    
-    def check_output(self, text: str) -> Tuple[bool, str]:
+
+    def open_output_stream(self) -> OutputStream:
+        """Начать проверку стримингового ответа (правила текущего режима)"""
+        return OutputStream(self._compiled[("output", self.mode)], self._overlap[self.mode])
+
+    def check_output(self, text: str, stream: OutputStream = None) -> Tuple[bool, str]:
+        """Проверить ответ целиком или, если передан stream, его очередной кусок"""
+        if stream is not None:
+            match, length = stream.feed(text), stream.length
+        else:
+            match, length = self.scan(text, "output"), len(text)
+        if match:
+            if match is not self.last_match:
+                self.violations += 1
+                self.last_match = match
+            return False, "Ответ содержит недопустимый контент"
         if self.mode == SafetyMode.STRICT:
-            if len(text) > 5000:
+            if length > self.MAX_OUTPUT_STRICT:
                 return False, "Ответ слишком длинный"
         return True, "OK"
-    
+
     def get_status(self) -> dict:
-        return {"mode": self.mode.value, "violations": self.violations}
+        return {
+            "mode": self.mode.value,
+            "violations": self.violations,
+            "last_rule": self.last_match.category if self.last_match else None,
+        }
@@ -0,0 +1,268 @@
+"""Менеджер пользовательских сессий
+
+Каждому чату — собственный лёгкий CognitiveCycle (рабочая память,
+эпизоды, PAD, навыки), LLM-клиенты общие. Сессии создаются лениво,
+живут в шардированном LRU и выгружаются на диск по LRU и по таймауту
+простоя; при следующем сообщении состояние восстанавливается с диска.
+
+Создание, загрузка и выгрузка сессии идут вне блокировки шарда; из
+async-кода сессию берут через asession/aget — диск и сборка
+CognitiveCycle уходят в пул потоков и не блокируют event loop.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    cycle: Any
+    last_used: float = field(default_factory=time.monotonic)
+    refs: int = 0
+
+
+class _Shard:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        # Выгруженные, но ещё не записанные на диск сессии
+        self.saving: Dict[Hashable, Any] = {}
+
+
+class SessionManager:
+    """Шардированный LRU когнитивных сессий с выгрузкой на диск.
+
+    Args:
+        factory: Создаёт новый CognitiveCycle для сессии.
+        storage_dir: Каталог для выгруженных сессий.
+        max_active: Сколько сессий держать в памяти (по всем шардам).
+        idle_ttl: Через сколько секунд простоя выгружать сессию.
+        shards: Число шардов (уменьшает конкуренцию за блокировки).
+        max_saved_episodes: Сколько последних эпизодов сохранять на диск.
+    """
+
+    def __init__(self, factory: Callable[[], Any], storage_dir: str = "data/sessions",
+                 max_active: int = 1000, idle_ttl: float = 1800.0, shards: int = 16,
+                 max_saved_episodes: int = 50):
+        self.factory = factory
+        self.storage_dir = Path(storage_dir)
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        self.idle_ttl = idle_ttl
+        self.max_saved_episodes = max_saved_episodes
+        self._shards: List[_Shard] = [_Shard() for _ in range(shards)]
+        self._per_shard = max(1, max_active // shards)
+        self.stats = {"created": 0, "restored": 0, "evicted": 0, "hits": 0}
+        self._stats_lock = threading.Lock()
+
+    # ================== Доступ ==================
+
+    def _count(self, name: str) -> None:
+        # Счётчики общие для всех шардов — своя блокировка
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _shard(self, key: Hashable) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _path(self, key: Hashable) -> Path:
+        # Раскладываем файлы по подкаталогам, чтобы не держать десятки тысяч в одном
+        shard_dir = f"{zlib.crc32(str(key).encode('utf-8')) & 0xff:02x}"
+        return self.storage_dir / shard_dir / f"{key}.json"
+
+    def get(self, key: Hashable):
+        """Получить сессию (создать или восстановить с диска)."""
+        with self.session(key) as cycle:
+            return cycle
+
+    async def aget(self, key: Hashable):
+        """get для async-кода: загрузка и выгрузка — в пуле потоков."""
+        async with self.asession(key) as cycle:
+            return cycle
+
+    @contextmanager
+    def session(self, key: Hashable) -> Iterator[Any]:
+        """Сессия, защищённая от выгрузки на время использования."""
+        entry = self._acquire(key)
+        try:
+            yield entry.cycle
+        finally:
+            self._release(key, entry)
+
+    @asynccontextmanager
+    async def asession(self, key: Hashable) -> AsyncIterator[Any]:
+        """session для async-кода: не блокирует event loop на диске."""
+        entry = await asyncio.get_running_loop().run_in_executor(None, self._acquire, key)
+        try:
+            yield entry.cycle
+        finally:
+            self._release(key, entry)
+
+    def _acquire(self, key: Hashable) -> _Entry:
+        shard = self._shard(key)
+        with shard.lock:
+            entry = self._pin(shard, key)
+            cycle = shard.saving.get(key) if entry is None else None
+        if entry is not None:
+            return entry
+        if cycle is None:
+            # Сборка цикла и чтение файла — без блокировки шарда
+            cycle = self._load(key)
+        with shard.lock:
+            entry = self._pin(shard, key)  # другой поток мог успеть первым
+            if entry is None:
+                entry = shard.entries[key] = _Entry(cycle)
+                entry.refs = 1
+                evicted = self._collect_lru(shard)
+            else:
+                evicted = []
+        if evicted:
+            self._save_many(shard, evicted)
+        return entry
+
+    def _pin(self, shard: _Shard, key: Hashable):
+        """Закрепить сессию из шарда, если она в памяти (под shard.lock)."""
+        entry = shard.entries.get(key)
+        if entry is not None:
+            shard.entries.move_to_end(key)
+            self._count("hits")
+            entry.refs += 1
+            entry.last_used = time.monotonic()
+        return entry
+
+    def _release(self, key: Hashable, entry: _Entry):
+        shard = self._shard(key)
+        with shard.lock:
+            entry.refs -= 1
+            entry.last_used = time.monotonic()
+            if shard.entries.get(key) is entry:
+                shard.entries.move_to_end(key)
+
+    def _load(self, key: Hashable):
+        cycle = self.factory()
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cycle.load_state(json.load(f))
+            self._count("restored")
+        except FileNotFoundError:
+            self._count("created")
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to restore session {key}: {e}")
+            self._count("created")
+        return cycle
+
+    # ================== Выгрузка ==================
+
+    def _collect_lru(self, shard: _Shard) -> List[tuple]:
+        """Вынуть из шарда лишние LRU-сессии (вызывать под shard.lock)."""
+        evicted = []
+        if len(shard.entries) <= self._per_shard:
+            return evicted
+        for key in list(shard.entries):
+            if len(shard.entries) <= self._per_shard:
+                break
+            entry = shard.entries[key]
+            if entry.refs == 0:
+                del shard.entries[key]
+                shard.saving[key] = entry.cycle
+                evicted.append((key, entry.cycle))
+        return evicted
+
+    @staticmethod
+    def _current(shard: _Shard, key: Hashable):
+        """Актуальный цикл сессии в шарде (вызывать под shard.lock)."""
+        entry = shard.entries.get(key)
+        return entry.cycle if entry is not None else shard.saving.get(key)
+
+    def _save(self, key: Hashable, cycle) -> None:
+        shard = self._shard(key)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Свой tmp на поток: выгрузка и save_all могут писать один ключ
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(cycle.export_state(self.max_saved_episodes), f,
+                          ensure_ascii=False, separators=(",", ":"))
+            # Публикуем под блокировкой шарда: если за время записи сессию
+            # сбросили (drop) или заменили, файл не должен воскреснуть
+            with shard.lock:
+                if self._current(shard, key) is cycle:
+                    os.replace(tmp, path)
+                    return
+            tmp.unlink()
+        except OSError as e:
+            logger.error(f"Failed to save session {key}: {e}")
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+
+    def _save_many(self, shard: _Shard, evicted: List[tuple]) -> None:
+        for key, cycle in evicted:
+            self._save(key, cycle)
+            self._count("evicted")
+            with shard.lock:
+                if shard.saving.get(key) is cycle:
+                    del shard.saving[key]
+
+    def sweep(self) -> int:
+        """Выгрузить сессии, простаивающие дольше idle_ttl. Возвращает их число."""
+        deadline = time.monotonic() - self.idle_ttl
+        total = 0
+        for shard in self._shards:
+            evicted = []
+            with shard.lock:
+                for key in list(shard.entries):
+                    entry = shard.entries[key]
+                    # OrderedDict упорядочен по давности использования
+                    if entry.last_used > deadline:
+                        break
+                    if entry.refs == 0:
+                        del shard.entries[key]
+                        shard.saving[key] = entry.cycle
+                        evicted.append((key, entry.cycle))
+            self._save_many(shard, evicted)
+            total += len(evicted)
+        return total
+
+    def drop(self, key: Hashable) -> None:
+        """Удалить сессию из памяти и с диска (сброс контекста)."""
+        shard = self._shard(key)
+        # Удаляем файл под той же блокировкой, под которой _save его публикует:
+        # незавершённая запись увидит, что сессии больше нет, и не вернёт файл
+        with shard.lock:
+            shard.entries.pop(key, None)
+            shard.saving.pop(key, None)
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def save_all(self) -> None:
+        """Сохранить все активные сессии (при остановке)."""
+        for shard in self._shards:
+            with shard.lock:
+                items = list(shard.entries.items())
+            for key, entry in items:
+                self._save(key, entry.cycle)
+
+    @property
+    def active_count(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {"active": self.active_count, **stats}
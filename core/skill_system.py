@@ -1,6 +1,6 @@
 """Система навыков с прокачкой"""
 from dataclasses import dataclass, field
-from typing import Dict, List
+from typing import Any, Callable, Dict, List
 from enum import Enum
 import math
 
@@ -32,8 +32,17 @@ class SkillSystem:
     def __init__(self):
         self.skills: Dict[str, Skill] = {}
         self.total_experience = 0.0
+        self._listeners: List[Callable[[Skill], None]] = []
         self._init_default_skills()
     
+    def add_listener(self, callback: Callable[[Skill], None]):
+        """Уведомлять об изменении навыка (опыт, уровень, новый навык)"""
+        self._listeners.append(callback)
+    
+    def _notify(self, skill: Skill):
+        for callback in self._listeners:
+            callback(skill)
+    
     def _init_default_skills(self):
         defaults = [
             ("приветствие", "общение", ["social"]),
@@ -56,6 +65,7 @@ class SkillSystem:
         skill.uses += 1
         self.total_experience += xp
         self._update_level(skill)
+        self._notify(skill)
         return xp
     
     def _update_level(self, skill: Skill):
@@ -72,3 +82,20 @@ class SkillSystem:
     
     def get_skills_by_category(self, category: str) -> List[Skill]:
         return [s for s in self.skills.values() if s.category == category]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_experience": self.total_experience,
+            "skills": {
+                name: [s.category, s.experience, s.uses, s.tags]
+                for name, s in self.skills.items()
+            },
+        }
+    
+    def load_dict(self, data: Dict[str, Any]):
+        self.total_experience = data.get("total_experience", 0.0)
+        for name, (category, experience, uses, tags) in data.get("skills", {}).items():
+            skill = Skill(name=name, category=category, experience=experience, uses=uses, tags=tags)
+            self._update_level(skill)
+            self.skills[name] = skill
+            self._notify(skill)
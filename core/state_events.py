@@ -0,0 +1,70 @@
+"""Шина изменений состояния
+
+Ядро публикует значения по темам ("emotion", "pad", "level",
+"skill.<имя>"); событие уходит подписчикам только если значение
+действительно изменилось. У каждого события есть номер версии, поэтому
+подписчик может отбросить устаревшее или догнать пропущенное через
+snapshot().
+"""
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+StateCallback = Callable[[str, Any, int], None]
+
+
+class StateBus:
+    """Версионированная публикация изменений состояния.
+
+    Подписка по точной теме, по префиксу ("skill.*") или на всё ("*").
+    Колбэки вызываются синхронно в потоке публикации и должны быть
+    дешёвыми (GUI переносит работу в свой поток через StateBridge).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, Tuple[Any, int]] = {}
+        self._subscribers: List[Tuple[str, StateCallback]] = []
+        self.version = 0
+
+    def subscribe(self, topic: str, callback: StateCallback) -> Callable[[], None]:
+        """Подписаться на тему; возвращает функцию отписки."""
+        entry = (topic, callback)
+        with self._lock:
+            self._subscribers = self._subscribers + [entry]
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers = [s for s in self._subscribers if s is not entry]
+        return unsubscribe
+
+    def publish(self, topic: str, value: Any) -> bool:
+        """Опубликовать значение; False, если оно не изменилось."""
+        with self._lock:
+            current = self._values.get(topic)
+            if current is not None and current[0] == value:
+                return False
+            self.version += 1
+            version = self.version
+            self._values[topic] = (value, version)
+            subscribers = self._subscribers
+        for pattern, callback in subscribers:
+            if self._matches(pattern, topic):
+                callback(topic, value, version)
+        return True
+
+    @staticmethod
+    def _matches(pattern: str, topic: str) -> bool:
+        if pattern == "*" or pattern == topic:
+            return True
+        return pattern.endswith("*") and topic.startswith(pattern[:-1])
+
+    def get(self, topic: str, default: Any = None) -> Any:
+        """Последнее опубликованное значение темы."""
+        with self._lock:
+            current = self._values.get(topic)
+        return current[0] if current is not None else default
+
+    def snapshot(self, prefix: str = "") -> Dict[str, Any]:
+        """Все текущие значения (для первичной отрисовки подписчика)."""
+        with self._lock:
+            return {t: v for t, (v, _) in self._values.items() if t.startswith(prefix)}
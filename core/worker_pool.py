@@ -0,0 +1,120 @@
+"""Пул когнитивных воркеров для asyncio-интеграций
+
+Ограничивает число одновременно обрабатываемых сообщений и сохраняет
+порядок внутри одного чата: следующее сообщение чата начинает
+обрабатываться только после того, как предыдущее полностью завершено
+(включая отправку ответа), а разные чаты обрабатываются параллельно.
+"""
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class QueueFullError(Exception):
+    """Очередь чата переполнена."""
+
+
+@dataclass
+class PoolMetrics:
+    """Счётчики пула воркеров"""
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    rejected: int = 0
+    total_wait: float = 0.0
+    total_run: float = 0.0
+    max_queue_depth: int = 0
+
+
+class CognitiveWorkerPool:
+    """Ограниченный пул с упорядочиванием по ключу (chat_id).
+
+    Args:
+        max_concurrency: Сколько задач выполняется одновременно.
+        max_pending_per_chat: Сколько сообщений одного чата может ждать
+            в очереди; сверх этого submit() бросает QueueFullError.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_pending_per_chat: int = 20):
+        self.max_concurrency = max_concurrency
+        self.max_pending_per_chat = max_pending_per_chat
+        self.metrics = PoolMetrics()
+        self._semaphore: asyncio.Semaphore = None
+        self._chat_locks: Dict[Hashable, asyncio.Lock] = {}
+        self._pending: Dict[Hashable, int] = defaultdict(int)
+        self._queued = 0
+        self._in_flight = 0
+
+    async def submit(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args) -> Any:
+        """Выполнить корутину fn(*args) в очереди чата key."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self._pending[key] >= self.max_pending_per_chat:
+            self.metrics.rejected += 1
+            raise QueueFullError(f"queue for {key!r} is full")
+
+        self.metrics.submitted += 1
+        self._pending[key] += 1
+        self._queued += 1
+        if self._queued > self.metrics.max_queue_depth:
+            self.metrics.max_queue_depth = self._queued
+
+        enqueued = time.perf_counter()
+        lock = self._chat_locks.setdefault(key, asyncio.Lock())
+        started = None
+        try:
+            # asyncio.Lock отдаёт захват ожидающим в порядке FIFO
+            async with lock:
+                async with self._semaphore:
+                    self._pending[key] -= 1
+                    self._queued -= 1
+                    self._in_flight += 1
+                    started = time.perf_counter()
+                    self.metrics.total_wait += started - enqueued
+                    try:
+                        result = await fn(*args)
+                        self.metrics.completed += 1
+                        return result
+                    except Exception:
+                        self.metrics.failed += 1
+                        raise
+                    finally:
+                        self._in_flight -= 1
+                        self.metrics.total_run += time.perf_counter() - started
+        finally:
+            if started is None:
+                # Отменено, пока ждало очереди
+                self._pending[key] -= 1
+                self._queued -= 1
+            if self._pending[key] <= 0 and not lock.locked():
+                self._pending.pop(key, None)
+                if self._chat_locks.get(key) is lock:
+                    del self._chat_locks[key]
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """Сколько сообщений ждут своей очереди (по всем чатам)."""
+        return self._queued
+
+    def get_metrics(self) -> Dict[str, Any]:
+        m = self.metrics
+        finished = m.completed + m.failed
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "active_chats": len(self._chat_locks),
+            "max_queue_depth": m.max_queue_depth,
+            "submitted": m.submitted,
+            "completed": m.completed,
+            "failed": m.failed,
+            "rejected": m.rejected,
+            "avg_wait_ms": (m.total_wait / finished * 1000) if finished else 0.0,
+            "avg_run_ms": (m.total_run / finished * 1000) if finished else 0.0,
+        }
@@ -0,0 +1,337 @@
+"""Лента чата (model/view)
+
+Переписка хранится в журнале MemoryManager, а в памяти держится только
+окно из последних max_rows сообщений. Прокрутка к верхнему краю
+подгружает из журнала предыдущую страницу, к нижнему — следующую; лишнее
+с противоположного края окна выгружается. Высота строки считается
+делегатом один раз на ширину и кэшируется в самой записи.
+"""
+from typing import Any, Dict, List, Optional
+
+from PyQt6.QtWidgets import QAbstractItemView, QApplication, QListView, QStyledItemDelegate
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, QRect, QSize, Qt
+from PyQt6.QtGui import QColor, QKeySequence
+
+# Отправитель в ленте -> роль сообщения в MemoryManager и обратно
+_ROLES = {"USER": "user", "AI": "assistant"}
+_SENDERS = {"user": ("USER", "#00d4ff"), "assistant": ("AI", "#ff006e")}
+
+_TOP_LEFT = Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop
+_WRAP = Qt.TextFlag.TextWordWrap
+_TOP_LEFT_WRAP = _TOP_LEFT | _WRAP
+
+
+class ChatEntry:
+    """Одно сообщение в окне ленты"""
+    __slots__ = ("sender", "text", "color", "size")
+
+    def __init__(self, sender: str, text: str, color: str):
+        self.sender, self.text, self.color = sender, text, color
+        self.size = None  # (ширина, QSize) — кэш делегата
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "ChatEntry":
+        meta = record.get("metadata") or {}
+        sender, color = _SENDERS.get(record.get("role"), ("SYSTEM", "#4ecca3"))
+        return cls(meta.get("sender", sender), record.get("content", ""), meta.get("color", color))
+
+
+class ChatModel(QAbstractListModel):
+    """Скользящее окно над журналом переписки.
+
+    Строки окна — сообщения [first, first + len(rows)) журнала; пока окно
+    стоит на хвосте, последней строкой показывается стриминговый ответ.
+    """
+    EntryRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, memory, conversation_id: str = "desktop",
+                 page_size: int = 50, max_rows: int = 150, parent=None):
+        super().__init__(parent)
+        self.memory = memory
+        self.conversation_id = conversation_id
+        self.page_size = page_size
+        self.max_rows = max(max_rows, page_size)
+        self._rows: List[ChatEntry] = []
+        self._first = 0
+        self._live: Optional[ChatEntry] = None
+        self._live_shown = False
+        self.reload_tail()
+
+    # ================== Qt ==================
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._rows) + self._live_shown
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        entry = self.entry(index.row())
+        if entry is None:
+            return None
+        if role == self.EntryRole:
+            return entry
+        if role == Qt.ItemDataRole.DisplayRole:
+            return entry.text
+        return None
+
+    def entry(self, row: int) -> Optional[ChatEntry]:
+        if 0 <= row < len(self._rows):
+            return self._rows[row]
+        if row == len(self._rows) and self._live_shown:
+            return self._live
+        return None
+
+    # ================== Окно ==================
+
+    def _total(self) -> int:
+        return self.memory.count_messages(self.conversation_id)
+
+    def _read(self, start: int, end: int) -> List[ChatEntry]:
+        records = self.memory.get_messages(start, end, self.conversation_id)
+        return [ChatEntry.from_record(r) for r in records]
+
+    @property
+    def first(self) -> int:
+        """Индекс первой строки окна в журнале"""
+        return self._first
+
+    @property
+    def at_tail(self) -> bool:
+        return self._first + len(self._rows) >= self._total()
+
+    @property
+    def can_load_older(self) -> bool:
+        return self._first > 0
+
+    def reload_tail(self):
+        """Перейти к последней странице переписки"""
+        self.beginResetModel()
+        total = self._total()
+        self._first = max(0, total - self.page_size)
+        self._rows = self._read(self._first, total)
+        self._live_shown = self._live is not None
+        self.endResetModel()
+
+    def load_older(self) -> int:
+        """Подгрузить предыдущую страницу в начало окна"""
+        n = min(self.page_size, self._first)
+        if n <= 0:
+            return 0
+        entries = self._read(self._first - n, self._first)
+        self.beginInsertRows(QModelIndex(), 0, len(entries) - 1)
+        self._rows[:0] = entries
+        self._first -= len(entries)
+        self.endInsertRows()
+        return len(entries)
+
+    def load_newer(self) -> int:
+        """Подгрузить следующую страницу в конец окна"""
+        start = self._first + len(self._rows)
+        entries = self._read(start, start + self.page_size)
+        show_live = self._live is not None and start + len(entries) >= self._total()
+        count = len(entries) + show_live
+        if count == 0:
+            return 0
+        pos = len(self._rows)
+        self.beginInsertRows(QModelIndex(), pos, pos + count - 1)
+        self._rows.extend(entries)
+        self._live_shown = show_live
+        self.endInsertRows()
+        return count
+
+    def trim(self, from_end: bool = False) -> int:
+        """Выгрузить строки сверх max_rows с начала или с конца окна"""
+        excess = self.rowCount() - self.max_rows
+        if excess <= 0:
+            return 0
+        if from_end:
+            last = self.rowCount() - 1
+            self.beginRemoveRows(QModelIndex(), last - excess + 1, last)
+            rows = excess - self._live_shown
+            self._live_shown = False
+            if rows:
+                del self._rows[-rows:]
+        else:
+            self.beginRemoveRows(QModelIndex(), 0, excess - 1)
+            del self._rows[:excess]
+            self._first += excess
+        self.endRemoveRows()
+        return excess
+
+    # ================== Сообщения ==================
+
+    def append(self, sender: str, text: str, color: str):
+        """Сохранить сообщение в журнал и показать, если окно на хвосте"""
+        visible = self.at_tail
+        self.memory.add_message(_ROLES.get(sender, "system"), text, self.conversation_id,
+                                metadata={"sender": sender, "color": color})
+        if visible:
+            pos = len(self._rows)
+            self.beginInsertRows(QModelIndex(), pos, pos)
+            self._rows.append(ChatEntry(sender, text, color))
+            self.endInsertRows()
+
+    def begin_stream(self, sender: str, color: str):
+        """Начать стриминговое сообщение (в журнал попадёт в end_stream)"""
+        self._live = ChatEntry(sender, "", color)
+        if self.at_tail:
+            pos = len(self._rows)
+            self.beginInsertRows(QModelIndex(), pos, pos)
+            self._live_shown = True
+            self.endInsertRows()
+
+    def append_delta(self, delta: str):
+        if self._live is None:
+            return
+        self._live.text += delta
+        self._live.size = None
+        if self._live_shown:
+            index = self.index(len(self._rows))
+            self.dataChanged.emit(index, index)
+
+    def end_stream(self, text: str = None):
+        """Закончить стриминговое сообщение и сохранить его в журнал"""
+        live, self._live = self._live, None
+        if live is None:
+            return
+        if text is not None and text != live.text:
+            live.text, live.size = text, None
+        self.memory.add_message(_ROLES.get(live.sender, "system"), live.text, self.conversation_id,
+                                metadata={"sender": live.sender, "color": live.color})
+        if self._live_shown:
+            # Строка остаётся на месте, просто становится обычной
+            self._live_shown = False
+            self._rows.append(live)
+            index = self.index(len(self._rows) - 1)
+            self.dataChanged.emit(index, index)
+
+
+class ChatDelegate(QStyledItemDelegate):
+    """Рисует сообщение: цветная строка отправителя и текст с переносом.
+
+    sizeHint зовётся для каждой строки окна при любой перераскладке,
+    поэтому размер берётся из кэша записи без обращения к data().
+    """
+    PADDING = 6
+
+    def __init__(self, model: ChatModel, parent=None):
+        super().__init__(parent)
+        self._model = model
+        self.width = 400  # ширина текста; обновляет ChatView при resize
+
+    def sizeHint(self, option, index) -> QSize:
+        entry = self._model.entry(index.row())
+        if entry is None:
+            return QSize()
+        cached = entry.size
+        if cached is not None and cached[0] == self.width:
+            return cached[1]
+        fm = option.fontMetrics
+        body = fm.boundingRect(QRect(0, 0, self.width, 1 << 20), _WRAP, entry.text).height() if entry.text else 0
+        size = QSize(self.width, fm.height() + body + 2 * self.PADDING)
+        entry.size = (self.width, size)
+        return size
+
+    def paint(self, painter, option, index):
+        entry = self._model.entry(index.row())
+        if entry is None:
+            return
+        painter.save()
+        rect = option.rect.adjusted(self.PADDING, self.PADDING, -self.PADDING, -self.PADDING)
+        painter.setPen(QColor(entry.color))
+        painter.drawText(rect, _TOP_LEFT, f"▸ {entry.sender}")
+        painter.setPen(option.palette.text().color())
+        painter.drawText(rect.adjusted(0, option.fontMetrics.height(), 0, 0), _TOP_LEFT_WRAP, entry.text)
+        painter.restore()
+
+
+class ChatView(QListView):
+    """Лента чата: подгрузка страниц при прокрутке и автоследование за хвостом"""
+
+    def __init__(self, model: ChatModel, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        self._delegate = ChatDelegate(model, self)
+        self.setItemDelegate(self._delegate)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setUniformItemSizes(False)
+        self.setWordWrap(True)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self._follow = True
+        self._paging = False
+
+        bar = self.verticalScrollBar()
+        bar.valueChanged.connect(self._on_scroll)
+        bar.rangeChanged.connect(self._on_range)
+        model.rowsInserted.connect(self._on_rows_inserted)
+        model.dataChanged.connect(self._on_data_changed)
+        model.modelReset.connect(self.scrollToBottom)
+        self.scrollToBottom()
+
+    def resizeEvent(self, event):
+        self._delegate.width = max(50, self.viewport().width() - 2 * ChatDelegate.PADDING)
+        super().resizeEvent(event)
+
+    def _on_scroll(self, value: int):
+        bar = self.verticalScrollBar()
+        self._follow = value >= bar.maximum()
+        if self._paging:
+            return
+        model: ChatModel = self.model()
+        if value <= bar.minimum() and model.can_load_older:
+            self._keep_anchor(lambda: (model.load_older(), model.trim(from_end=True)))
+        elif value >= bar.maximum() and not model.at_tail:
+            self._keep_anchor(lambda: (model.load_newer(), model.trim(from_end=False)))
+
+    def _keep_anchor(self, change):
+        """Изменить окно модели, не сдвигая видимое сообщение"""
+        model: ChatModel = self.model()
+        anchor = self.indexAt(self.viewport().rect().topLeft())
+        offset = self.visualRect(anchor).top() if anchor.isValid() else 0
+        absolute = model.first + anchor.row()
+        self._paging = True
+        try:
+            change()
+            row = absolute - model.first
+            if anchor.isValid() and 0 <= row < model.rowCount():
+                self.scrollTo(model.index(row), QAbstractItemView.ScrollHint.PositionAtTop)
+                bar = self.verticalScrollBar()
+                bar.setValue(bar.value() - offset)
+        finally:
+            self._paging = False
+
+    def _on_range(self, _minimum: int, _maximum: int):
+        if self._follow:
+            self.scrollToBottom()
+
+    def _on_rows_inserted(self, _parent, first: int, _last: int):
+        if self._paging:
+            return
+        model: ChatModel = self.model()
+        if self._follow:
+            model.trim(from_end=False)
+            self.scrollToBottom()
+        else:
+            # Пользователь читает историю — новое дочитается прокруткой вниз
+            model.trim(from_end=True)
+
+    def _on_data_changed(self, top_left, _bottom_right, _roles=()):
+        # Высота стримингового сообщения растёт — перераскладываем
+        self._delegate.sizeHintChanged.emit(top_left)
+
+    def scroll_to_latest(self):
+        """Вернуться к последним сообщениям (перед отправкой нового)"""
+        model: ChatModel = self.model()
+        self._follow = True
+        if not model.at_tail:
+            model.reload_tail()
+        self.scrollToBottom()
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.StandardKey.Copy) and self.currentIndex().isValid():
+            QApplication.clipboard().setText(self.currentIndex().data())
+            return
+        super().keyPressEvent(event)
@@ -1,39 +1,66 @@
 """Главное окно"""
-import html
 from pathlib import Path
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QTextEdit, QLineEdit, QPushButton, QLabel, QProgressBar, QFrame, QFileDialog,
+    QLineEdit, QPushButton, QLabel, QProgressBar, QFrame, QFileDialog,
     QCheckBox)
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QThread
-from PyQt6.QtGui import QColor
 
 from .styles_scifi import SCIFI_STYLE
 from .skills_widget import SkillsWidget
 from .voice_dialog import VoiceDialog
+from .state_bridge import StateBridge
+from .chat_view import ChatModel, ChatView
 from modules.desktop_avatar import AvatarManager
-from modules.tts_engine import TTSManager, TTSConfig
+from modules.tts_engine import TTSManager
+from core.autonomous_life import AutonomousLife
+from core.memory_manager import MemoryManager, get_memory_manager
 
 class AIWorker(QThread):
     response_ready = pyqtSignal(str)
-    def __init__(self, cognitive, text):
+    delta_ready = pyqtSignal(str)
+    def __init__(self, cognitive, text, stream: bool = True):
         super().__init__()
-        self.cognitive, self.text = cognitive, text
+        self.cognitive, self.text, self.stream = cognitive, text, stream
+        self._cancelled = False
+    def cancel(self):
+        """Прервать стрим: генерация закрывается, response_ready не придёт"""
+        self._cancelled = True
     def run(self):
-        self.response_ready.emit(self.cognitive.run_cycle(self.text))
+        if not self.stream:
+            self.response_ready.emit(self.cognitive.run_cycle(self.text))
+            return
+        parts = []
+        deltas = self.cognitive.run_cycle_stream(self.text)
+        try:
+            for delta in deltas:
+                if self._cancelled:
+                    return
+                parts.append(delta)
+                self.delta_ready.emit(delta)
+        finally:
+            deltas.close()
+        if not self._cancelled:
+            self.response_ready.emit("".join(parts))
 
 class MainWindowSciFi(QMainWindow):
-    def __init__(self, cognitive):
+    def __init__(self, cognitive, memory: MemoryManager = None):
         super().__init__()
         self.cognitive = cognitive
+        self.memory = memory if memory is not None else get_memory_manager()
         self.avatar_manager = AvatarManager(cognitive)
         self.tts_manager = TTSManager(cognitive)
         self.setWindowTitle("◆ AI HUMANITY ◆")
         self.setMinimumSize(1000, 700)
         self._setup_ui()
         self.setStyleSheet(SCIFI_STYLE)
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self._update_display)
-        self.update_timer.start(100)
+        self._streaming = False
+        self.worker: AIWorker = None
+        # Потоки держим до finished: QThread нельзя удалять, пока он работает
+        self._workers = set()
+        # Панель обновляется только по событиям изменения состояния ядра
+        self.state_bridge = StateBridge(cognitive.events, parent=self)
+        self.state_bridge.changed.connect(self._update_display)
+        self._update_display(cognitive.events.snapshot())
         self.avatar = self.avatar_manager.create_avatar()
         self.avatar.show()
     
@@ -103,9 +130,10 @@ class MainWindowSciFi(QMainWindow):
         center.setObjectName("scifiPanel")
         center_layout = QVBoxLayout(center)
         
-        self.chat = QTextEdit()
+        # Лента чата держит в памяти только окно переписки из журнала
+        self.chat_model = ChatModel(self.memory, parent=self)
+        self.chat = ChatView(self.chat_model)
         self.chat.setObjectName("chatArea")
-        self.chat.setReadOnly(True)
         center_layout.addWidget(self.chat)
         
         input_row = QHBoxLayout()
@@ -132,8 +160,7 @@ class MainWindowSciFi(QMainWindow):
         right_layout.addWidget(self.level_label)
         
         self.skills_widget = SkillsWidget(self.cognitive.skills)
-        right_layout.addWidget(self.skills_widget)
-        right_layout.addStretch()
+        right_layout.addWidget(self.skills_widget, stretch=1)
         
         main.addWidget(right)
     
@@ -163,6 +190,8 @@ class MainWindowSciFi(QMainWindow):
         if success:
             self.tts_status.setText("TTS: Активен ✓")
             self.tts_status.setStyleSheet("color: #4ecca3; font-size: 10px;")
+            # Заранее озвучиваем фиксированные фразы в кэш
+            self.tts_manager.prewarm(self.cognitive.canned_responses() + AutonomousLife.THOUGHTS)
         else:
             self.tts_checkbox.setChecked(False)
             self.tts_status.setText("TTS: Ошибка загрузки")
@@ -182,7 +211,7 @@ class MainWindowSciFi(QMainWindow):
             else:
                 self._add_message("SYSTEM", "Сначала включите TTS", "#ffaa00")
 
-        def _open_voice_library(self):
+    def _open_voice_library(self):
         """Открыть диалог библиотеки голосов"""
         dialog = VoiceDialog(self)
         dialog.voice_selected.connect(self._on_voice_selected)
@@ -202,43 +231,93 @@ class MainWindowSciFi(QMainWindow):
         path, _ = QFileDialog.getOpenFileName(self, "Выбрать модель", "", "3D (*.vrm *.glb *.obj)")
         if path:
             self.avatar.hide()
+            self.avatar.deleteLater()
+            # Меш декодируется в фоне, окно аватара появляется сразу
             self.avatar = self.avatar_manager.create_avatar(model_path=path)
+            self.avatar.model_loader.failed.connect(
+                lambda _path, error: self._add_message("SYSTEM", f"Не удалось загрузить модель: {error}", "#ff006e"))
             self.avatar.show()
-            self._add_message("SYSTEM", f"Загружена модель: {Path(path).name}", "#4ecca3")
+            self._add_message("SYSTEM", f"Загружается модель: {Path(path).name}", "#4ecca3")
     
     def _send(self):
         text = self.input_field.text().strip()
         if not text:
             return
         self.input_field.clear()
+        self.chat.scroll_to_latest()
+        # Barge-in: новый вопрос прерывает предыдущий ответ и его озвучку
+        self.tts_manager.stop()
+        self._cancel_worker()
         self._add_message("USER", text, "#00d4ff")
-        self.worker = AIWorker(self.cognitive, text)
-        self.worker.response_ready.connect(self._on_response)
-        self.worker.start()
+        worker = AIWorker(self.cognitive, text)
+        worker.delta_ready.connect(self._on_delta)
+        worker.response_ready.connect(self._on_response)
+        worker.finished.connect(self._on_worker_finished)
+        self._workers.add(worker)
+        self.worker = worker
+        worker.start()
+
+    def _cancel_worker(self):
+        """Остановить текущий ответ; уже показанный текст остаётся в чате"""
+        worker, self.worker = self.worker, None
+        if self._streaming:
+            self._streaming = False
+            self.chat_model.end_stream()
+        if worker is not None and not worker.isFinished():
+            worker.delta_ready.disconnect(self._on_delta)
+            worker.response_ready.disconnect(self._on_response)
+            worker.cancel()
+    
+    def _on_worker_finished(self):
+        self._workers.discard(self.sender())
+
+    def _on_delta(self, delta: str):
+        """Дописать кусок стримингового ответа в чат и передать его в TTS"""
+        if self.sender() is not self.worker:
+            return  # Запоздавший кусок прерванного ответа
+        if not self._streaming:
+            self._streaming = True
+            self.chat_model.begin_stream("AI", "#ff006e")
+            self.tts_manager.on_stream_start(self.cognitive.last_stream_metrics)
+        self.chat_model.append_delta(delta)
+        self.tts_manager.on_stream_delta(delta)
     
     def _on_response(self, response: str):
-        self._add_message("AI", response, "#ff006e")
-        self.skills_widget.refresh()
+        if self.sender() is not self.worker:
+            return
+        if self._streaming:
+            self._streaming = False
+            self.chat_model.end_stream(response)
+            self.tts_manager.on_stream_end()
+        else:
+            self._add_message("AI", response, "#ff006e")
+            # Озвучиваем ответ если TTS включён
+            self.tts_manager.on_response(response)
         self.avatar_manager.on_response(response)
-        # Озвучиваем ответ если TTS включён
-        self.tts_manager.on_response(response)
-        self.worker.deleteLater()
     
     def _add_message(self, sender: str, text: str, color: str):
-        safe = html.escape(text)
-        self.chat.append(f'<div><span style="color:{color}">▸ {sender}</span><br>{safe}</div>')
+        self.chat_model.append(sender, text, color)
     
-    def _update_display(self):
-        state = self.cognitive.get_state()
-        self.emotion_label.setText(state['emotion'].upper())
-        self.mood_label.setText(state['mood'])
-        self.p_bar.setValue(int(state['pad']['pleasure'] * 100))
-        self.a_bar.setValue(int(state['pad']['arousal'] * 100))
-        self.d_bar.setValue(int(state['pad']['dominance'] * 100))
-        self.level_label.setText(f"LVL {state['total_level']}")
+    def _update_display(self, changes: dict):
+        """Перерисовать только то, что изменилось"""
+        if "emotion" in changes:
+            emotion, mood = changes["emotion"]
+            self.emotion_label.setText(emotion.upper())
+            self.mood_label.setText(mood)
+            self.avatar_manager.on_emotion(emotion)
+        if "pad" in changes:
+            for bar, value in zip((self.p_bar, self.a_bar, self.d_bar), changes["pad"]):
+                bar.setValue(int(value * 100))  # тот же процент — Qt не перерисовывает
+        if "level" in changes:
+            self.level_label.setText(f"LVL {changes['level']}")
+        skills = {topic[6:]: value for topic, value in changes.items() if topic.startswith("skill.")}
+        if skills:
+            self.skills_widget.update_skills(skills)
     
     def closeEvent(self, event):
         """Очистка при закрытии"""
+        self.state_bridge.close()
+        self.memory.save_conversation(self.chat_model.conversation_id)
         self.tts_manager.stop()
         if self.tts_manager.engine:
             self.tts_manager.engine.cleanup()
@@ -1,40 +1,83 @@
-"""Виджет навыков"""
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QProgressBar, QFrame
+"""Виджет навыков
+
+Одна постоянная карточка на навык; события "skill.<имя>" из StateBus
+обновляют только изменившиеся подписи и полоски. Новый навык (в том
+числе созданный автоматически) добавляет карточку, остальные не трогаются.
+"""
+from typing import Dict, Tuple
+
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QProgressBar, QFrame, QScrollArea
 from PyQt6.QtCore import Qt
 
+SkillState = Tuple[str, float, int]  # (уровень, опыт, использований)
+
+
+class SkillCard(QFrame):
+    def __init__(self, name: str, parent=None):
+        super().__init__(parent)
+        self.skill_name = name
+        self._state = None
+        self.setStyleSheet("background: rgba(0,40,60,0.5); border-radius: 5px; padding: 5px;")
+        layout = QVBoxLayout(self)
+        layout.setSpacing(4)
+
+        self.name_label = QLabel(name)
+        self.name_label.setStyleSheet("color: #00d4ff; font-size: 11px;")
+        layout.addWidget(self.name_label)
+
+        self.bar = QProgressBar()
+        self.bar.setRange(0, 100)
+        self.bar.setFixedHeight(6)
+        self.bar.setTextVisible(False)
+        layout.addWidget(self.bar)
+
+    def set_state(self, state: SkillState):
+        if state == self._state:
+            return
+        level, experience, _uses = state
+        if self._state is None or self._state[0] != level:
+            self.name_label.setText(f"{self.skill_name} - {level}")
+        self.bar.setValue(min(int(experience), 100))
+        self._state = state
+
+
 class SkillsWidget(QWidget):
     def __init__(self, skill_system, parent=None):
         super().__init__(parent)
         self.skill_system = skill_system
+        self._cards: Dict[str, SkillCard] = {}
         self._setup_ui()
-    
+
     def _setup_ui(self):
-        self.layout = QVBoxLayout(self)
-        self.layout.setSpacing(8)
-        self.layout.setContentsMargins(0, 0, 0, 0)
+        outer = QVBoxLayout(self)
+        outer.setContentsMargins(0, 0, 0, 0)
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setFrameShape(QFrame.Shape.NoFrame)
+        scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        scroll.setStyleSheet("background: transparent;")
+        container = QWidget()
+        self._cards_layout = QVBoxLayout(container)
+        self._cards_layout.setSpacing(8)
+        self._cards_layout.setContentsMargins(0, 0, 0, 0)
+        self._cards_layout.addStretch()
+        scroll.setWidget(container)
+        outer.addWidget(scroll)
         self.refresh()
-    
+
+    def update_skills(self, changes: Dict[str, SkillState]):
+        """Применить изменения {имя навыка: (уровень, опыт, использований)}"""
+        for name, state in changes.items():
+            card = self._cards.get(name)
+            if card is None:
+                card = SkillCard(name)
+                self._cards[name] = card
+                self._cards_layout.insertWidget(self._cards_layout.count() - 1, card)  # перед stretch
+            card.set_state(state)
+
     def refresh(self):
-        while self.layout.count():
-            item = self.layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-        
-        for skill in list(self.skill_system.skills.values())[:5]:
-            card = QFrame()
-            card.setStyleSheet("background: rgba(0,40,60,0.5); border-radius: 5px; padding: 5px;")
-            card_layout = QVBoxLayout(card)
-            card_layout.setSpacing(4)
-            
-            name = QLabel(f"{skill.name} - {skill.level.value}")
-            name.setStyleSheet("color: #00d4ff; font-size: 11px;")
-            card_layout.addWidget(name)
-            
-            bar = QProgressBar()
-            bar.setRange(0, 100)
-            bar.setValue(min(int(skill.experience), 100))
-            bar.setFixedHeight(6)
-            bar.setTextVisible(False)
-            card_layout.addWidget(bar)
-            
-            self.layout.addWidget(card)
+        """Сверить карточки со всеми навыками (без пересоздания виджетов)"""
+        self.update_skills({
+            name: (skill.level.value, skill.experience, skill.uses)
+            for name, skill in self.skill_system.skills.items()
+        })
@@ -0,0 +1,52 @@
+"""Мост StateBus -> Qt
+
+События ядра приходят из любых потоков (AIWorker, распознавание лица);
+мост складывает последнее значение каждой темы и раз в coalesce_ms
+отдаёт накопленное одной пачкой в GUI-потоке. Без изменений — ни одного
+срабатывания таймера.
+"""
+import threading
+from typing import Any, Dict
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+
+class StateBridge(QObject):
+    changed = pyqtSignal(dict)  # {тема: значение}
+    _wake = pyqtSignal()
+
+    def __init__(self, bus, topic: str = "*", coalesce_ms: int = 50, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Any] = {}
+        self._versions: Dict[str, int] = {}
+        self._scheduled = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(coalesce_ms)
+        self._timer.timeout.connect(self._deliver)
+        # Сигнал из чужого потока доставляется в поток моста (queued)
+        self._wake.connect(self._timer.start)
+        self._unsubscribe = bus.subscribe(topic, self._on_event)
+
+    def _on_event(self, topic: str, value: Any, version: int):
+        with self._lock:
+            if version < self._versions.get(topic, 0):
+                return  # устаревшее событие обогнало свежее
+            self._versions[topic] = version
+            self._pending[topic] = value
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._wake.emit()
+
+    def _deliver(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._scheduled = False
+        if pending:
+            self.changed.emit(pending)
+
+    def close(self):
+        self._unsubscribe()
+        self._timer.stop()
@@ -21,7 +21,7 @@ QLineEdit {
     padding: 12px;
     color: #ffffff;
 }
-QTextEdit#chatArea {
+QListView#chatArea {
     background: rgba(5, 15, 30, 0.9);
     border: 1px solid rgba(0, 212, 255, 0.3);
     color: #e0e0e0;
@@ -1,20 +1,49 @@
 """Точка входа AI Humanity"""
 import sys
+from pathlib import Path
 from PyQt6.QtWidgets import QApplication
 from core.cognitive_cycle import CognitiveCycle
+from core.episodic_memory import EpisodicMemory
+from core.episode_log import EpisodeLog
+from core.memory_manager import MemoryManager
+from core.cycle_trace import MetricsExporter
 from gui.main_window_scifi import MainWindowSciFi
-from config.settings import OPENAI_API_KEY
+from modules.local_llm import create_backend
+from config.settings import (OPENAI_API_KEY, MEMORY_DIR, MAX_EPISODES, LLM_BACKEND, METRICS_PORT,
+                             METRICS_FILE)
 
 def main():
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
     
-    cognitive = CognitiveCycle(api_key=OPENAI_API_KEY if OPENAI_API_KEY else None)
+    episode_log = EpisodeLog(Path(MEMORY_DIR) / "episodes.jsonl")
+    memory = EpisodicMemory(max_episodes=MAX_EPISODES or None, log=episode_log)
+    memory.warm_up()
+
+    # Локальная модель грузится один раз в отдельном процессе и остаётся тёплой
+    backend = create_backend(LLM_BACKEND, api_key=OPENAI_API_KEY)
+    if backend is not None:
+        try:
+            backend.start()
+        except Exception as e:
+            print(f"[LLM] Бэкенд {LLM_BACKEND} недоступен: {e}")
+            backend = None
+    cognitive = CognitiveCycle(memory_store=memory, backend=backend)
+    # Гистограммы шагов цикла: локальный эндпоинт и/или файл
+    metrics = MetricsExporter(port=METRICS_PORT, path=METRICS_FILE).start()
     
-    window = MainWindowSciFi(cognitive)
+    conversations = MemoryManager(storage_dir=str(Path(MEMORY_DIR) / "conversations"))
+    window = MainWindowSciFi(cognitive, memory=conversations)
     window.show()
     
-    sys.exit(app.exec())
+    code = app.exec()
+    conversations.close()
+    memory.save_state()
+    episode_log.close()
+    metrics.stop()
+    if backend is not None:
+        backend.stop()
+    sys.exit(code)
 
 if __name__ == "__main__":
     main()
@@ -1,13 +1,16 @@
 from .desktop_avatar import AvatarManager, DesktopAvatar
-from .tts_engine import TTSEngine, TTSManager, TTSConfig, TTSStatus
+from .avatar_model import ModelLoader, MeshCache
+from .tts_engine import TTSEngine, TTSManager, TTSPipeline, TTSConfig, TTSStatus
 from .telegram_integration import TelegramBot, TelegramManager, TelegramConfig
 from .face_emotion import FaceEmotionDetector, FaceEmotionManager, FaceEmotionConfig, EmotionResult
 from .calendar_integration import GoogleCalendarAPI, CalendarManager, CalendarConfig, CalendarEvent
+from .local_llm import LocalLLMBackend, LocalLLMConfig, create_backend
 
 __all__ = [
-    'AvatarManager', 'DesktopAvatar',
-    'TTSEngine', 'TTSManager', 'TTSConfig', 'TTSStatus',
+    'AvatarManager', 'DesktopAvatar', 'ModelLoader', 'MeshCache',
+    'TTSEngine', 'TTSManager', 'TTSPipeline', 'TTSConfig', 'TTSStatus',
     'TelegramBot', 'TelegramManager', 'TelegramConfig',
     'FaceEmotionDetector', 'FaceEmotionManager', 'FaceEmotionConfig', 'EmotionResult',
     'GoogleCalendarAPI', 'CalendarManager', 'CalendarConfig', 'CalendarEvent',
+    'LocalLLMBackend', 'LocalLLMConfig', 'create_backend',
 ]
@@ -0,0 +1,259 @@
+"""3D-модель аватара: декодирование, бинарный кэш, запекание спрайтов
+
+Файл модели (.glb/.vrm/.obj) декодируется через trimesh в фоновом
+потоке. Меш сохраняется в компактном бинарном виде
+(`<cache>/<sha256>.mesh`), а запечённые из него кадры — лентой PNG рядом,
+поэтому повторная загрузка той же модели не трогает ни trimesh, ни
+растеризацию. В GUI-поток приходят готовые QImage.
+"""
+import logging
+import math
+import os
+import struct
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from PyQt6.QtCore import QObject, QPointF, Qt, pyqtSignal
+from PyQt6.QtGui import QColor, QImage, QPainter, QPolygonF
+
+from utils import hash_file
+
+logger = logging.getLogger(__name__)
+
+MODEL_CACHE_DIR = os.getenv('MODEL_CACHE_DIR', 'cache/models')
+
+_MESH_MAGIC = b"AVMS"
+_MESH_HEADER = struct.Struct("<4sIII")  # magic, version, vertices, faces
+_MESH_VERSION = 1
+_BAKE_VERSION = 1
+_LIGHT = np.array([0.3, 0.5, 1.0]) / np.linalg.norm([0.3, 0.5, 1.0])
+
+# Позы для запекания: (состояние, поворот вокруг вертикали в градусах,
+# сдвиг по вертикали в долях кадра). Ходьба влево — отражённая ходьба вправо.
+BAKE_POSES = [
+    ("idle", 0, 0.0),
+    ("walking_right", 50, 0.0),
+    ("walking_right", 50, -0.03),
+    ("walking_left", 50, 0.0),
+    ("walking_left", 50, -0.03),
+    ("waving", 20, 0.0),
+    ("happy", 0, -0.03),
+    ("sad", 0, 0.03),
+    ("talking", 0, 0.0),
+    ("talking", 0, -0.015),
+]
+
+
+@dataclass
+class MeshData:
+    vertices: np.ndarray  # (N, 3) float32
+    faces: np.ndarray     # (M, 3) uint32
+    colors: np.ndarray    # (N, 4) uint8, RGBA на вершину
+
+    def to_bytes(self) -> bytes:
+        header = _MESH_HEADER.pack(_MESH_MAGIC, _MESH_VERSION, len(self.vertices), len(self.faces))
+        return b"".join((header,
+                         np.ascontiguousarray(self.vertices, dtype="<f4").tobytes(),
+                         np.ascontiguousarray(self.faces, dtype="<u4").tobytes(),
+                         np.ascontiguousarray(self.colors, dtype=np.uint8).tobytes()))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "MeshData":
+        magic, version, n_vertices, n_faces = _MESH_HEADER.unpack_from(data)
+        if magic != _MESH_MAGIC or version != _MESH_VERSION:
+            raise ValueError("unsupported mesh cache format")
+        offset = _MESH_HEADER.size
+        vertices = np.frombuffer(data, "<f4", n_vertices * 3, offset).reshape(-1, 3)
+        offset += vertices.nbytes
+        faces = np.frombuffer(data, "<u4", n_faces * 3, offset).reshape(-1, 3)
+        offset += faces.nbytes
+        colors = np.frombuffer(data, np.uint8, n_vertices * 4, offset).reshape(-1, 4)
+        return cls(vertices, faces, colors)
+
+
+def decode_mesh(path: str) -> MeshData:
+    """Прочитать модель через trimesh и свести сцену в один меш"""
+    import trimesh
+
+    file_type = "glb" if Path(path).suffix.lower() == ".vrm" else None  # VRM — это glTF
+    loaded = trimesh.load(path, file_type=file_type, force="scene")
+    mesh = loaded.to_mesh() if hasattr(loaded, "to_mesh") else loaded.dump(concatenate=True)
+    if len(mesh.faces) == 0:
+        raise ValueError(f"no triangles in {path}")
+
+    try:
+        visual = mesh.visual
+        if hasattr(visual, "to_color"):
+            visual = visual.to_color()  # текстура -> цвета вершин
+        colors = visual.vertex_colors
+    except Exception:
+        colors = None
+    if colors is None or len(colors) != len(mesh.vertices):
+        colors = np.tile(np.array([255, 200, 150, 255], np.uint8), (len(mesh.vertices), 1))
+    return MeshData(np.asarray(mesh.vertices, np.float32),
+                    np.asarray(mesh.faces, np.uint32),
+                    np.asarray(colors, np.uint8)[:, :4])
+
+
+class MeshCache:
+    """Кэш декодированных мешей и запечённых кадров по хэшу файла модели"""
+
+    def __init__(self, cache_dir: str = MODEL_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def _mesh_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.mesh"
+
+    def _sprites_path(self, key: str, size: int) -> Path:
+        return self.cache_dir / f"{key}_{size}_v{_BAKE_VERSION}.png"
+
+    def get_mesh(self, key: str) -> Optional[MeshData]:
+        try:
+            return MeshData.from_bytes(self._mesh_path(key).read_bytes())
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def put_mesh(self, key: str, mesh: MeshData):
+        self._write(self._mesh_path(key), mesh.to_bytes())
+
+    def get_sprites(self, key: str, size: int) -> Optional[QImage]:
+        path = self._sprites_path(key, size)
+        if not path.exists():
+            return None
+        strip = QImage(str(path))
+        return None if strip.isNull() or strip.width() != size * len(BAKE_POSES) else strip
+
+    def put_sprites(self, key: str, size: int, strip: QImage):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self._sprites_path(key, size).with_suffix(".tmp.png")
+        if strip.save(str(tmp), "PNG"):
+            os.replace(tmp, self._sprites_path(key, size))
+
+    def _write(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+
+def _render_view(mesh: MeshData, vertices: np.ndarray, scale: float, yaw: float,
+                 render: int, max_faces: int) -> QImage:
+    """Один ракурс меша: плоское затенение, грани от дальних к ближним"""
+    a = math.radians(yaw)
+    x = vertices[:, 0] * math.cos(a) + vertices[:, 2] * math.sin(a)
+    z = -vertices[:, 0] * math.sin(a) + vertices[:, 2] * math.cos(a)
+    rotated = np.stack([x, vertices[:, 1], z], axis=1)
+    screen = np.stack([render / 2 + x * scale, render / 2 - vertices[:, 1] * scale], axis=1)
+
+    tri = rotated[mesh.faces]
+    normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True) + 1e-12
+    shade = 0.35 + 0.65 * np.abs(normals @ _LIGHT)
+    pts = screen[mesh.faces]
+    # Знак площади на экране (ось y вниз): > 0 — грань смотрит на камеру
+    area = ((pts[:, 1, 0] - pts[:, 0, 0]) * (pts[:, 0, 1] - pts[:, 2, 1])
+            - (pts[:, 0, 1] - pts[:, 1, 1]) * (pts[:, 2, 0] - pts[:, 0, 0]))
+    keep = np.flatnonzero(np.abs(area) > 1e-3)
+    if len(keep) > max_faces:
+        # Тяжёлая модель: отбрасываем задние грани, затем самые мелкие
+        front = keep[area[keep] > 0]
+        keep = front if len(front) else keep
+        if len(keep) > max_faces:
+            keep = keep[np.argpartition(np.abs(area[keep]), -max_faces)[-max_faces:]]
+    keep = keep[np.argsort(tri[keep, :, 2].mean(axis=1))]
+    face_colors = mesh.colors[mesh.faces[keep]].mean(axis=1)
+    face_colors[:, :3] *= shade[keep, None]
+    face_colors = np.clip(face_colors, 0, 255).astype(int).tolist()
+
+    image = QImage(render, render, QImage.Format.Format_ARGB32_Premultiplied)
+    image.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(image)
+    painter.setPen(Qt.PenStyle.NoPen)
+    for (p0, p1, p2), (r, g, b, alpha) in zip(pts[keep].tolist(), face_colors):
+        painter.setBrush(QColor(r, g, b, alpha))
+        painter.drawPolygon(QPolygonF([QPointF(*p0), QPointF(*p1), QPointF(*p2)]))
+    painter.end()
+    return image
+
+
+def bake_sprites(mesh: MeshData, size: int, max_faces: int = 40000) -> QImage:
+    """Растеризовать позы BAKE_POSES в ленту кадров size x size.
+
+    Каждый ракурс рисуется один раз в двойном разрешении (QImage, поэтому
+    можно вне GUI-потока) и сглаживающе уменьшается; позы с тем же
+    ракурсом отличаются только сдвигом.
+    """
+    render = size * 2
+    vertices = mesh.vertices.astype(np.float64)
+    vertices -= (vertices.min(axis=0) + vertices.max(axis=0)) / 2
+    height = np.ptp(vertices[:, 1]) or 1.0
+    radius = np.sqrt(vertices[:, 0] ** 2 + vertices[:, 2] ** 2).max() or 1.0
+    scale = 0.9 * render / max(height, 2 * radius)
+
+    views: Dict[float, QImage] = {}
+    strip = QImage(size * len(BAKE_POSES), size, QImage.Format.Format_ARGB32_Premultiplied)
+    strip.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(strip)
+    for i, (_state, yaw, bob) in enumerate(BAKE_POSES):
+        if yaw not in views:
+            views[yaw] = _render_view(mesh, vertices, scale, yaw, render, max_faces).scaled(
+                size, size, Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        painter.setClipRect(i * size, 0, size, size)
+        painter.drawImage(i * size, round(bob * size), views[yaw])
+    painter.end()
+    return strip
+
+
+def split_sprites(strip: QImage, size: int) -> Dict[str, List[QImage]]:
+    """Разрезать ленту кадров по состояниям BAKE_POSES"""
+    frames: Dict[str, List[QImage]] = {}
+    for i, (state, _yaw, _bob) in enumerate(BAKE_POSES):
+        frames.setdefault(state, []).append(strip.copy(i * size, 0, size, size))
+    return frames
+
+
+def load_sprite_frames(path: str, size: int, cache: MeshCache = None) -> Dict[str, List[QImage]]:
+    """Кадры аватара из файла модели: кэш кадров -> кэш меша -> trimesh"""
+    cache = cache or MeshCache()
+    key = hash_file(path)
+    strip = cache.get_sprites(key, size)
+    if strip is None:
+        mesh = cache.get_mesh(key)
+        if mesh is None:
+            mesh = decode_mesh(path)
+            cache.put_mesh(key, mesh)
+        strip = bake_sprites(mesh, size)
+        cache.put_sprites(key, size, strip)
+    return split_sprites(strip, size)
+
+
+class ModelLoader(QObject):
+    """Загрузка модели в фоновом потоке; результат — сигналом в поток владельца"""
+    loaded = pyqtSignal(str, object)  # путь, {состояние: [QImage]}
+    failed = pyqtSignal(str, str)     # путь, ошибка
+
+    def __init__(self, cache: MeshCache = None, parent=None):
+        super().__init__(parent)
+        self.cache = cache or MeshCache()
+
+    def load(self, path: str, size: int):
+        threading.Thread(target=self._run, args=(path, size), daemon=True).start()
+
+    def _run(self, path: str, size: int):
+        try:
+            frames = load_sprite_frames(path, size, self.cache)
+        except Exception as e:
+            logger.error(f"Failed to load avatar model {path}: {e}")
+            self._emit(self.failed, path, str(e))
+            return
+        self._emit(self.loaded, path, frames)
+
+    @staticmethod
+    def _emit(signal, *args):
+        try:
+            signal.emit(*args)
+        except RuntimeError:
+            pass  # аватар уже закрыт, пока модель грузилась
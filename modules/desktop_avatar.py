@@ -6,11 +6,13 @@ import time
 from pathlib import Path
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 
 from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel
 from PyQt6.QtCore import Qt, QTimer, QPoint, pyqtSignal
-from PyQt6.QtGui import QPixmap, QPainter, QColor, QTransform
+from PyQt6.QtGui import QPixmap, QPainter, QColor, QTransform, QImage
+
+from .avatar_model import ModelLoader
 
 def get_asset_path(relative_path: str) -> Path:
     if getattr(sys, 'frozen', False):
@@ -36,12 +38,22 @@ class AvatarConfig:
     allow_drag: bool = True
 
 class SpriteAvatar:
-    def __init__(self):
+    """Спрайты аватара и атлас готовых кадров.
+
+    Атлас хранит каждый кадр уже отмасштабированным и отражённым:
+    (состояние, кадр, отражение, размер) -> QPixmap. Всё строится один раз
+    в build_atlas, во время анимации только выбирается готовый кадр.
+    """
+
+    def __init__(self, size: int = 64):
         self.sprites: Dict[str, List[QPixmap]] = {}
+        self.atlas: Dict[Tuple[str, int, bool, int], QPixmap] = {}
+        self.atlas_size = size
         self.current_state = AvatarState.IDLE
         self.current_frame = 0
         self.flipped = False
         self._create_default_sprites()
+        self.build_atlas(size)
     
     def _create_default_sprites(self):
         size = 64
@@ -60,14 +72,35 @@ class SpriteAvatar:
             painter.end()
             self.sprites[state.value] = [pixmap]
     
+    def set_frames(self, frames: Dict[str, List[QImage]]):
+        """Заменить спрайты кадрами, запечёнными из 3D-модели"""
+        idle = frames.get(AvatarState.IDLE.value)
+        for state in AvatarState:
+            images = frames.get(state.value) or idle
+            if images:
+                self.sprites[state.value] = [QPixmap.fromImage(image) for image in images]
+        self.current_frame = 0
+        self.build_atlas(self.atlas_size)
+    
+    def build_atlas(self, size: int):
+        """Заранее отмасштабировать и отразить все кадры под размер size"""
+        mirror = QTransform().scale(-1, 1)
+        self.atlas_size = size
+        self.atlas.clear()
+        for state, frames in self.sprites.items():
+            for index, frame in enumerate(frames):
+                scaled = frame.scaled(size, size,
+                    Qt.AspectRatioMode.KeepAspectRatio,
+                    Qt.TransformationMode.SmoothTransformation)
+                self.atlas[(state, index, False, size)] = scaled
+                self.atlas[(state, index, True, size)] = scaled.transformed(mirror)
+    
+    def frame_key(self) -> Tuple[str, int, bool, int]:
+        count = len(self.sprites.get(self.current_state.value, ())) or 1
+        return (self.current_state.value, self.current_frame % count, self.flipped, self.atlas_size)
+    
     def get_current_frame(self) -> QPixmap:
-        state_sprites = self.sprites.get(self.current_state.value, [])
-        if not state_sprites:
-            return QPixmap()
-        frame = state_sprites[self.current_frame % len(state_sprites)]
-        if self.flipped:
-            return frame.transformed(QTransform().scale(-1, 1))
-        return frame
+        return self.atlas.get(self.frame_key(), QPixmap())
 
 class DesktopAvatar(QWidget):
     clicked = pyqtSignal()
@@ -79,8 +112,9 @@ class DesktopAvatar(QWidget):
         self.target_position = None
         self.is_dragging = False
         self.drag_offset = QPoint()
-        self.sprite_avatar = SpriteAvatar()
         self.avatar_size = 128
+        self.sprite_avatar = SpriteAvatar(self.avatar_size)
+        self._shown_frame = None
         
         app = QApplication.instance()
         if app and app.primaryScreen():
@@ -106,47 +140,75 @@ class DesktopAvatar(QWidget):
         self.sprite_label.setFixedSize(self.avatar_size, self.avatar_size)
         self._update_sprite()
         
+        # Таймер движения работает только пока есть цель; стоящий аватар
+        # не просыпается вовсе
         self.move_timer = QTimer(self)
+        self.move_timer.setInterval(16)
         self.move_timer.timeout.connect(self._update_position)
-        self.move_timer.start(16)
         
         self.behavior_timer = QTimer(self)
         self.behavior_timer.timeout.connect(self._decide_behavior)
         self.behavior_timer.start(3000)
+        
+        # 3D-модель грузится в фоне; до готовности показываются встроенные спрайты
+        self.model_loader = None
+        if self.config.model_path:
+            self.model_loader = ModelLoader(parent=self)
+            self.model_loader.loaded.connect(self._on_model_loaded)
+            self.model_loader.load(self.config.model_path, self.avatar_size)
+    
+    def _on_model_loaded(self, path: str, frames: dict):
+        if path != self.config.model_path:
+            return
+        self.sprite_avatar.set_frames(frames)
+        self._shown_frame = None
+        self._update_sprite()
     
     def _update_sprite(self):
-        pixmap = self.sprite_avatar.get_current_frame()
-        scaled = pixmap.scaled(self.avatar_size, self.avatar_size,
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation)
-        self.sprite_label.setPixmap(scaled)
+        """Показать кадр из атласа, если он отличается от текущего"""
+        self.sprite_avatar.current_state = self.state
+        key = self.sprite_avatar.frame_key()
+        if key == self._shown_frame:
+            return
+        self._shown_frame = key
+        self.sprite_label.setPixmap(self.sprite_avatar.get_current_frame())
+    
+    def _start_moving(self):
+        if not self.move_timer.isActive():
+            self.move_timer.start()
     
     def _update_position(self):
         if self.is_dragging or not self.target_position:
+            self.move_timer.stop()
             return
         dx = self.target_position[0] - self.avatar_x
         distance = abs(dx)
         if distance < 5:
             self.target_position = None
             self.state = AvatarState.IDLE
-            self._update_sprite()
+            self.move_timer.stop()
         else:
             speed = self.config.speed / 60
             self.avatar_x += (1 if dx > 0 else -1) * speed
             self.sprite_avatar.flipped = dx < 0
-            self._update_sprite()
-        self.move(int(self.avatar_x), int(self.avatar_y))
+            self.sprite_avatar.current_frame = int(self.avatar_x) // 16  # шаг каждые 16 px
+        self._update_sprite()
+        pos = QPoint(int(self.avatar_x), int(self.avatar_y))
+        if pos != self.pos():
+            self.move(pos)
     
     def _decide_behavior(self):
-        if self.is_dragging or self.state != AvatarState.IDLE:
+        if self.is_dragging or self.state not in (AvatarState.IDLE, AvatarState.HAPPY, AvatarState.SAD):
             return
         if random.random() < 0.4:
             new_x = random.randint(100, self.screen_width - 200)
             self.target_position = [float(new_x), self.avatar_y]
             self.state = AvatarState.WALKING_RIGHT if new_x > self.avatar_x else AvatarState.WALKING_LEFT
+            self._start_moving()
     
     def walk_to(self, x: int):
         self.target_position = [float(x), self.avatar_y]
+        self._start_moving()
     
     def wave(self):
         self.state = AvatarState.WAVING
@@ -180,6 +242,8 @@ class DesktopAvatar(QWidget):
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
             self.is_dragging = False
+            if self.target_position:
+                self._start_moving()
         super().mouseReleaseEvent(event)
 
 class AvatarManager:
@@ -196,6 +260,11 @@ class AvatarManager:
         if self.avatar:
             self.avatar.talk(min(len(response) * 0.05, 5.0))
     
+    def on_emotion(self, emotion: str):
+        """Смена доминирующей эмоции (из событий ядра); прогулку не прерываем"""
+        if self.avatar and self.avatar.state in (AvatarState.IDLE, AvatarState.HAPPY, AvatarState.SAD):
+            self.avatar.set_emotion(emotion)
+    
     def show(self):
         if self.avatar:
             self.avatar.show()
@@ -2,7 +2,7 @@
 import threading
 import queue
 from typing import Optional, Callable, Dict, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from enum import Enum
 import time
 
@@ -34,11 +34,17 @@ FER_TO_PAD = {
 class FaceEmotionConfig:
     """Конфигурация распознавания эмоций"""
     camera_index: int = 0
+    video_path: Optional[str] = None  # Видеофайл вместо камеры (бенчмарки, отладка)
     detection_interval: float = 0.5  # Секунды между детекциями
     min_confidence: float = 0.3
     mirror: bool = True
     show_preview: bool = False
     face_cascade_path: str = None  # None = использовать дефолтный
+    detect_width: int = 320  # Ширина уменьшенного кадра для поиска лица
+    change_threshold: float = 6.0  # Средняя разница кропа лица (0-255) для пересчёта эмоции
+    max_skip_seconds: float = 3.0  # Пересчитывать эмоцию не реже, даже без изменений
+    smoothing: float = 0.35  # Коэффициент EMA по вероятностям эмоций (1 = без сглаживания)
+    lost_face_frames: int = 3  # Через сколько кадров без лица сбрасывать сглаживание
 
 
 @dataclass
@@ -51,12 +57,144 @@ class EmotionResult:
     timestamp: float
 
 
+class EmotionPipeline:
+    """Анализ кадра без лишней работы
+    
+    Лицо ищется Haar-каскадом на уменьшенном кадре; классификатор FER
+    запускается только когда кроп лица заметно изменился (или давно не
+    запускался), а его вероятности сглаживаются EMA.
+    """
+    
+    CROP_SIZE = 48
+    
+    def __init__(self, config: FaceEmotionConfig, classifier=None):
+        self.config = config
+        self.classifier = classifier
+        self._cascade = None
+        self._last_box: Optional[Tuple[int, int, int, int]] = None
+        self._last_crop = None
+        self._last_classified = 0.0
+        self._smoothed: Optional[Dict[str, float]] = None
+        self._last_result: Optional[EmotionResult] = None
+        self._missed = 0
+        self.stats = {"frames": 0, "faces": 0, "classified": 0, "skipped": 0}
+    
+    def initialize(self):
+        import cv2
+        path = self.config.face_cascade_path or (
+            cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        self._cascade = cv2.CascadeClassifier(path)
+        if self._cascade.empty():
+            raise RuntimeError(f"Не удалось загрузить каскад {path}")
+    
+    def reset(self):
+        """Сбросить трекинг и сглаживание (лицо пропало)"""
+        self._last_box = None
+        self._last_crop = None
+        self._smoothed = None
+        self._last_result = None
+    
+    @property
+    def face_box(self) -> Optional[Tuple[int, int, int, int]]:
+        """Последнее найденное лицо"""
+        return self._last_box
+    
+    def detect_face(self, gray) -> Optional[Tuple[int, int, int, int]]:
+        """Найти лицо на уменьшенном кадре; при нескольких — ближайшее к прошлому"""
+        import cv2
+        height, width = gray.shape[:2]
+        scale = min(1.0, self.config.detect_width / width)
+        small = cv2.resize(gray, (int(width * scale), int(height * scale)),
+                           interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+        small = cv2.equalizeHist(small)
+        faces = self._cascade.detectMultiScale(small, scaleFactor=1.1, minNeighbors=5,
+                                               minSize=(24, 24))
+        if len(faces) == 0:
+            return None
+        
+        if self._last_box is not None:
+            lx, ly, lw, lh = self._last_box
+            cx, cy = (lx + lw / 2) * scale, (ly + lh / 2) * scale
+            x, y, w, h = min(faces, key=lambda f: (f[0] + f[2] / 2 - cx) ** 2 + (f[1] + f[3] / 2 - cy) ** 2)
+        else:
+            x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        return tuple(int(round(v / scale)) for v in (x, y, w, h))
+    
+    def _crop(self, gray, box):
+        import cv2
+        x, y, w, h = box
+        return cv2.resize(gray[max(0, y):y + h, max(0, x):x + w],
+                          (self.CROP_SIZE, self.CROP_SIZE), interpolation=cv2.INTER_AREA)
+    
+    def _face_changed(self, crop, now: float) -> bool:
+        import cv2
+        if self._last_crop is None or now - self._last_classified >= self.config.max_skip_seconds:
+            return True
+        return float(cv2.absdiff(crop, self._last_crop).mean()) >= self.config.change_threshold
+    
+    def _smooth(self, emotions: Dict[str, float]):
+        alpha = self.config.smoothing
+        if self._smoothed is None:
+            self._smoothed = dict(emotions)
+            return
+        for name, value in emotions.items():
+            self._smoothed[name] = (1 - alpha) * self._smoothed.get(name, 0.0) + alpha * value
+    
+    def process(self, frame, now: float = None) -> Optional[EmotionResult]:
+        """Обработать кадр; EmotionResult для найденного лица (без лица — None)"""
+        import cv2
+        now = time.time() if now is None else now
+        self.stats["frames"] += 1
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        
+        box = self.detect_face(gray)
+        if box is None:
+            self._missed += 1
+            if self._missed >= self.config.lost_face_frames:
+                self.reset()
+            return None
+        self._missed = 0
+        self._last_box = box
+        self.stats["faces"] += 1
+        
+        crop = self._crop(gray, box)
+        if not self._face_changed(crop, now):
+            # Лицо почти не изменилось: повторяем прошлую оценку без классификатора
+            self.stats["skipped"] += 1
+            if self._last_result is None:
+                return None
+            return replace(self._last_result, face_box=box, timestamp=now)
+        
+        faces = self.classifier.detect_emotions(frame, face_rectangles=[box])
+        if not faces:
+            return None
+        self.stats["classified"] += 1
+        self._last_crop = crop
+        self._last_classified = now
+        self._smooth(faces[0]['emotions'])
+        
+        dominant = max(self._smoothed, key=self._smoothed.get)
+        confidence = self._smoothed[dominant]
+        if confidence < self.config.min_confidence:
+            self._last_result = None
+            return None
+        self._last_result = EmotionResult(
+            emotion=FaceEmotionType(dominant),
+            confidence=confidence,
+            all_emotions=dict(self._smoothed),
+            face_box=box,
+            timestamp=now
+        )
+        return self._last_result
+
+
 class FaceEmotionDetector:
     """Детектор эмоций по лицу на базе FER и OpenCV"""
     
     def __init__(self, config: FaceEmotionConfig = None):
         self.config = config or FaceEmotionConfig()
         self.fer_detector = None
+        self.pipeline: Optional[EmotionPipeline] = None
         self.cap = None
         self._running = False
         self._thread: Optional[threading.Thread] = None
@@ -80,13 +218,16 @@ class FaceEmotionDetector:
             
             print("[FaceEmotion] Инициализация детектора...")
             
-            # Инициализируем FER
-            self.fer_detector = FER(mtcnn=True)
+            # FER только классифицирует: лица находит дешёвый каскад конвейера
+            self.fer_detector = FER(mtcnn=False)
+            self.pipeline = EmotionPipeline(self.config, self.fer_detector)
+            self.pipeline.initialize()
             
-            # Проверяем камеру
-            self.cap = cv2.VideoCapture(self.config.camera_index)
+            # Проверяем камеру (или видеофайл)
+            source = self.config.video_path or self.config.camera_index
+            self.cap = cv2.VideoCapture(source)
             if not self.cap.isOpened():
-                print(f"[FaceEmotion] Не удалось открыть камеру {self.config.camera_index}")
+                print(f"[FaceEmotion] Не удалось открыть источник {source}")
                 return False
             
             self._is_initialized = True
@@ -130,9 +271,12 @@ class FaceEmotionDetector:
         import cv2
         
         while self._running:
+            started = time.monotonic()
             try:
                 ret, frame = self.cap.read()
                 if not ret:
+                    if self.config.video_path:
+                        break  # видеофайл закончился
                     time.sleep(0.1)
                     continue
                 
@@ -140,50 +284,35 @@ class FaceEmotionDetector:
                 if self.config.mirror:
                     frame = cv2.flip(frame, 1)
                 
-                # Распознавание эмоций
-                result = self.fer_detector.detect_emotions(frame)
+                # Распознавание эмоций (классификатор — только при изменении лица)
+                emotion_result = self.pipeline.process(frame)
                 
-                if result and len(result) > 0:
-                    # Берём первое обнаруженное лицо
-                    face_data = result[0]
-                    emotions = face_data['emotions']
-                    box = face_data['box']
+                if emotion_result:
+                    self._last_result = emotion_result
                     
-                    # Находим доминирующую эмоцию
-                    dominant = max(emotions, key=emotions.get)
-                    confidence = emotions[dominant]
+                    # Отправляем в очередь
+                    try:
+                        self._result_queue.put_nowait(emotion_result)
+                    except queue.Full:
+                        pass
                     
-                    if confidence >= self.config.min_confidence:
-                        emotion_type = FaceEmotionType(dominant)
-                        
-                        emotion_result = EmotionResult(
-                            emotion=emotion_type,
-                            confidence=confidence,
-                            all_emotions=emotions,
-                            face_box=tuple(box),
-                            timestamp=time.time()
-                        )
-                        
-                        self._last_result = emotion_result
-                        
-                        # Отправляем в очередь
-                        try:
-                            self._result_queue.put_nowait(emotion_result)
-                        except queue.Full:
-                            pass
-                        
-                        # Вызываем callback
-                        if self._on_emotion_callback:
-                            self._on_emotion_callback(emotion_result)
+                    # Вызываем callback
+                    if self._on_emotion_callback:
+                        self._on_emotion_callback(emotion_result)
                 
                 # Показываем превью если включено
                 if self.config.show_preview:
-                    self._draw_preview(frame, result)
+                    if self._last_result and self.pipeline.face_box:
+                        self._draw_preview(frame, [{
+                            'box': self.pipeline.face_box,
+                            'emotions': self._last_result.all_emotions,
+                        }])
                     cv2.imshow('Face Emotion', frame)
                     if cv2.waitKey(1) & 0xFF == ord('q'):
                         break
                 
-                time.sleep(self.config.detection_interval)
+                # Держим постоянный шаг, учитывая время обработки
+                time.sleep(max(0.0, self.config.detection_interval - (time.monotonic() - started)))
                 
             except Exception as e:
                 print(f"[FaceEmotion] Ошибка в цикле: {e}")
@@ -262,12 +391,8 @@ class FaceEmotionManager:
             # Синхронизируем эмоцию пользователя с AI
             # AI может "зеркалить" или реагировать на эмоции пользователя
             pad = FER_TO_PAD.get(result.emotion, (0, 0, 0))
-            # Применяем с небольшой интенсивностью
-            self.cognitive.emotion.update_pad(
-                pleasure=self.cognitive.emotion.pad.pleasure + pad[0] * 0.1,
-                arousal=self.cognitive.emotion.pad.arousal + pad[1] * 0.1,
-                dominance=self.cognitive.emotion.pad.dominance + pad[2] * 0.1
-            )
+            # Применяем с небольшой интенсивностью (стимул уходит в очередь EmotionEngine)
+            self.cognitive.emotion.nudge(pad[0] * 0.1, pad[1] * 0.1, pad[2] * 0.1)
     
     def toggle_sync(self) -> bool:
         """Переключить синхронизацию эмоций с AI"""
@@ -0,0 +1,131 @@
+"""Local inference server: llama.cpp model over /v1/chat/completions
+
+Started by LocalLLMBackend (modules/local_llm.py) as a separate process;
+imports only the standard library and llama_cpp. The model is loaded and
+warmed up once, then serves requests one at a time, with SSE streaming.
+
+KV cache reuse: llama.cpp skips re-evaluating the longest common token
+prefix with the previous request, and a LlamaRAMCache keeps KV states of
+recent prompts, so a shared system-prompt prefix is evaluated once even
+when several conversations interleave.
+
+Run standalone:
+    python modules/llm_server.py --model models/model.gguf --port 8766
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class LocalLLMServer:
+    """llama.cpp model served over /v1/chat/completions (one request at a time)"""
+
+    def __init__(self, model_path: str, port: int, n_threads: int = 0,
+                 n_ctx: int = 4096, cache_mb: int = 512):
+        from llama_cpp import Llama, LlamaRAMCache
+
+        started = time.perf_counter()
+        self.model_name = Path(model_path).stem
+        self.llm = Llama(model_path=model_path, n_ctx=n_ctx,
+                         n_threads=n_threads or os.cpu_count(), verbose=False)
+        if cache_mb:
+            self.llm.set_cache(LlamaRAMCache(capacity_bytes=cache_mb << 20))
+        self._lock = threading.Lock()
+        # Warm-up: first evaluation pages the weights in and builds the graph
+        self.llm.create_chat_completion([{"role": "user", "content": "Привет"}], max_tokens=1)
+        logger.info(f"Model {self.model_name} loaded in {time.perf_counter() - started:.1f}s")
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._server.daemon_threads = True
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.rstrip("/") in ("/health", "/v1/models"):
+                    self._json({"status": "ok", "data": [{"id": server.model_name, "object": "model"}]})
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                if self.path.rstrip("/") != "/v1/chat/completions":
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                kwargs = {k: body[k] for k in ("max_tokens", "temperature", "top_p", "stop") if k in body}
+                with server._lock:
+                    if body.get("stream"):
+                        self._stream(server.llm.create_chat_completion(
+                            body.get("messages", []), stream=True, **kwargs))
+                    else:
+                        self._json(server.llm.create_chat_completion(body.get("messages", []), **kwargs))
+
+            def _json(self, payload):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, chunks):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                try:
+                    for chunk in chunks:
+                        self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    chunks.close()  # client aborted (e.g. moderation): stop generating
+                self.close_connection = True
+
+        return Handler
+
+    def serve_forever(self, parent_pid: int = 0):
+        if parent_pid:
+            threading.Thread(target=self._watch_parent, args=(parent_pid,), daemon=True).start()
+        self._server.serve_forever()
+
+    def _watch_parent(self, parent_pid: int):
+        """Exit together with the app that spawned the server"""
+        while True:
+            time.sleep(2)
+            try:
+                os.kill(parent_pid, 0)
+            except OSError:
+                self._server.shutdown()
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible llama.cpp server")
+    parser.add_argument("--model", required=True, help="path to a .gguf model")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--threads", type=int, default=0, help="0 = all cores")
+    parser.add_argument("--ctx", type=int, default=4096)
+    parser.add_argument("--cache-mb", type=int, default=512, help="RAM for saved KV states")
+    parser.add_argument("--parent-pid", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = LocalLLMServer(args.model, args.port, args.threads, args.ctx, args.cache_mb)
+    server.serve_forever(args.parent_pid)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Local LLM backend - a warm llama.cpp model behind an OpenAI-compatible API
+
+The GGUF model is loaded once in a separate server process
+(modules/llm_server.py) and kept there, so the GUI and bot processes stay
+small and never pay the load time per request. The server speaks the same
+/v1/chat/completions protocol (including SSE streaming) as the remote API,
+so CognitiveCycle uses its usual OpenAI client pointed at the local URL.
+
+An already running OpenAI-compatible local server (e.g. llama.cpp's
+`llama-server`) can be used instead by setting LOCAL_LLM_URL.
+"""
+import atexit
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from core.llm_backend import LLMBackend
+
+logger = logging.getLogger(__name__)
+
+# Configuration from environment
+LOCAL_LLM_MODEL = os.getenv('LOCAL_LLM_MODEL', '')
+LOCAL_LLM_URL = os.getenv('LOCAL_LLM_URL', '')
+LOCAL_LLM_PORT = int(os.getenv('LOCAL_LLM_PORT', '8766'))
+LOCAL_LLM_THREADS = int(os.getenv('LOCAL_LLM_THREADS', '0'))
+LOCAL_LLM_CTX = int(os.getenv('LOCAL_LLM_CTX', '4096'))
+LOCAL_LLM_CACHE_MB = int(os.getenv('LOCAL_LLM_CACHE_MB', '512'))
+
+SERVER_SCRIPT = Path(__file__).with_name("llm_server.py")
+
+
+@dataclass
+class LocalLLMConfig:
+    """Local inference server configuration"""
+    model_path: str = field(default_factory=lambda: LOCAL_LLM_MODEL)
+    url: str = field(default_factory=lambda: LOCAL_LLM_URL)  # external server, no spawn
+    port: int = field(default_factory=lambda: LOCAL_LLM_PORT)
+    n_threads: int = field(default_factory=lambda: LOCAL_LLM_THREADS)  # 0 = all cores
+    n_ctx: int = field(default_factory=lambda: LOCAL_LLM_CTX)
+    cache_mb: int = field(default_factory=lambda: LOCAL_LLM_CACHE_MB)
+    start_timeout: float = 300.0
+
+
+class LocalLLMBackend(LLMBackend):
+    """Spawns (once) and owns the local inference server process"""
+    name = "local"
+
+    def __init__(self, config: LocalLLMConfig = None):
+        self.config = config or LocalLLMConfig()
+        model = Path(self.config.model_path).stem if self.config.model_path else "local"
+        url = self.config.url or f"http://127.0.0.1:{self.config.port}/v1"
+        super().__init__(api_key="local", base_url=url, model=model)
+        # One model serves requests in turn: a hedged duplicate only queues behind the original
+        self.transport_config.hedge = False
+        self._process: Optional[subprocess.Popen] = None
+
+    def start(self) -> "LocalLLMBackend":
+        """Start the server (if not external) and wait until the model is loaded"""
+        if self.config.url or self._process is not None:
+            return self
+        if self._is_ready():
+            logger.info(f"Reusing local LLM server at {self.base_url}")
+            return self
+        if not self.config.model_path or not Path(self.config.model_path).exists():
+            raise FileNotFoundError(f"LOCAL_LLM_MODEL not found: {self.config.model_path!r}")
+
+        # Run as a script: the server needs neither this package nor Qt
+        cmd = [sys.executable, str(SERVER_SCRIPT),
+               "--model", self.config.model_path, "--port", str(self.config.port),
+               "--threads", str(self.config.n_threads), "--ctx", str(self.config.n_ctx),
+               "--cache-mb", str(self.config.cache_mb), "--parent-pid", str(os.getpid())]
+        logger.info(f"Starting local LLM server: {self.config.model_path}")
+        self._process = subprocess.Popen(cmd)
+        atexit.register(self.stop)
+
+        deadline = time.monotonic() + self.config.start_timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(f"Local LLM server exited with code {self._process.returncode}")
+            if self._is_ready():
+                logger.info(f"Local LLM server ready at {self.base_url}")
+                return self
+            time.sleep(0.2)
+        self.stop()
+        raise TimeoutError("Local LLM server did not load the model in time")
+
+    def _is_ready(self) -> bool:
+        try:
+            with urllib.request.urlopen(self.base_url.rsplit("/v1", 1)[0] + "/health", timeout=1) as r:
+                return json.load(r).get("status") == "ok"
+        except (OSError, ValueError):
+            return False
+
+    def stop(self):
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        self._process = None
+
+    def get_status(self) -> dict:
+        status = super().get_status()
+        status["running"] = self._process is not None and self._process.poll() is None
+        return status
+
+
+def create_backend(name: str, api_key: str = "", config: LocalLLMConfig = None) -> Optional[LLMBackend]:
+    """Backend by name ("openai" / "local"); None means offline canned replies"""
+    if name == "local":
+        return LocalLLMBackend(config)
+    if api_key:
+        return LLMBackend(api_key)
+    return None
@@ -0,0 +1,105 @@
+"""Speaker Latents - precomputed XTTS speaker conditioning
+
+XTTS derives GPT conditioning latents and a speaker embedding from the
+reference audio on every tts_to_file(speaker_wav=...) call. Here they are
+computed once, stored next to the voice sample (voices/<id>/latents.pt)
+and kept in memory while the voice is in use.
+"""
+import os
+import threading
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from utils import hash_file
+
+logger = logging.getLogger(__name__)
+
+LATENTS_FILENAME = "latents.pt"
+
+
+def latents_path(speaker_wav: str) -> Optional[Path]:
+    """Where latents of a voice-library sample live (None for other files)"""
+    path = Path(speaker_wav)
+    if path.stem != "sample":
+        return None
+    return path.with_name(LATENTS_FILENAME)
+
+
+def supports_latents(model: Any) -> bool:
+    """True for XTTS-like models with explicit conditioning"""
+    return hasattr(model, "get_conditioning_latents") and hasattr(model, "inference")
+
+
+def compute_latents(model: Any, speaker_wav: str) -> Tuple[Any, Any]:
+    """Extract (gpt_cond_latent, speaker_embedding) from reference audio"""
+    return model.get_conditioning_latents(audio_path=[speaker_wav])
+
+
+def save_latents(path: Path, latents: Tuple[Any, Any], source_hash: str) -> None:
+    import torch
+    gpt_cond_latent, speaker_embedding = latents
+    tmp = path.with_name(path.name + ".tmp")
+    torch.save({
+        "gpt_cond_latent": gpt_cond_latent.cpu(),
+        "speaker_embedding": speaker_embedding.cpu(),
+        "source_sha256": source_hash,
+    }, tmp)
+    os.replace(tmp, path)
+
+
+def load_latents(path: Path, source_hash: str = None, device: str = "cpu") -> Optional[Tuple[Any, Any]]:
+    """Load saved latents; None if missing or made from another sample"""
+    import torch
+    try:
+        data = torch.load(path, map_location=device)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Cannot load speaker latents {path}: {e}")
+        return None
+    if source_hash and data.get("source_sha256") != source_hash:
+        return None
+    return data["gpt_cond_latent"], data["speaker_embedding"]
+
+
+class SpeakerLatentCache:
+    """In-memory cache of speaker latents backed by voices/<id>/latents.pt"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latents: Dict[Tuple[str, float, int], Tuple[Any, Any]] = {}
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "computed": 0}
+
+    def get(self, model: Any, speaker_wav: str) -> Tuple[Any, Any]:
+        """Latents for speaker_wav: memory, then disk, then computed and saved"""
+        st = os.stat(speaker_wav)
+        marker = (os.path.abspath(speaker_wav), st.st_mtime, st.st_size)
+        with self._lock:
+            latents = self._latents.get(marker)
+            if latents is not None:
+                self.stats["memory_hits"] += 1
+                return latents
+
+            device = str(getattr(model, "device", "cpu"))
+            path = latents_path(speaker_wav)
+            source_hash = hash_file(speaker_wav)
+            latents = load_latents(path, source_hash, device) if path else None
+            if latents is not None:
+                self.stats["disk_hits"] += 1
+            else:
+                latents = compute_latents(model, speaker_wav)
+                self.stats["computed"] += 1
+                if path:
+                    try:
+                        save_latents(path, latents, source_hash)
+                    except OSError as e:
+                        logger.warning(f"Cannot save speaker latents {path}: {e}")
+            # Drop stale entries of the same file (re-recorded sample)
+            self._latents = {k: v for k, v in self._latents.items() if k[0] != marker[0]}
+            self._latents[marker] = latents
+            return latents
+
+    def clear(self):
+        with self._lock:
+            self._latents.clear()
@@ -5,6 +5,11 @@ from typing import Optional, Dict, Any, Callable
 from dataclasses import dataclass
 from enum import Enum
 
+from core.cycle_trace import format_latency_lines
+from core.episodic_memory import EpisodicMemory
+from core.session_manager import SessionManager
+from core.worker_pool import CognitiveWorkerPool, QueueFullError
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -23,6 +28,14 @@ class TelegramConfig:
     allowed_users: list = None  # None = все пользователи
     max_message_length: int = 4096
     typing_simulation: bool = True
+    max_concurrency: int = 8  # Сколько сообщений обрабатывается параллельно
+    max_pending_per_chat: int = 20  # Лимит очереди одного чата
+    session_dir: str = "data/sessions"  # Куда выгружаются сессии чатов
+    max_active_sessions: int = 1000  # Сколько сессий держать в памяти
+    session_idle_ttl: float = 1800.0  # Выгрузка после простоя, секунды
+    session_max_episodes: int = 200  # Эпизодов в памяти одной сессии
+    stream_responses: bool = True  # Показывать ответ по мере генерации
+    stream_edit_interval: float = 1.0  # Как часто редактировать сообщение, секунды
     
     def __post_init__(self):
         if self.allowed_users is None:
@@ -40,6 +53,21 @@ class TelegramBot:
         self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._on_message_callback: Optional[Callable] = None
         self.user_sessions: Dict[int, Dict[str, Any]] = {}
+        self.pool = CognitiveWorkerPool(
+            max_concurrency=config.max_concurrency,
+            max_pending_per_chat=config.max_pending_per_chat,
+        )
+        # У каждого чата своё когнитивное состояние; LLM-клиенты общие
+        self.sessions: Optional[SessionManager] = None
+        if cognitive_cycle is not None:
+            self.sessions = SessionManager(
+                factory=lambda: cognitive_cycle.new_session(
+                    EpisodicMemory(max_episodes=config.session_max_episodes)),
+                storage_dir=config.session_dir,
+                max_active=config.max_active_sessions,
+                idle_ttl=config.session_idle_ttl,
+            )
+        self._sweep_task: Optional[asyncio.Task] = None
     
     def set_message_callback(self, callback: Callable):
         """Установить callback для получения сообщений в GUI"""
@@ -59,8 +87,9 @@ class TelegramBot:
             self.status = BotStatus.STARTING
             logger.info("[Telegram] Запуск бота...")
             
-            # Создаём приложение
-            self.app = Application.builder().token(self.config.token).build()
+            # Создаём приложение; апдейты обрабатываются параллельно,
+            # порядок внутри чата и лимит параллелизма держит self.pool
+            self.app = Application.builder().token(self.config.token).concurrent_updates(True).build()
             
             # Регистрируем обработчики
             self.app.add_handler(CommandHandler("start", self._cmd_start))
@@ -77,6 +106,8 @@ class TelegramBot:
             await self.app.updater.start_polling()
             
             self.status = BotStatus.RUNNING
+            if self.sessions:
+                self._sweep_task = asyncio.create_task(self._sweep_loop())
             logger.info("[Telegram] Бот запущен успешно!")
             return True
             
@@ -91,6 +122,11 @@ class TelegramBot:
     
     async def stop(self):
         """Остановить бота"""
+        if self._sweep_task:
+            self._sweep_task.cancel()
+            self._sweep_task = None
+        if self.sessions:
+            await asyncio.get_running_loop().run_in_executor(None, self.sessions.save_all)
         if self.app:
             logger.info("[Telegram] Остановка бота...")
             await self.app.updater.stop()
@@ -99,6 +135,21 @@ class TelegramBot:
             self.status = BotStatus.STOPPED
             logger.info("[Telegram] Бот остановлен")
     
+    async def _sweep_loop(self, interval: float = 60.0):
+        """Периодически выгружать простаивающие сессии на диск"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            evicted = await loop.run_in_executor(None, self.sessions.sweep)
+            if evicted:
+                logger.info(f"[Telegram] Выгружено простаивающих сессий: {evicted}")
+    
+    async def _chat_cycle(self, update):
+        """Когнитивный цикл чата (None, если система не подключена)"""
+        if self.sessions is None:
+            return None
+        return await self.sessions.aget(update.effective_chat.id)
+    
     def _check_user(self, user_id: int) -> bool:
         """Проверить, разрешён ли пользователь"""
         if not self.config.allowed_users:
@@ -148,15 +199,31 @@ class TelegramBot:
         if not self._check_user(update.effective_user.id):
             return
         
-        if self.cognitive:
-            state = self.cognitive.get_state()
+        cycle = await self._chat_cycle(update)
+        if cycle:
+            state = cycle.get_state()
+            transport = state['transport']
+            llm_line = (
+                f"🔌 LLM: {transport['breaker']}, p95 {transport['ttft_p95_ms']:.0f} мс, "
+                f"повторов {transport['retries']}, отказов {transport['rejected']}\n"
+                if transport else ""
+            )
+            latency = "".join(f"{line}\n" for line in format_latency_lines(state['trace'], "`{}`"))
             status_text = (
                 "📊 **Мой статус**\n\n"
                 f"🧠 Цикл: {state['cycle']}\n"
                 f"😊 Эмоция: {state['emotion']}\n"
                 f"💭 Настроение: {state['mood']}\n"
                 f"⚡ Уровень: {state['total_level']}\n"
-                f"🛡️ Режим безопасности: {state['safety_mode']}"
+                f"🛡️ Режим безопасности: {state['safety_mode']}\n"
+                f"✂️ Ответов остановлено: {state['moderation']['aborted']}, "
+                f"сэкономлено токенов: {state['moderation']['tokens_saved']}\n"
+                f"🗃️ Кэш ответов: {state['cache']['hit_rate']:.0%} попаданий, "
+                f"сэкономлено {state['cache']['saved_s']:.1f} с\n"
+                f"{llm_line}"
+                f"{latency}"
+                f"📨 Очередь: {self.pool.queue_depth}, в работе: {self.pool.in_flight}\n"
+                f"👥 Активных сессий: {self.sessions.active_count}"
             )
         else:
             status_text = "⚠️ Когнитивная система не подключена"
@@ -168,8 +235,9 @@ class TelegramBot:
         if not self._check_user(update.effective_user.id):
             return
         
-        if self.cognitive:
-            state = self.cognitive.get_state()
+        cycle = await self._chat_cycle(update)
+        if cycle:
+            state = cycle.get_state()
             pad = state['pad']
             emotion_text = (
                 "😊 **Эмоциональное состояние**\n\n"
@@ -191,12 +259,13 @@ class TelegramBot:
         if not self._check_user(update.effective_user.id):
             return
         
-        if self.cognitive:
-            skills = self.cognitive.skills.skills
+        cycle = await self._chat_cycle(update)
+        if cycle:
+            skills = cycle.skills.skills
             skills_text = "⚡ **Мои навыки**\n\n"
             for name, skill in list(skills.items())[:10]:
                 skills_text += f"• {skill.name}: {skill.level.value} ({int(skill.experience)} XP)\n"
-            skills_text += f"\n🎯 Общий уровень: {self.cognitive.skills.get_total_level()}"
+            skills_text += f"\n🎯 Общий уровень: {cycle.skills.get_total_level()}"
         else:
             skills_text = "⚠️ Система навыков не подключена"
         
@@ -210,6 +279,9 @@ class TelegramBot:
         
         if user_id in self.user_sessions:
             del self.user_sessions[user_id]
+        if self.sessions:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.sessions.drop, update.effective_chat.id)
         
         await update.message.reply_text("🔄 Контекст сброшен. Начнём сначала!")
     
@@ -220,6 +292,14 @@ class TelegramBot:
             await update.message.reply_text("⛔ Доступ запрещён")
             return
         
+        try:
+            await self.pool.submit(update.effective_chat.id, self._process_message, update, context)
+        except QueueFullError:
+            await update.message.reply_text("⏳ Слишком много сообщений, дождись ответа на предыдущие")
+    
+    async def _process_message(self, update, context):
+        """Обработка одного сообщения внутри очереди чата"""
+        user = update.effective_user
         text = update.message.text
         session = self._get_session(user.id)
         session["message_count"] += 1
@@ -232,14 +312,55 @@ class TelegramBot:
         if self.config.typing_simulation:
             await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
         
-        # Генерируем ответ
-        if self.cognitive:
-            response = self.cognitive.run_cycle(text)
-            session["last_emotion"] = self.cognitive.get_state()["emotion"]
+        # Генерируем ответ в состоянии этого чата, не блокируя event loop
+        if self.sessions:
+            async with self.sessions.asession(update.effective_chat.id) as cycle:
+                if self.config.stream_responses:
+                    await self._stream_reply(update, cycle.arun_cycle_stream(text))
+                else:
+                    await self._reply(update, await cycle.arun_cycle(text))
+                # Последняя опубликованная эмоция, без пересчёта get_state()
+                session["last_emotion"] = cycle.events.get("emotion", ("",))[0]
         else:
-            response = "🤖 Привет! Я работаю в автономном режиме."
+            await self._reply(update, "🤖 Привет! Я работаю в автономном режиме.")
+    
+    async def _stream_reply(self, update, deltas):
+        """Отправлять ответ по мере генерации, редактируя одно сообщение"""
+        limit = self.config.max_message_length
+        loop = asyncio.get_running_loop()
+        text = ""
+        message = None
+        last_edit = None
+        
+        async for delta in deltas:
+            text += delta
+            now = loop.time()
+            if len(text) + 2 > limit:
+                continue  # хвост уйдёт отдельными сообщениями в конце
+            if last_edit is not None and now - last_edit < self.config.stream_edit_interval:
+                continue
+            if message is None:
+                message = await update.message.reply_text(text.rstrip() + " ▌")
+            else:
+                await self._safe_edit(message, text.rstrip() + " ▌")
+            last_edit = now
         
-        # Разбиваем длинные сообщения
+        if message is None:
+            await self._reply(update, text or "…")
+            return
+        await self._safe_edit(message, text[:limit])
+        for i in range(limit, len(text), limit):
+            await update.message.reply_text(text[i:i+limit])
+    
+    async def _safe_edit(self, message, text: str):
+        """Отредактировать сообщение, игнорируя ошибки (rate limit, not modified)"""
+        try:
+            await message.edit_text(text)
+        except Exception as e:
+            logger.debug(f"[Telegram] Не удалось обновить сообщение: {e}")
+    
+    async def _reply(self, update, response: str):
+        """Отправить ответ, разбивая длинные сообщения"""
         if len(response) > self.config.max_message_length:
             chunks = [response[i:i+self.config.max_message_length] 
                      for i in range(0, len(response), self.config.max_message_length)]
@@ -247,6 +368,13 @@ class TelegramBot:
                 await update.message.reply_text(chunk)
         else:
             await update.message.reply_text(response)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики очереди обработки сообщений и сессий"""
+        metrics = self.pool.get_metrics()
+        if self.sessions:
+            metrics["sessions"] = self.sessions.get_stats()
+        return metrics
 
 
 class TelegramManager:
@@ -281,6 +409,10 @@ class TelegramManager:
         if self.bot:
             asyncio.run(self.bot.stop())
     
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики очереди бота (пусто, если бот не создан)"""
+        return self.bot.get_metrics() if self.bot else {}
+    
     @property
     def is_running(self) -> bool:
         return self.bot and self.bot.status == BotStatus.RUNNING
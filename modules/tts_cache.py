@@ -0,0 +1,191 @@
+"""TTS Cache - content-addressed cache of synthesized speech
+
+Chunks are keyed on hash(text, language, speed, speaker audio, backend)
+and kept in a small in-memory LRU backed by a size-bounded LRU directory
+of WAV files, so canned phrases are synthesized once per voice.
+"""
+import os
+import threading
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from utils import generate_hash, hash_file
+
+logger = logging.getLogger(__name__)
+
+
+class TTSCache:
+    """Two-level (memory + disk) LRU cache of AudioChunk
+
+    Args:
+        cache_dir: Directory for cached WAV files.
+        max_memory_bytes: PCM bytes kept in memory.
+        max_disk_bytes: WAV bytes kept on disk.
+    """
+
+    def __init__(self, cache_dir: str = "cache/tts", max_memory_bytes: int = 32 * 2**20,
+                 max_disk_bytes: int = 256 * 2**20):
+        self.cache_dir = Path(cache_dir)
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, object]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._speaker_hashes: Dict[Tuple[str, float, int], str] = {}
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._scan_disk()
+
+    def _scan_disk(self):
+        """Rebuild disk LRU order from file mtimes (touched on every hit)"""
+        if not self.cache_dir.exists():
+            return
+        files = []
+        for path in self.cache_dir.glob("*/*.wav"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, path.stem, st.st_size))
+        for _, key, size in sorted(files):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.wav"
+
+    def speaker_hash(self, speaker_wav: Optional[str]) -> str:
+        """Content hash of the reference voice (memoized by path, mtime, size)"""
+        if not speaker_wav or not os.path.exists(speaker_wav):
+            return ""
+        st = os.stat(speaker_wav)
+        marker = (speaker_wav, st.st_mtime, st.st_size)
+        digest = self._speaker_hashes.get(marker)
+        if digest is None:
+            digest = hash_file(speaker_wav)
+            self._speaker_hashes[marker] = digest
+        return digest
+
+    def make_key(self, text: str, language: str, speed: float,
+                 speaker_wav: Optional[str], backend: str) -> str:
+        """Cache key for one synthesized chunk"""
+        return generate_hash("\x1f".join(
+            (text, language, f"{speed:.3f}", self.speaker_hash(speaker_wav), backend)))
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._memory or key in self._disk
+
+    def get(self, key: str):
+        """Cached AudioChunk or None"""
+        with self._lock:
+            chunk = self._memory.get(key)
+            if chunk is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return chunk
+            on_disk = key in self._disk
+        if on_disk:
+            chunk = self._read(key)
+            if chunk is not None:
+                with self._lock:
+                    self.stats["disk_hits"] += 1
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self._remember(key, chunk)
+                return chunk
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, chunk) -> None:
+        """Store chunk in memory and on disk"""
+        with self._lock:
+            self._remember(key, chunk)
+            self.stats["stores"] += 1
+            if key in self._disk:
+                return
+        path = self._path(key)
+        tmp = path.with_name(path.name + ".tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "wb") as f:
+                chunk.to_wav(f)
+            os.replace(tmp, path)
+            size = path.stat().st_size
+        except OSError as e:
+            logger.warning(f"TTS cache write failed: {e}")
+            return
+        with self._lock:
+            self._disk[key] = size
+            self._disk_bytes += size
+            self._evict_disk()
+
+    def _read(self, key: str):
+        from .tts_engine import AudioChunk
+        path = self._path(key)
+        try:
+            chunk = AudioChunk.from_wav(path)
+            os.utime(path)  # LRU order survives restarts
+            return chunk
+        except Exception as e:
+            logger.warning(f"TTS cache read failed for {path.name}: {e}")
+            with self._lock:
+                self._disk_bytes -= self._disk.pop(key, 0)
+            return None
+
+    def _remember(self, key: str, chunk):
+        """Put chunk into the memory LRU (call under lock)"""
+        size = len(chunk.samples)
+        if size > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old.samples)
+        self._memory[key] = chunk
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.samples)
+
+    def _evict_disk(self):
+        """Delete least recently used files over the disk budget (call under lock)"""
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self.stats["evictions"] += 1
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def clear(self):
+        """Drop everything from memory and disk"""
+        with self._lock:
+            keys = list(self._disk)
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._disk.clear()
+            self._disk_bytes = 0
+        for key in keys:
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            lookups = hits + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
@@ -4,22 +4,30 @@ Supports:
 - Coqui XTTS v2 (Python 3.9-3.11, with voice cloning)
 - pyttsx3 (Python 3.12+, basic TTS)
 """
+import io
 import os
+import re
 import sys
 import threading
 import queue
 import tempfile
 import logging
+import wave
 from pathlib import Path
-from typing import Optional, Callable
+from typing import Optional, Callable, List
 from dataclasses import dataclass, field
 from enum import Enum
 
+from .speaker_latents import SpeakerLatentCache, supports_latents
+from .tts_cache import TTSCache
+
 logger = logging.getLogger(__name__)
 
 # Configuration from environment
 TTS_LANGUAGE = os.getenv('TTS_LANGUAGE', 'ru')
 TTS_SPEED = float(os.getenv('TTS_SPEED', '1.0'))
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', 'cache/tts')
+TTS_CACHE_MB = int(os.getenv('TTS_CACHE_MB', '256'))
 
 
 class TTSStatus(Enum):
@@ -43,6 +51,116 @@ class TTSConfig:
     speed: float = field(default_factory=lambda: TTS_SPEED)
     speaker_wav: Optional[str] = None
     output_dir: str = "output"
+    cache_enabled: bool = True
+    cache_dir: str = field(default_factory=lambda: TTS_CACHE_DIR)
+    cache_disk_mb: int = field(default_factory=lambda: TTS_CACHE_MB)
+    cache_memory_mb: int = 32
+
+
+@dataclass
+class AudioChunk:
+    """Synthesized speech kept in memory as 16-bit PCM"""
+    samples: bytes
+    sample_rate: int
+    channels: int = 1
+    
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / (2 * self.channels * self.sample_rate)
+        
+    @classmethod
+    def from_wav(cls, source) -> "AudioChunk":
+        """Read 16-bit WAV from path or file object"""
+        if isinstance(source, Path):
+            source = str(source)
+        with wave.open(source, "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"Unsupported sample width: {wav.getsampwidth()}")
+            return cls(wav.readframes(wav.getnframes()), wav.getframerate(), wav.getnchannels())
+            
+    def to_wav(self, target=None):
+        """Write WAV to path/file object; without target return in-memory buffer"""
+        buffer = target if target is not None else io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(self.channels)
+            wav.setsampwidth(2)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(self.samples)
+        if target is None:
+            buffer.seek(0)
+        return buffer
+
+
+class AudioOutput:
+    """Persistent audio output playing PCM buffers from memory
+    
+    The pygame mixer is opened once and reused for every chunk; pygame
+    resamples chunks whose format differs from the mixer. Without pygame
+    chunks go through a temporary file to the system player.
+    """
+    
+    def __init__(self):
+        self._pygame = None
+        self._channel = None
+        self._available = True
+        
+    def _open(self, chunk: AudioChunk) -> bool:
+        if self._channel is not None:
+            return True
+        if not self._available:
+            return False
+        try:
+            import pygame
+            pygame.mixer.init(frequency=chunk.sample_rate, size=-16, channels=chunk.channels)
+            self._pygame = pygame
+            self._channel = pygame.mixer.Channel(0)
+            return True
+        except Exception as e:
+            logger.info(f"pygame mixer unavailable, using system player: {e}")
+            self._available = False
+            return False
+            
+    def play(self, chunk: AudioChunk, cancel: threading.Event = None) -> bool:
+        """Play chunk, blocking until it ends; False if interrupted by cancel"""
+        cancel = cancel or threading.Event()
+        if not self._open(chunk):
+            self._play_system(chunk)
+            return not cancel.is_set()
+        sound = self._pygame.mixer.Sound(file=chunk.to_wav())
+        self._channel.play(sound)
+        # Sleep for the chunk duration instead of polling get_busy()
+        if cancel.wait(sound.get_length()):
+            self._channel.stop()
+            return False
+        return True
+        
+    def _play_system(self, chunk: AudioChunk):
+        import platform
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                chunk.to_wav(f)
+            system = platform.system()
+            if system == "Windows":
+                import winsound
+                winsound.PlaySound(path, winsound.SND_FILENAME)
+            elif system == "Darwin":
+                os.system(f"afplay {path}")
+            else:
+                os.system(f"aplay -q {path}")
+        finally:
+            os.unlink(path)
+            
+    def stop(self):
+        if self._channel is not None:
+            self._channel.stop()
+            
+    def close(self):
+        """Release the audio device"""
+        if self._pygame is not None and self._pygame.mixer.get_init():
+            self._pygame.mixer.quit()
+        self._pygame = None
+        self._channel = None
 
 
 class TTSEngine:
@@ -55,8 +173,16 @@ class TTSEngine:
         self._engine = None
         self._is_initialized = False
         self._status_callback: Optional[Callable] = None
-        self._audio_queue = queue.Queue()
-        self._stop_playback = False
+        self._output = AudioOutput()
+        self._cancel = threading.Event()
+        # Backends are not thread-safe: pipeline and pre-warm share one model
+        self._synth_lock = threading.Lock()
+        self._latents = SpeakerLatentCache()
+        self.cache: Optional[TTSCache] = None
+        if self.config.cache_enabled:
+            self.cache = TTSCache(self.config.cache_dir,
+                                  max_memory_bytes=self.config.cache_memory_mb * 2**20,
+                                  max_disk_bytes=self.config.cache_disk_mb * 2**20)
         
         os.makedirs(self.config.output_dir, exist_ok=True)
         
@@ -114,6 +240,9 @@ class TTSEngine:
             self._engine = TTS("tts_models/multilingual/multi-dataset/xtts_v2").to(device)
             self._backend = TTSBackend.COQUI
             self._is_initialized = True
+            if supports_latents(self._engine.synthesizer.tts_model):
+                from .voice_manager import voice_manager
+                voice_manager.latent_extractor = self.load_speaker_latents
             self._update_status(TTSStatus.IDLE)
             logger.info("Coqui TTS initialized successfully")
             return True
@@ -152,89 +281,133 @@ class TTSEngine:
         return False
         
     def synthesize(self, text: str, output_path: str = None) -> Optional[str]:
-        """Synthesize speech from text"""
+        """Synthesize speech from text into a WAV file"""
+        chunk = self.synthesize_pcm(text)
+        if chunk is None:
+            return None
+        if output_path is None:
+            output_path = os.path.join(self.config.output_dir, "speech.wav")
+        try:
+            chunk.to_wav(output_path)
+        except OSError as e:
+            logger.error(f"Cannot write {output_path}: {e}")
+            return None
+        return output_path
+        
+    def cache_key(self, text: str) -> str:
+        """Cache key of text under the current voice settings"""
+        return self.cache.make_key(text, self.config.language, self.config.speed,
+                                   self.config.speaker_wav, self._backend.value)
+        
+    def synthesize_pcm(self, text: str) -> Optional[AudioChunk]:
+        """Synthesize speech into memory (no output file), using the cache"""
         if not self._is_initialized:
             if not self.initialize():
                 return None
                 
+        key = self.cache_key(text) if self.cache else None
+        if key:
+            chunk = self.cache.get(key)
+            if chunk is not None:
+                return chunk
+                
         self._update_status(TTSStatus.GENERATING)
-        
-        if output_path is None:
-            output_path = os.path.join(self.config.output_dir, "speech.wav")
-            
         try:
-            if self._backend == TTSBackend.COQUI:
-                return self._synth_coqui(text, output_path)
-            elif self._backend == TTSBackend.PYTTSX3:
-                return self._synth_pyttsx3(text, output_path)
+            with self._synth_lock:
+                if self._backend == TTSBackend.COQUI:
+                    chunk = self._pcm_coqui(text)
+                elif self._backend == TTSBackend.PYTTSX3:
+                    chunk = self._pcm_pyttsx3(text)
+                else:
+                    return None
+            if key:
+                self.cache.put(key, chunk)
+            self._update_status(TTSStatus.IDLE)
+            return chunk
         except Exception as e:
             logger.error(f"Synthesis failed: {e}")
             self._update_status(TTSStatus.ERROR)
         return None
         
-    def _synth_coqui(self, text: str, output_path: str) -> str:
-        """Synthesize using Coqui TTS"""
-        if self.config.speaker_wav and os.path.exists(self.config.speaker_wav):
-            self._engine.tts_to_file(
-                text=text,
-                speaker_wav=self.config.speaker_wav,
-                language=self.config.language,
-                file_path=output_path
-            )
+    def _pcm_coqui(self, text: str) -> AudioChunk:
+        """Synthesize with Coqui TTS straight to a PCM buffer"""
+        import numpy as np
+        model = self._engine.synthesizer.tts_model
+        speaker_wav = self.config.speaker_wav
+        if speaker_wav and os.path.exists(speaker_wav) and supports_latents(model):
+            # Precomputed conditioning instead of re-reading the sample every time
+            gpt_cond_latent, speaker_embedding = self._latents.get(model, speaker_wav)
+            wav = model.inference(text, self.config.language, gpt_cond_latent,
+                                  speaker_embedding, speed=self.config.speed)["wav"]
         else:
-            self._engine.tts_to_file(
-                text=text,
-                language=self.config.language,
-                file_path=output_path
-            )
-        self._update_status(TTSStatus.IDLE)
-        return output_path
+            kwargs = {"text": text, "language": self.config.language}
+            if speaker_wav and os.path.exists(speaker_wav):
+                kwargs["speaker_wav"] = speaker_wav
+            wav = self._engine.tts(**kwargs)
+        pcm = (np.clip(np.asarray(wav, dtype=np.float32), -1.0, 1.0) * 32767).astype("<i2")
+        return AudioChunk(pcm.tobytes(), self._engine.synthesizer.output_sample_rate)
         
-    def _synth_pyttsx3(self, text: str, output_path: str) -> str:
-        """Synthesize using pyttsx3"""
-        self._engine.save_to_file(text, output_path)
-        self._engine.runAndWait()
-        self._update_status(TTSStatus.IDLE)
-        return output_path
+    def _pcm_pyttsx3(self, text: str) -> AudioChunk:
+        """pyttsx3 can only render to a file: render, read back, delete"""
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            self._engine.save_to_file(text, path)
+            self._engine.runAndWait()
+            return AudioChunk.from_wav(path)
+        finally:
+            os.unlink(path)
         
     def speak(self, text: str):
-        """Synthesize and play speech"""
-        audio_path = self.synthesize(text)
-        if audio_path:
-            self.play_audio(audio_path)
+        """Synthesize and play speech sentence by sentence (blocking)"""
+        self._cancel.clear()
+        for sentence in split_sentences(text):
+            chunk = self.synthesize_pcm(sentence)
+            if chunk is None or not self.play_pcm(chunk, self._cancel):
+                break
+            
+    def play_pcm(self, chunk: AudioChunk, cancel: threading.Event = None) -> bool:
+        """Play in-memory audio on the persistent output; False if interrupted"""
+        self._update_status(TTSStatus.PLAYING)
+        try:
+            return self._output.play(chunk, cancel)
+        except Exception as e:
+            logger.error(f"Playback failed: {e}")
+            return False
+        finally:
+            self._update_status(TTSStatus.IDLE)
             
     def play_audio(self, audio_path: str):
         """Play audio file"""
         if not os.path.exists(audio_path):
             return
-            
-        self._update_status(TTSStatus.PLAYING)
-        
         try:
-            import pygame
-            pygame.mixer.init()
-            pygame.mixer.music.load(audio_path)
-            pygame.mixer.music.play()
-            while pygame.mixer.music.get_busy():
-                pygame.time.wait(100)
-        except ImportError:
-            # Fallback to system player
-            import platform
-            system = platform.system()
-            if system == "Windows":
-                os.startfile(audio_path)
-            elif system == "Darwin":
-                os.system(f"afplay {audio_path}")
-            else:
-                os.system(f"aplay {audio_path}")
-                
-        self._update_status(TTSStatus.IDLE)
+            chunk = AudioChunk.from_wav(audio_path)
+        except (OSError, ValueError, wave.Error) as e:
+            logger.error(f"Cannot read {audio_path}: {e}")
+            return
+        self._cancel.clear()
+        self.play_pcm(chunk, self._cancel)
         
+    def load_speaker_latents(self, wav_path: str):
+        """Compute (or load saved) XTTS latents of a voice into memory"""
+        if self._backend != TTSBackend.COQUI:
+            return None
+        model = self._engine.synthesizer.tts_model
+        if not supports_latents(model):
+            return None
+        with self._synth_lock:
+            return self._latents.get(model, wav_path)
+            
     def set_speaker_voice(self, wav_path: str):
         """Set speaker voice for cloning (Coqui only)"""
         if os.path.exists(wav_path):
             self.config.speaker_wav = wav_path
             logger.info(f"Speaker voice set: {wav_path}")
+            if self._backend == TTSBackend.COQUI:
+                # Warm the latent cache off the UI thread
+                threading.Thread(target=self.load_speaker_latents, args=(wav_path,),
+                                 daemon=True).start()
         else:
             logger.warning(f"Voice file not found: {wav_path}")
             
@@ -245,12 +418,17 @@ class TTSEngine:
         
     def stop(self):
         """Stop playback"""
-        self._stop_playback = True
-        try:
-            import pygame
-            pygame.mixer.music.stop()
-        except:
-            pass
+        self._cancel.set()
+        self._output.stop()
+        
+    def cleanup(self):
+        """Stop playback and release the audio device"""
+        self.stop()
+        self._output.close()
+            
+    def get_cache_stats(self) -> dict:
+        """Hit/miss statistics of the audio cache"""
+        return self.cache.get_stats() if self.cache else {}
             
     def get_backend_info(self) -> str:
         """Get information about current TTS backend"""
@@ -262,6 +440,243 @@ class TTSEngine:
         return info.get(self._backend, "Unknown")
 
 
+class SentenceBuffer:
+    """Accumulates streamed text and cuts it into complete sentences
+    
+    Sentences longer than max_length are cut at the last comma or space:
+    XTTS truncates long inputs, and short chunks start playing sooner.
+    """
+    
+    BOUNDARY_RE = re.compile(r'[.!?…]+["»)\]]*(?:\s+|$)|\n+')
+    SOFT_BREAK_RE = re.compile(r'[,;:—]\s+|\s+')
+    
+    def __init__(self, min_length: int = 8, max_length: int = 180):
+        self.min_length = min_length
+        self.max_length = max_length
+        self._buffer = ""
+        
+    def feed(self, delta: str) -> list:
+        """Add text delta, return sentences completed by it"""
+        self._buffer += delta
+        sentences = []
+        start = 0
+        for match in self.BOUNDARY_RE.finditer(self._buffer):
+            # Boundary at the very end may still grow ("..." / "?!"), wait for more
+            if match.end() == len(self._buffer) and not match.group().endswith((" ", "\n")):
+                break
+            sentence = self._buffer[start:match.end()].strip()
+            if len(sentence) >= self.min_length:
+                sentences.extend(self._cut_long(sentence))
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        while len(self._buffer) > self.max_length:
+            head, self._buffer = self._split_at_soft_break(self._buffer)
+            sentences.append(head)
+        return sentences
+        
+    def _split_at_soft_break(self, text: str) -> tuple:
+        cut = None
+        for match in self.SOFT_BREAK_RE.finditer(text, 0, self.max_length):
+            if match.start() >= self.min_length:
+                cut = match
+        end = cut.end() if cut else self.max_length
+        return text[:end].strip(), text[end:].lstrip()
+        
+    def _cut_long(self, sentence: str) -> list:
+        parts = []
+        while len(sentence) > self.max_length:
+            head, sentence = self._split_at_soft_break(sentence)
+            parts.append(head)
+        if sentence:
+            parts.append(sentence)
+        return parts
+        
+    def flush(self) -> Optional[str]:
+        """Return the remaining tail (end of stream)"""
+        tail, self._buffer = self._buffer.strip(), ""
+        return tail or None
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split complete text into synthesis chunks"""
+    buffer = SentenceBuffer()
+    sentences = buffer.feed(text)
+    tail = buffer.flush()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+class TTSPipeline:
+    """Producer/consumer speech pipeline
+    
+    One thread synthesizes sentences into memory, another plays them on
+    the persistent output, so sentence N+1 is synthesized while N plays.
+    At most max_ready synthesized chunks wait for playback. cancel()
+    (barge-in) drops everything queued and interrupts current playback.
+    """
+    
+    def __init__(self, engine: TTSEngine, max_ready: int = 2):
+        self.engine = engine
+        self._texts: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._ready: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_ready)
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self.stats = {"synthesized": 0, "played": 0, "cancelled": 0}
+        
+    def start(self) -> "TTSPipeline":
+        if not self._threads:
+            self._threads = [
+                threading.Thread(target=self._synth_loop, name="tts-synth", daemon=True),
+                threading.Thread(target=self._play_loop, name="tts-play", daemon=True),
+            ]
+            for thread in self._threads:
+                thread.start()
+        return self
+        
+    def enqueue(self, text: str, metrics=None):
+        """Queue one sentence; metrics (StreamMetrics) gets time-to-first-audio"""
+        with self._lock:
+            self._texts.put((text, metrics, self._cancel))
+            
+    def speak(self, text: str, metrics=None):
+        """Queue complete text split into sentences"""
+        for sentence in split_sentences(text):
+            self.enqueue(sentence, metrics)
+            
+    def cancel(self):
+        """Barge-in: drop queued speech and stop current playback"""
+        with self._lock:
+            self._cancel.set()
+            self._cancel = threading.Event()
+            for q in (self._texts, self._ready):
+                while True:
+                    try:
+                        item = q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        q.put(None)
+                        break
+        self.stats["cancelled"] += 1
+        
+    def close(self):
+        self.cancel()
+        self._texts.put(None)
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+        
+    def _synth_loop(self):
+        while True:
+            item = self._texts.get()
+            if item is None:
+                self._ready.put(None)
+                break
+            text, metrics, cancel = item
+            if cancel.is_set():
+                continue
+            chunk = self.engine.synthesize_pcm(text)
+            if chunk is None or cancel.is_set():
+                continue
+            self.stats["synthesized"] += 1
+            self._ready.put((chunk, metrics, cancel))
+            
+    def _play_loop(self):
+        while True:
+            item = self._ready.get()
+            if item is None:
+                break
+            chunk, metrics, cancel = item
+            if cancel.is_set():
+                continue
+            if metrics is not None:
+                metrics.mark_first_audio()
+            if self.engine.play_pcm(chunk, cancel):
+                self.stats["played"] += 1
+
+
+class TTSManager:
+    """TTS integration for AI Humanity: voices AI responses in background
+    
+    Responses go through TTSPipeline sentence by sentence; streamed
+    responses start speaking as soon as the first sentence boundary
+    arrives, not when the reply ends.
+    """
+    
+    def __init__(self, cognitive_cycle=None, config: TTSConfig = None):
+        self.cognitive = cognitive_cycle
+        self.config = config or TTSConfig()
+        self.engine: Optional[TTSEngine] = None
+        self.pipeline: Optional[TTSPipeline] = None
+        self.enabled = False
+        self._sentences: Optional[SentenceBuffer] = None
+        self._stream_metrics = None
+        
+    def initialize(self) -> bool:
+        """Create and initialize engine, start synthesis/playback pipeline"""
+        if self.engine is None:
+            self.engine = TTSEngine(self.config)
+        self.enabled = self.engine.initialize()
+        if self.enabled and self.pipeline is None:
+            self.pipeline = TTSPipeline(self.engine).start()
+        return self.enabled
+        
+    def on_response(self, response: str):
+        """Queue AI response for speech (non-blocking)"""
+        if self.enabled and response:
+            self.pipeline.speak(response)
+            
+    def on_stream_start(self, metrics=None):
+        """Begin streamed response; metrics (StreamMetrics) gets time-to-first-audio"""
+        self._sentences = SentenceBuffer()
+        self._stream_metrics = metrics
+        
+    def on_stream_delta(self, delta: str):
+        """Feed token delta, queue every completed sentence"""
+        if self._sentences is None:
+            return
+        for sentence in self._sentences.feed(delta):
+            if self.enabled:
+                self.pipeline.enqueue(sentence, self._stream_metrics)
+                
+    def on_stream_end(self):
+        """Finish streamed response, queue the remaining tail"""
+        if self._sentences is None:
+            return
+        tail = self._sentences.flush()
+        if tail and self.enabled:
+            self.pipeline.enqueue(tail, self._stream_metrics)
+        self._sentences = None
+        self._stream_metrics = None
+            
+    def prewarm(self, phrases: List[str]):
+        """Synthesize canned phrases into the cache in background"""
+        if not (self.enabled and self.engine and self.engine.cache):
+            return
+        def run():
+            done = 0
+            for phrase in phrases:
+                for sentence in split_sentences(phrase):
+                    if not self.enabled:
+                        return
+                    if self.engine.cache_key(sentence) not in self.engine.cache:
+                        self.engine.synthesize_pcm(sentence)
+                        done += 1
+            logger.info(f"TTS cache pre-warmed: {done} new phrases")
+        threading.Thread(target=run, name="tts-prewarm", daemon=True).start()
+            
+    def stop(self):
+        """Barge-in: stop playback and drop queued phrases"""
+        self._sentences = None
+        self._stream_metrics = None
+        if self.pipeline:
+            self.pipeline.cancel()
+        elif self.engine:
+            self.engine.stop()
+
+
 # Global instance
 _tts_engine: Optional[TTSEngine] = None
 
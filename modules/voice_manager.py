@@ -3,9 +3,12 @@
 import os
 import json
 import shutil
+import threading
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Any, Callable, List, Dict, Optional
+
+from .speaker_latents import LATENTS_FILENAME
 
 
 class VoiceManager:
@@ -17,6 +20,10 @@ class VoiceManager:
         self.voices_dir = Path(voices_dir)
         self.metadata_file = self.voices_dir / "voices_metadata.json"
         self.current_voice: Optional[str] = None
+        # Извлечение латентов голоса (регистрирует TTSEngine после загрузки XTTS)
+        self.latent_extractor: Optional[Callable[[str], Any]] = None
+        # Метаданные меняет и GUI, и фоновое извлечение латентов
+        self._lock = threading.RLock()
         self._ensure_dirs()
         self._load_metadata()
         
@@ -35,8 +42,9 @@ class VoiceManager:
             
     def _save_metadata(self):
         """Сохранение метаданных"""
-        with open(self.metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(self.metadata, f, ensure_ascii=False, indent=2)
+        with self._lock:
+            with open(self.metadata_file, 'w', encoding='utf-8') as f:
+                json.dump(self.metadata, f, ensure_ascii=False, indent=2)
             
     def add_voice(self, audio_path: str, name: str, description: str = "") -> bool:
         """
@@ -67,22 +75,57 @@ class VoiceManager:
         dest = voice_dir / f"sample{src.suffix}"
         shutil.copy2(src, dest)
         
-        self.metadata["voices"][voice_id] = {
-            "name": name,
-            "description": description,
-            "file": str(dest),
-            "format": src.suffix,
-            "added_at": datetime.now().isoformat(),
-            "is_default": len(self.metadata["voices"]) == 0
-        }
-        
-        if self.metadata["voices"][voice_id]["is_default"]:
-            self.metadata["default_voice"] = voice_id
-            
-        self._save_metadata()
+        with self._lock:
+            self.metadata["voices"][voice_id] = {
+                "name": name,
+                "description": description,
+                "file": str(dest),
+                "format": src.suffix,
+                "added_at": datetime.now().isoformat(),
+                "is_default": len(self.metadata["voices"]) == 0
+            }
+            if self.metadata["voices"][voice_id]["is_default"]:
+                self.metadata["default_voice"] = voice_id
+            self._save_metadata()
+        self._precompute_latents(voice_id, dest)
         print(f"[УСПЕХ] Голос '{name}' добавлен")
         return True
         
+    def _precompute_latents(self, voice_id: str, sample: Path):
+        """Посчитать латенты голоса в фоне и сохранить рядом с семплом.
+
+        Извлечение XTTS долгое и ждёт идущий синтез, поэтому не держит
+        вызывающий (GUI) поток. Пока латентов нет, голос работает как
+        раньше: они посчитаются при первом использовании.
+        """
+        extractor = self.latent_extractor
+        if extractor is None:
+            return  # посчитаются и сохранятся при первом использовании голоса
+
+        def run():
+            try:
+                extractor(str(sample))
+            except Exception as e:
+                print(f"[ОШИБКА] Не удалось подготовить голос '{voice_id}': {e}")
+                return
+            latents = sample.with_name(LATENTS_FILENAME)
+            with self._lock:
+                voice = self.metadata["voices"].get(voice_id)
+                if voice is None or not latents.exists():
+                    return  # голос успели удалить
+                voice["latents"] = str(latents)
+                self._save_metadata()
+
+        threading.Thread(target=run, daemon=True).start()
+            
+    def get_latents_path(self, voice_id: str = None) -> Optional[str]:
+        """Путь к сохранённым латентам голоса (если уже посчитаны)"""
+        sample = self.get_voice_path(voice_id)
+        if not sample:
+            return None
+        path = Path(sample).with_name(LATENTS_FILENAME)
+        return str(path) if path.exists() else None
+        
     def _generate_id(self, name: str) -> str:
         """Генерация уникального ID"""
         base = name.lower().replace(' ', '_')
@@ -104,13 +147,12 @@ class VoiceManager:
         if voice_dir.exists():
             shutil.rmtree(voice_dir)
             
-        del self.metadata["voices"][voice_id]
-        
-        if self.metadata["default_voice"] == voice_id:
-            voices = list(self.metadata["voices"].keys())
-            self.metadata["default_voice"] = voices[0] if voices else None
-            
-        self._save_metadata()
+        with self._lock:
+            del self.metadata["voices"][voice_id]
+            if self.metadata["default_voice"] == voice_id:
+                voices = list(self.metadata["voices"].keys())
+                self.metadata["default_voice"] = voices[0] if voices else None
+            self._save_metadata()
         return True
         
     def get_voices(self) -> List[Dict]:
@@ -132,11 +174,11 @@ class VoiceManager:
         if voice_id not in self.metadata["voices"]:
             return False
             
-        for vid in self.metadata["voices"]:
-            self.metadata["voices"][vid]["is_default"] = (vid == voice_id)
-            
-        self.metadata["default_voice"] = voice_id
-        self._save_metadata()
+        with self._lock:
+            for vid in self.metadata["voices"]:
+                self.metadata["voices"][vid]["is_default"] = (vid == voice_id)
+            self.metadata["default_voice"] = voice_id
+            self._save_metadata()
         return True
         
     def get_default_voice(self) -> Optional[Dict]:
@@ -0,0 +1,77 @@
+"""Журнал эпизодов и снимок индекса: восстановление после сбоев"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.episode_log import EpisodeLog  # noqa: E402
+from core.episodic_memory import EpisodicMemory  # noqa: E402
+
+PHRASES = ["расскажи про погоду", "мне грустно сегодня", "найди рецепт пасты", "спасибо, пока"]
+
+
+def fill(memory: EpisodicMemory, count: int):
+    for i in range(count):
+        memory.add({"input": f"{PHRASES[i % 4]} {i}", "output": PHRASES[(i * 7) % 4]})
+
+
+def test_stale_idx_after_interrupted_compact_is_rejected(tmp_path):
+    path = tmp_path / "episodes.jsonl"
+    log = EpisodeLog(path)
+    for i in range(50):
+        log.append({"id": i, "input": f"эпизод {i}"})
+    log.close()
+    stale_idx = (path.parent / "episodes.jsonl.idx").read_bytes()
+
+    # Сбой между подменой журнала и записью нового снапшота
+    log = EpisodeLog(path)
+    log.compact(10)
+    log.close()
+    (path.parent / "episodes.jsonl.idx").write_bytes(stale_idx)
+
+    log = EpisodeLog(path)
+    assert len(log) == 10
+    assert [r["id"] for r in log] == list(range(40, 50))
+    log.close()
+
+
+def test_state_snapshot_matches_full_rebuild(tmp_path):
+    path = tmp_path / "episodes.jsonl"
+    log = EpisodeLog(path)
+    memory = EpisodicMemory(log=log, state_every=0)
+    fill(memory, 300)
+    memory.save_state()
+    fill(memory, 20)  # Хвост после снимка
+    log.close()
+
+    results = []
+    for keep_state in (True, False):
+        if not keep_state:
+            os.remove(memory.state_path)
+        log = EpisodeLog(path)
+        restored = EpisodicMemory(log=log)
+        assert len(restored) == 320
+        results.append([ep["id"] for ep in restored.search("рецепт пасты 318", k=5)])
+        log.close()
+    assert results[0] == results[1]
+    assert results[0][0] == 318
+
+
+def test_capped_memory_compacts_log(tmp_path):
+    path = tmp_path / "episodes.jsonl"
+    log = EpisodeLog(path)
+    memory = EpisodicMemory(max_episodes=100, log=log, state_every=0)
+    fill(memory, 5000)
+    assert len(log) <= 2 * 1024
+    memory.save_state()
+    log.close()
+
+    log = EpisodeLog(path)
+    restored = EpisodicMemory(max_episodes=100, log=log)
+    assert len(restored) == 100
+    assert restored.recent(1)[0]["id"] == 4999
+    assert restored.search("погоду 4996", k=1)[0]["id"] == 4996
+    restored.add({"input": "новый", "output": "эпизод"})
+    assert restored.recent(1)[0]["id"] == 5000
+    log.close()
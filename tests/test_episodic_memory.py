@@ -0,0 +1,44 @@
+"""Точность поиска BM25 на большом числе эпизодов"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.episodic_memory import BM25Index, EpisodicMemory  # noqa: E402
+
+
+def test_old_relevant_episode_is_found_among_recent_ones():
+    memory = EpisodicMemory()
+    memory.add({"input": "погода, погода, погода", "output": "ясно"})
+    for i in range(5000):
+        memory.add({"input": f"какая погода сегодня {i}", "output": "обычная погода"})
+    assert memory.search("погода", k=1)[0]["id"] == 0
+
+
+def test_vectorized_and_scalar_search_agree(monkeypatch):
+    index = BM25Index()
+    for doc_id in range(3000):
+        index.add(doc_id, [f"w{doc_id % 7}", f"w{doc_id % 11}", f"w{doc_id % 13}", "общий"])
+    for doc_id in range(0, 3000, 5):
+        index.remove(doc_id)
+    query = ["w3", "w5", "общий"]
+    monkeypatch.setattr(BM25Index, "VECTOR_MIN_POSTINGS", 10 ** 9)
+    scalar = index.search(query, k=10)
+    if index._np is not None:
+        monkeypatch.setattr(BM25Index, "VECTOR_MIN_POSTINGS", 1)
+        vectorized = index.search(query, k=10)
+        assert [round(s, 9) for s, _ in vectorized] == [round(s, 9) for s, _ in scalar]
+    assert all(doc_id % 5 for _, doc_id in scalar)
+
+
+def test_capped_memory_keeps_vector_index_bounded():
+    pytest.importorskip("numpy")
+    memory = EpisodicMemory(max_episodes=200, use_vectors=True)
+    for i in range(10000):
+        memory.add({"input": f"эпизод номер {i}", "output": "ответ"})
+    vectors = memory._vectors
+    assert len(vectors._matrix) <= 4096
+    assert len(vectors.export_state()["rows"]) <= 1024 + 2 * 200
+    assert memory.search("эпизод номер 9999", k=1)[0]["id"] == 9999
@@ -0,0 +1,77 @@
+"""Регрессии LLM-транспорта: хеджирование и предохранитель"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.llm_transport import LLMTransport, LLMUnavailable, TransportConfig  # noqa: E402
+
+
+def _chunk(text: str):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class FakeStream:
+    def __init__(self):
+        self.closed = False
+
+    async def _chunks(self):
+        for text in ("при", "вет"):
+            yield _chunk(text)
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def close(self):
+        self.closed = True
+
+
+class GatedClient:
+    """Оба запроса отвечают одновременно — после прихода второго"""
+
+    def __init__(self):
+        self.streams = []
+        self.gate = asyncio.Event()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **params):
+        stream = FakeStream()
+        self.streams.append(stream)
+        if len(self.streams) == 2:
+            self.gate.set()
+        await self.gate.wait()
+        return stream
+
+
+def test_hedge_closes_every_extra_stream():
+    async def run():
+        client = GatedClient()
+        transport = LLMTransport(None, client, TransportConfig(hedge=True, hedge_min_delay=0.01,
+                                                               max_retries=0))
+        transport._latencies.extend([0.01] * 20)
+        stream, _, first = await transport._aopen_hedged({}, timeout=1)
+        return client.streams, stream, first
+
+    streams, stream, first = asyncio.run(run())
+    assert first == "при"
+    assert len(streams) == 2
+    assert [s.closed for s in streams if s is not stream] == [True]
+    assert not stream.closed
+
+
+def test_client_error_keeps_breaker_state():
+    error = type("BadRequest", (Exception,), {"status_code": 400})("bad request")
+    transport = LLMTransport(None, config=TransportConfig(breaker_threshold=2, breaker_cooldown=0))
+    transport.breaker.record_failure()
+    transport.breaker.record_failure()
+    assert transport.breaker.allow()  # проба half-open
+    with pytest.raises(LLMUnavailable):
+        transport._failed(error, 0, time.monotonic() + 1)
+    assert transport.breaker.opened_at is not None
+    assert transport.breaker.failures == 2
+    assert transport.breaker.allow()  # проба освобождена
@@ -0,0 +1,45 @@
+"""Conversation logs: migration of legacy JSON conversations."""
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.memory_manager import MemoryManager  # noqa: E402
+
+
+def write_legacy(path: Path, count: int):
+    messages = [{"role": "user", "content": f"old {i}", "timestamp": f"2024-01-0{i + 1}T00:00:00",
+                 "metadata": {}} for i in range(count)]
+    path.write_text(json.dumps({"id": "chat", "messages": messages, "created_at": "2024-01-01T00:00:00",
+                                "updated_at": "2024-01-03T00:00:00", "metadata": {"title": "Старый"}},
+                               ensure_ascii=False), encoding="utf-8")
+
+
+def test_legacy_history_survives_new_message(tmp_path):
+    write_legacy(tmp_path / "chat.json", 3)
+    manager = MemoryManager(storage_dir=str(tmp_path))
+    assert manager.load_conversation("chat")
+    manager.add_message("user", "new", conversation_id="chat")
+    manager.save_conversation("chat")
+    manager.close()
+
+    manager = MemoryManager(storage_dir=str(tmp_path))
+    assert manager.load_conversation("chat")
+    assert [m["content"] for m in manager.get_history("chat")] == ["old 0", "old 1", "old 2", "new"]
+    conversation = manager._conversations["chat"]
+    assert conversation.metadata == {"title": "Старый"}
+    assert conversation.created_at == "2024-01-01T00:00:00"
+    assert manager.list_conversations() == ["chat"]
+    manager.close()
+
+
+def test_log_written_before_migration_is_merged(tmp_path):
+    write_legacy(tmp_path / "chat.json", 2)
+    (tmp_path / "chat.jsonl").write_text(
+        json.dumps({"role": "user", "content": "new", "timestamp": "2024-02-01T00:00:00",
+                    "metadata": {}}) + "\n", encoding="utf-8")
+    manager = MemoryManager(storage_dir=str(tmp_path))
+    assert manager.load_conversation("chat")
+    assert [m["content"] for m in manager.get_history("chat")] == ["old 0", "old 1", "new"]
+    manager.close()
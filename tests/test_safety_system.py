@@ -0,0 +1,37 @@
+"""Регрессии фильтра безопасности"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.safety_system import SafetyMode, SafetySystem  # noqa: E402
+
+
+def test_normal_mode_passes_harmless_output():
+    safety = SafetySystem(SafetyMode.NORMAL)
+    assert safety.check_output("Перед операцией дают наркоз.") == (True, "OK")
+    assert safety.check_output("Никогда не применяй насилие к детям.") == (True, "OK")
+
+
+def test_stream_holds_back_split_match():
+    safety = SafetySystem(SafetyMode.STRICT)
+    stream = safety.open_output_stream()
+    released = ""
+    for chunk in ("Вот ответ: как сделать бо", "мбу дома"):
+        stream.feed(chunk)
+        released += stream.release()
+    assert stream.match is not None and stream.match.category == "violence"
+    # Ни один символ совпадения не ушёл пользователю
+    assert len(released) <= stream.match.start
+    assert stream.flush() == ""
+
+
+def test_stream_releases_everything_without_match():
+    safety = SafetySystem(SafetyMode.STRICT)
+    stream = safety.open_output_stream()
+    chunks = ["Привет! ", "Как прошёл ", "твой день?"]
+    released = ""
+    for chunk in chunks:
+        stream.feed(chunk)
+        released += stream.release()
+    assert released + stream.flush() == "".join(chunks)
@@ -0,0 +1,47 @@
+"""Session manager: reset racing an in-flight eviction save."""
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.session_manager import SessionManager  # noqa: E402
+
+
+class SlowCycle:
+    def __init__(self):
+        self.exporting = threading.Event()
+        self.resume = threading.Event()
+
+    def export_state(self, max_episodes):
+        self.exporting.set()
+        self.resume.wait(5)
+        return {"episodes": []}
+
+    def load_state(self, state):
+        self.restored = state
+
+
+def test_drop_during_eviction_save_does_not_resurrect_session(tmp_path):
+    cycles = []
+
+    def factory():
+        cycles.append(SlowCycle())
+        return cycles[-1]
+
+    manager = SessionManager(factory, storage_dir=str(tmp_path), max_active=1, shards=1)
+    manager.get("a")
+    # Сессия "b" вытесняет "a": её запись зависает внутри export_state
+    evicting = threading.Thread(target=manager.get, args=("b",))
+    evicting.start()
+    assert cycles[0].exporting.wait(5)
+
+    manager.drop("a")
+    cycles[0].resume.set()
+    evicting.join(5)
+
+    assert not manager._path("a").exists()
+    assert not list(tmp_path.rglob("*.tmp"))
+    manager.get("a")
+    assert not hasattr(cycles[-1], "restored")
+    assert manager.get_stats()["created"] == 3
@@ -5,6 +5,7 @@ import torch
 import pygame
 from TTS.api import TTS
 from config import Config
+from modules.speaker_latents import SpeakerLatentCache, supports_latents
 
 
 class TTSModule:
@@ -15,6 +16,8 @@ class TTSModule:
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.tts = None
         self.output_path = "output/speech.wav"
+        self.speaker_wav = None
+        self._latents = SpeakerLatentCache()
         self._init_pygame()
         
     def _init_pygame(self):
@@ -49,8 +52,15 @@ class TTSModule:
             
         os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
         
+        speaker_wav = speaker_wav or self.speaker_wav
         try:
-            if speaker_wav:
+            model = self.tts.synthesizer.tts_model
+            if speaker_wav and supports_latents(model):
+                # Латенты голоса считаются один раз и переиспользуются
+                gpt_cond_latent, speaker_embedding = self._latents.get(model, speaker_wav)
+                out = model.inference(text, language, gpt_cond_latent, speaker_embedding)
+                self.tts.synthesizer.save_wav(out["wav"], self.output_path)
+            elif speaker_wav:
                 self.tts.tts_to_file(
                     text=text,
                     speaker_wav=speaker_wav,
@@ -68,6 +78,12 @@ class TTSModule:
             print(f"[ОШИБКА] Синтез не удался: {e}")
             return None
             
+    def set_speaker_voice(self, speaker_wav: str):
+        """Выбрать голос и заранее загрузить его латенты"""
+        self.speaker_wav = speaker_wav
+        if self.tts and supports_latents(self.tts.synthesizer.tts_model):
+            self._latents.get(self.tts.synthesizer.tts_model, speaker_wav)
+            
     def play_audio(self, audio_path: str = None):
         """Воспроизведение аудиофайла"""
         path = audio_path or self.output_path
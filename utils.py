@@ -3,12 +3,19 @@ import os
 import json
 import logging
 import hashlib
+import re
+import time
 from datetime import datetime
 from pathlib import Path
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Union
 
 logger = logging.getLogger(__name__)
 
+TOKENIZER_ENCODING = os.getenv('TOKENIZER_ENCODING', 'o200k_base')  # gpt-4o family
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]")
+_encoder = None
+
 
 def setup_logging(level: str = "INFO", log_file: Optional[str] = None) -> None:
     """Configure logging for the application."""
@@ -59,6 +66,41 @@ def generate_hash(text: str) -> str:
     return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
 
+def hash_file(filepath: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """Generate SHA256 hash of file contents."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _get_encoder():
+    """tiktoken encoder, resolved once; False when tiktoken is unavailable."""
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding(TOKENIZER_ENCODING)
+        except Exception as e:
+            logger.info(f"tiktoken unavailable ({e}), using approximate token counts")
+            _encoder = False
+    return _encoder
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """Count LLM tokens in text.
+
+    Uses tiktoken when installed; otherwise estimates one token per
+    punctuation mark and per started 4 characters of each word.
+    """
+    encoder = _get_encoder()
+    if encoder:
+        return len(encoder.encode(text, disallowed_special=()))
+    return sum(1 + (len(piece) - 1) // 4 for piece in _TOKEN_PIECES.findall(text))
+
+
 def get_timestamp() -> str:
     """Get current timestamp string."""
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -80,7 +122,7 @@ def safe_filename(name: str) -> str:
 
 
 class Timer:
-    """Context manager for timing code execution."""
+    """Context manager for timing code execution (monotonic perf_counter)."""
     
     def __init__(self, name: str = "Timer"):
         self.name = name
@@ -88,16 +130,15 @@ class Timer:
         self.end_time = None
     
     def __enter__(self):
-        self.start_time = datetime.now()
+        self.start_time = time.perf_counter()
         return self
     
     def __exit__(self, *args):
-        self.end_time = datetime.now()
-        elapsed = (self.end_time - self.start_time).total_seconds()
-        logger.debug(f"{self.name}: {elapsed:.3f}s")
+        self.end_time = time.perf_counter()
+        logger.debug(f"{self.name}: {self.elapsed:.3f}s")
     
     @property
     def elapsed(self) -> float:
-        if self.start_time and self.end_time:
-            return (self.end_time - self.start_time).total_seconds()
+        if self.start_time is not None and self.end_time is not None:
+            return self.end_time - self.start_time
         return 0.0